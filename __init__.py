@@ -1,20 +1,63 @@
-from .database import create_table, fetch_inventory, insert_part_numbers, search
-from .main import Inventory, Part, export_to_excel, search_part_numbers, show_all
+"""
+Parts Inventory package.
 
-# Initialize the database and perform initial setup
-create_table()
-search_part_numbers()
+Importing the package has no side effects and does not load the GUI (customtkinter, PIL) or
+pandas. The modules use plain "import database" imports, so the package directory is put on
+sys.path and the names below are loaded from those same modules on first use.
 
-# __init__.py
+    import inventory
+    inventory.insert_part_numbers("AB-100", 5, "Hex bolt M8x25")
+    inventory.export_to_excel("inventory.xlsx")
+"""
 
-# This file indicates that the directory is a Python package.
-# You can use this file to initialize the package and import necessary modules.
+import importlib
+import os
+import sys
 
-# Example of importing a module within the package
-
-# You can also define package-level variables or functions here
 __version__ = "1.0.0"
 
+_here = os.path.dirname(os.path.abspath(__file__))
+if _here not in sys.path:
+    sys.path.insert(0, _here)
+
+# Public name -> module it lives in.
+_exports = {
+    "export_count_sheet": "audit",
+    "sample": "audit",
+    "restore": "backup",
+    "snapshot": "backup",
+    "adjust_quantity": "database",
+    "create_table": "database",
+    "delete_inventory": "database",
+    "fetch_inventory": "database",
+    "insert_many": "database",
+    "insert_part_numbers": "database",
+    "iter_inventory": "database",
+    "merge_rows": "database",
+    "search": "database",
+    "search_prefix": "database",
+    "search_text": "database",
+    "update_inventory": "database",
+    "export_changes": "excel",
+    "export_inventory": "excel",
+    "export_to_csv": "excel",
+    "export_to_excel": "excel",
+    "import_excel": "excel",
+    "import_inventory": "excel",
+    "Batch": "models",
+    "Inventory": "models",
+    "Part": "models",
+    "Query": "query",
+}
+
+__all__ = sorted(_exports) + ["get_version"]
+
+
+def __getattr__(name):
+    if name not in _exports:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    return getattr(importlib.import_module(_exports[name]), name)
+
 
 def get_version():
     return __version__
@@ -0,0 +1,7 @@
+"""Runs the command line interface: python -m <package> ..."""
+
+import sys
+
+from cli import main
+
+sys.exit(main())
@@ -0,0 +1,304 @@
+"""
+Random samples of parts for the monthly audit (stock count).
+
+ORDER BY RANDOM() would read and sort the whole table. Instead, random rowids between 1 and
+MAX(rowid) are drawn and looked up by primary key; rowids of deleted parts are simply drawn
+again (rejection sampling). Every part is equally likely, and the work follows the size of the
+sample, not the table.
+
+A sample can also be stratified, e.g. by quantity band or by the first word of the description,
+so that parts with no stock or rarely used categories are always represented. Each stratum gets
+its share of the sample (proportional to its size, or equal shares) and is sampled uniformly.
+
+The same seed gives the same sample of the same data, so a pick list can be reproduced:
+
+    picked = audit.sample(50, seed="2026-10", strata=audit.quantity_bands())
+    audit.export_count_sheet(picked, "audit-2026-10.xlsx")
+"""
+
+import csv
+import random
+import re
+from collections import namedtuple
+from pathlib import Path
+
+import database
+
+QUANTITY_BOUNDS = (1, 10, 100)  # quantity_bands() splits quantities at these values.
+DRAW_BATCH = 256  # Random rowids looked up per query.
+# Strata with at most this many parts are sampled from their own index range instead.
+DIRECT_LIMIT = 2000
+COUNT_SHEET_COLUMNS = ["Part Number", "Description", "Stratum", "Counted", "Counted By"]
+# Characters up to the first one that sorts below "!".
+_FIRST_WORD = re.compile(r"[^\x00- ]*")
+
+# Parts whose column value is low <= value < high; high None means no upper limit. Values of
+# another type than the limits (text in the quantity column, say) are in no stratum.
+Stratum = namedtuple("Stratum", ["name", "column", "low", "high"])
+
+# seed reproduces the sample; rows are (part_number, quantity, description, stratum name).
+AuditSample = namedtuple("AuditSample", ["seed", "rows"])
+
+
+def quantity_bands(bounds=QUANTITY_BOUNDS):
+    """Strata for quantities below bounds[0], between consecutive bounds and above the last."""
+    edges = [None, *bounds, None]
+    strata = []
+    for low, high in zip(edges, edges[1:]):
+        if low is None:
+            name = f"< {high}"
+        elif high is None:
+            name = f"{low}+"
+        elif high - low == 1:
+            name = str(low)
+        else:
+            name = f"{low}-{high - 1}"
+        strata.append(Stratum(name, "quantity", low, high))
+    return strata
+
+
+def description_categories(limit=100):
+    """
+    One stratum per first word of the description ("Ball", "Hex", ...), found by jumping
+    through the description index once per category instead of reading every part.
+    Descriptions without a first word go in "(blank)". Past limit categories, the rest of the
+    alphabet goes in "(other)", so every part with a description can still be picked.
+    """
+    conn = database.get_connection()
+    strata = []
+    after = ""
+    while True:
+        row = conn.execute(
+            "SELECT description FROM Inventory WHERE description >= ? "
+            "ORDER BY description LIMIT 1",
+            (after,),
+        ).fetchone()
+        if row is None:
+            break
+        if len(strata) == limit:
+            strata.append(Stratum("(other)", "description", after, None))
+            break
+        # The first word ends at the first character that sorts below "!" (a space or a
+        # control character), so "Hex" and "Hex bolt" go together but not "Hexagon nut", and
+        # the stratum [word, word + "!") always holds text. Other spaces, such as a no-break
+        # space, are part of the word: splitting on them would give a bound below text.
+        text = row[0]
+        word = _FIRST_WORD.match(text)[0]
+        if word:
+            low, high = word, word + "!"
+        else:
+            # Empty, or starting with a space or a control character.
+            low, high = after, "!"
+        strata.append(Stratum(word or "(blank)", "description", low, high))
+        after = high
+    return strata
+
+
+def sample(n, seed=None, strata=None, allocation="proportional"):
+    """
+    Picks n different parts at random and returns an AuditSample, with the rows in part
+    number order. Without a seed a new one is chosen; it is returned so the sample can be
+    taken again.
+
+    With strata (which should not overlap) the sample is divided between them, in proportion
+    to their sizes or, with allocation="equal", in equal shares. Parts outside every stratum
+    (or with an empty value) are never picked. A stratum smaller than its share is taken
+    whole.
+    """
+    if n < 0:
+        raise ValueError("The sample size cannot be negative")
+    if allocation not in ("proportional", "equal"):
+        raise ValueError(f"Unknown allocation {allocation!r}")
+    if seed is None:
+        seed = random.SystemRandom().randrange(1_000_000)
+    rng = random.Random(seed)
+    conn = database.get_connection()
+    if not strata:
+        strata = [Stratum("All", None, None, None)]
+
+    counts = [_count(conn, stratum) for stratum in strata]
+    quotas = _allocate(n, counts, allocation)
+    max_rowid = conn.execute("SELECT MAX(rowid) FROM Inventory").fetchone()[0] or 0
+
+    picked = {}
+    large = {}
+    for stratum, count, quota in zip(strata, counts, quotas):
+        if not quota:
+            continue
+        # Reading a small stratum from its index beats drawing rowids at random; so does
+        # reading one that most of the draws would miss, or that most of is wanted.
+        draws = quota * max_rowid / count
+        if count <= DIRECT_LIMIT or draws > count or 2 * quota >= count:
+            rowids = [row[0] for row in conn.execute(*_select(stratum, "rowid"))]
+            for rowid in rng.sample(rowids, min(quota, len(rowids))):
+                picked[rowid] = stratum.name
+        else:
+            large[stratum] = quota
+    if large:
+        picked.update(_draw(conn, rng, large, max_rowid))
+
+    rows = []
+    rowids = list(picked)
+    for start in range(0, len(rowids), database.BATCH_SIZE):
+        chunk = rowids[start : start + database.BATCH_SIZE]
+        rows += conn.execute(
+            "SELECT rowid, part_number, quantity, description FROM Inventory "
+            f"WHERE rowid IN ({', '.join('?' * len(chunk))})",
+            chunk,
+        ).fetchall()
+    return AuditSample(seed, sorted((*row[1:], picked[row[0]]) for row in rows))
+
+
+def export_count_sheet(audit_sample, file_path, blind=True):
+    """
+    Writes the pick list as a count sheet (.csv or .xlsx) with empty Counted and Counted By
+    columns. The quantity on record is left off unless blind is False, so it cannot sway the
+    count. Returns the number of parts written.
+    """
+    columns = list(COUNT_SHEET_COLUMNS)
+    if not blind:
+        columns.insert(2, "Quantity")
+    rows = [
+        (
+            [part_number, description, stratum, None, None]
+            if blind
+            else [part_number, description, quantity, stratum, None, None]
+        )
+        for part_number, quantity, description, stratum in audit_sample.rows
+    ]
+    if Path(file_path).suffix.lower() == ".csv":
+        with open(file_path, "w", newline="", encoding="utf-8") as handle:
+            writer = csv.writer(handle)
+            writer.writerow(columns)
+            writer.writerows(rows)
+    else:
+        from openpyxl import Workbook
+
+        workbook = Workbook(write_only=True)
+        sheet = workbook.create_sheet(f"Audit seed {audit_sample.seed}"[:31])
+        sheet.append(columns)
+        for row in rows:
+            sheet.append(row)
+        workbook.save(file_path)
+    return len(rows)
+
+
+def _draw(conn, rng, quotas, max_rowid):
+    """Rejection sampling on rowid until each stratum in quotas has its share."""
+    wanted = dict(quotas)
+    columns = sorted({stratum.column for stratum in wanted if stratum.column})
+    select = ", ".join(["rowid", *columns])
+    picked = {}
+    seen = set()
+    while wanted:
+        batch = [rng.randint(1, max_rowid) for _ in range(DRAW_BATCH)]
+        found = {
+            row[0]: dict(zip(columns, row[1:]))
+            for row in conn.execute(
+                f"SELECT {select} FROM Inventory "
+                f"WHERE rowid IN ({', '.join('?' * len(batch))})",
+                batch,
+            )
+        }
+        # In the order drawn, so the result only depends on the seed and the data.
+        for rowid in batch:
+            if rowid in seen or rowid not in found:
+                continue
+            seen.add(rowid)
+            for stratum in wanted:
+                if stratum.column is None or _within(
+                    stratum, found[rowid][stratum.column]
+                ):
+                    picked[rowid] = stratum.name
+                    wanted[stratum] -= 1
+                    if not wanted[stratum]:
+                        del wanted[stratum]
+                    break
+            if not wanted:
+                break
+    return picked
+
+
+def _within(stratum, value):
+    # The same test as _select() makes in SQL.
+    kind = _kind(_limit(stratum))
+    if value is None or (kind is not None and _kind(value) != kind):
+        return False
+    if stratum.low is not None and value < stratum.low:
+        return False
+    return stratum.high is None or value < stratum.high
+
+
+def _select(stratum, what):
+    """SQL and parameters selecting what for the parts in stratum, from its index."""
+    sql = f"SELECT {what} FROM Inventory"
+    conditions, params = [], []
+    if stratum.column is not None:
+        kind = _kind(_limit(stratum))
+        types = ", ".join(f"'{name}'" for name in _SQL_TYPES.get(kind, ()))
+        conditions.append(
+            f"typeof({stratum.column}) IN ({types})"
+            if types
+            else f"{stratum.column} IS NOT NULL"
+        )
+        if stratum.low is not None:
+            conditions.append(f"{stratum.column} >= ?")
+            params.append(stratum.low)
+        if stratum.high is not None:
+            conditions.append(f"{stratum.column} < ?")
+            params.append(stratum.high)
+        sql += " WHERE " + " AND ".join(conditions)
+    return sql, params
+
+
+# SQLite's typeof() names for each kind of value.
+_SQL_TYPES = {"number": ("integer", "real"), "text": ("text",)}
+
+
+def _limit(stratum):
+    return stratum.low if stratum.low is not None else stratum.high
+
+
+def _kind(value):
+    if isinstance(value, (int, float)):
+        return "number"
+    if isinstance(value, str):
+        return "text"
+    return None
+
+
+def _count(conn, stratum):
+    # Without a column this is SQLite's fast whole-table count; with one, a count over the
+    # range of the column's index.
+    if stratum.column is not None and stratum.column not in database.SORT_COLUMNS:
+        raise ValueError(f"Cannot stratify by {stratum.column!r}")
+    return conn.execute(*_select(stratum, "COUNT(*)")).fetchone()[0]
+
+
+def _allocate(n, counts, allocation):
+    """Splits n between strata of the given sizes, never giving one more than it has."""
+    quotas = [0] * len(counts)
+    remaining = min(n, sum(counts))
+    while remaining:
+        open_strata = [i for i, count in enumerate(counts) if quotas[i] < count]
+        if allocation == "equal":
+            weights = {i: 1 for i in open_strata}
+        else:
+            weights = {i: counts[i] - quotas[i] for i in open_strata}
+        total = sum(weights.values())
+        # Largest remainder: whole shares first, then the biggest fractions.
+        shares = {i: remaining * weight / total for i, weight in weights.items()}
+        given = {
+            i: min(int(share), counts[i] - quotas[i]) for i, share in shares.items()
+        }
+        left = remaining - sum(given.values())
+        for i in sorted(shares, key=lambda i: shares[i] - int(shares[i]), reverse=True):
+            if not left:
+                break
+            if given[i] < counts[i] - quotas[i]:
+                given[i] += 1
+                left -= 1
+        for i, extra in given.items():
+            quotas[i] += extra
+        remaining = left
+    return quotas
@@ -0,0 +1,221 @@
+"""
+Online backups of the inventory database.
+
+Copying Inventory.db while the application is writing can give a corrupt copy. backup() uses
+SQLite's backup API instead, copying BACKUP_PAGES pages per step so a large database never holds
+a lock for long. In WAL mode the copy is read from one snapshot, which does not block writers at
+all, so the result is exactly the database as it was when the backup started.
+
+Snapshots are backups kept in a folder (backups/ next to the database by default) and pruned
+to the newest few:
+
+    backup.snapshot()                       # now, kept with the other manual snapshots
+    backup.scheduled_snapshot("monthly")    # at most one per month, e.g. for the stock count
+    backup.restore("backups/inventory-monthly-2026-09.db")
+
+From the command line (or cron): python cli.py backup --scheduled monthly
+"""
+
+import os
+import re
+import sqlite3
+import tempfile
+import time
+from collections import namedtuple
+from datetime import datetime
+from pathlib import Path
+
+import database
+
+# Where snapshots go. Default: backups/ next to the database.
+BACKUP_DIR = os.environ.get("INVENTORY_BACKUP_DIR")
+BACKUP_PAGES = 1024  # Pages copied per step (4 MB with SQLite's default page size).
+# Seconds between steps outside WAL mode, so other connections get a turn at the lock.
+STEP_PAUSE = 0.001
+# The snapshot the application takes when it starts, if due: daily, weekly, monthly or off.
+SCHEDULE = os.environ.get("INVENTORY_BACKUP_SCHEDULE", "monthly")
+# Snapshots kept per period.
+KEEP = {"manual": 10, "daily": 7, "weekly": 5, "monthly": 12}
+
+# Snapshots of a scheduled period are labelled with this strftime format: one per label.
+PERIODS = {"daily": "%Y-%m-%d", "weekly": "%G-W%V", "monthly": "%Y-%m"}
+
+_SNAPSHOT_NAME = re.compile(r"inventory-(?P<period>[a-z]+)-(?P<label>.+)\.db$")
+
+
+class BackupResult(namedtuple("BackupResult", ["path", "bytes", "seconds"])):
+    @property
+    def mb_per_second(self):
+        return self.bytes / 1e6 / self.seconds if self.seconds else float("inf")
+
+    def __str__(self):
+        return (
+            f"{self.bytes / 1e6:.1f} MB to {self.path} in {self.seconds:.2f}s "
+            f"({self.mb_per_second:.0f} MB/s)"
+        )
+
+
+def backup(path, pages=BACKUP_PAGES, progress=None, replace=True):
+    """
+    Copies the database to path while it stays in use, and returns a BackupResult.
+    progress(pages_copied, total_pages) is called after each step; if it raises, the backup
+    stops and nothing is left at path. The copy is written to a temporary file of its own
+    next to path and renamed into place at the end, so path is never a half-written
+    database. With replace=False, FileExistsError is raised (and path left alone) if path
+    exists by then, e.g. because another computer took the same snapshot.
+    """
+    path = Path(path)
+    handle, partial = tempfile.mkstemp(
+        prefix=path.name + ".", suffix=".partial", dir=path.parent
+    )
+    os.close(handle)
+    partial = Path(partial)
+    start = time.perf_counter()
+    source = sqlite3.connect(database.DB_PATH, isolation_level=None)
+    target = sqlite3.connect(partial)
+    try:
+        wal = source.execute("PRAGMA journal_mode").fetchone()[0].lower() == "wal"
+        if wal:
+            # Copy from one read snapshot: writers carry on, and the backup never has to
+            # start again because someone wrote in the middle of it.
+            source.execute("BEGIN")
+            source.execute("SELECT COUNT(*) FROM sqlite_master").fetchone()
+
+        def step(status, remaining, total):
+            if progress:
+                progress(total - remaining, total)
+            if not wal:
+                time.sleep(STEP_PAUSE)
+
+        source.backup(target, pages=pages, progress=step)
+        # The copy keeps the source's WAL mode, and opening it would then leave -wal and -shm
+        # files beside it (or fail on read-only media). Make it one self-contained file.
+        target.execute("PRAGMA journal_mode=DELETE")
+        target.close()
+        _publish(partial, path, replace)
+    except BaseException:
+        target.close()
+        for suffix in ("", "-journal", "-wal", "-shm"):
+            leftover = Path(f"{partial}{suffix}")
+            if leftover.exists():
+                os.remove(leftover)
+        raise
+    finally:
+        source.close()
+    return BackupResult(path, path.stat().st_size, time.perf_counter() - start)
+
+
+def _publish(partial, path, replace):
+    if replace:
+        os.replace(partial, path)
+        return
+    try:
+        # Fails if path exists, however close together two computers finish.
+        os.link(partial, path)
+    except FileExistsError:
+        raise FileExistsError(f"{path} already exists") from None
+    except OSError:
+        # Some shares have no hard links: check first instead.
+        if path.exists():
+            raise FileExistsError(f"{path} already exists") from None
+        os.replace(partial, path)
+        return
+    os.remove(partial)
+
+
+def restore(path, progress=None):
+    """
+    Replaces the contents of the database with the backup at path, after checking that the
+    backup is intact. Other connections see the restored data on their next read. Returns a
+    BackupResult for the copy.
+
+    Delta exports (excel.export_changes()) restart from the backup's watermarks, which do not
+    cover changes made after it; do a full export for downstream systems after a restore.
+    """
+    path = Path(path)
+    start = time.perf_counter()
+    source = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+    try:
+        try:
+            (result,) = source.execute("PRAGMA quick_check").fetchone()
+        except sqlite3.DatabaseError as error:
+            result = str(error)
+        if result != "ok":
+            raise ValueError(f"{path} is damaged: {result}")
+        # Copied in one step, so nobody ever sees a mix of the old and the restored pages.
+        source.backup(
+            database.get_connection(),
+            progress=lambda status, remaining, total: (
+                progress(total - remaining, total) if progress else None
+            ),
+        )
+    finally:
+        source.close()
+    database.notify_reload()
+    return BackupResult(path, path.stat().st_size, time.perf_counter() - start)
+
+
+def backup_dir():
+    if BACKUP_DIR:
+        return Path(BACKUP_DIR)
+    return Path(database.DB_PATH).resolve().parent / "backups"
+
+
+def snapshot(period="manual", label=None, directory=None, keep=None, progress=None):
+    """
+    Takes a snapshot into directory (default backup_dir()) and deletes the oldest snapshots
+    of the same period beyond keep (default KEEP[period]). label defaults to the time.
+    Returns a BackupResult.
+    """
+    directory = Path(directory or backup_dir())
+    directory.mkdir(parents=True, exist_ok=True)
+    label = label or datetime.now().strftime("%Y-%m-%d-%H%M%S")
+    result = backup(
+        directory / f"inventory-{period}-{label}.db", progress=progress, replace=False
+    )
+    prune(period, directory, KEEP.get(period, 10) if keep is None else keep)
+    return result
+
+
+def scheduled_snapshot(period="monthly", directory=None, keep=None, progress=None):
+    """
+    Takes this period's snapshot (see PERIODS) unless it has been taken already. Meant to be
+    called regularly, e.g. when the application starts or from cron. Returns a BackupResult,
+    or None when there was nothing to do (including when another computer sharing the
+    backup folder took the snapshot first).
+    """
+    label = datetime.now().strftime(PERIODS[period])
+    directory = Path(directory or backup_dir())
+    if (directory / f"inventory-{period}-{label}.db").exists():
+        return None
+    try:
+        return snapshot(period, label, directory, keep, progress)
+    except FileExistsError:
+        return None
+
+
+def list_snapshots(directory=None, period=None):
+    """Snapshots in directory as (path, period, label), newest first."""
+    directory = Path(directory or backup_dir())
+    if not directory.is_dir():
+        return []
+    found = []
+    for path in directory.iterdir():
+        match = _SNAPSHOT_NAME.match(path.name)
+        if match and period in (None, match["period"]):
+            found.append((path, match["period"], match["label"]))
+    return sorted(
+        found, key=lambda item: (item[0].stat().st_mtime, item[0].name), reverse=True
+    )
+
+
+def prune(period, directory=None, keep=10):
+    """Deletes all but the newest keep snapshots of period. Returns the paths deleted."""
+    old = [path for path, *_ in list_snapshots(directory, period)[keep:]]
+    for path in old:
+        os.remove(path)
+        # Left by older snapshots that were still in WAL mode when they were opened.
+        for sidecar in (Path(f"{path}-wal"), Path(f"{path}-shm")):
+            if sidecar.exists():
+                os.remove(sidecar)
+    return old
@@ -0,0 +1,76 @@
+"""
+Times backup.backup() and backup.restore() on a synthetic inventory and reports MB/s. While
+the backup runs, another thread keeps adjusting quantities; its slowest write shows whether the
+backup got in the way of writers.
+
+    python benchmarks/bench_backup.py --rows 1000000
+    python benchmarks/bench_backup.py --db /tmp/big1m.db --pages 256
+"""
+
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import synthetic  # noqa: E402
+
+
+def writer(database, keys, stop, latencies):
+    i = 0
+    while not stop.is_set():
+        start = time.perf_counter()
+        database.adjust_quantity(keys[i % len(keys)], 1)
+        latencies.append(time.perf_counter() - start)
+        i += 1
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=200000)
+    parser.add_argument("--db", help="copy this database instead of building one")
+    parser.add_argument("--pages", type=int, help="pages per backup step")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="inventory-bench-") as workdir:
+        path = os.path.join(workdir, "Inventory.db")
+        os.environ["INVENTORY_DB"] = path
+        if args.db:
+            shutil.copy(args.db, path)
+        database = synthetic.build_database(path, 0 if args.db else args.rows)
+        import backup
+
+        keys = [row[0] for row in database.fetch_page(limit=1000)]
+        stop = threading.Event()
+        latencies = []
+        thread = threading.Thread(target=writer, args=(database, keys, stop, latencies))
+        thread.start()
+        try:
+            copy = os.path.join(workdir, "copy.db")
+            result = backup.backup(copy, pages=args.pages or backup.BACKUP_PAGES)
+        finally:
+            stop.set()
+            thread.join()
+        print(f"backup   {result}")
+        if latencies:
+            latencies.sort()
+            print(
+                f"         {len(latencies)} writes meanwhile, "
+                f"p50 {latencies[len(latencies) // 2] * 1000:.2f} ms, "
+                f"max {latencies[-1] * 1000:.2f} ms"
+            )
+        restored = backup.restore(copy)
+        print(
+            f"restore  {restored.bytes / 1e6:.1f} MB in {restored.seconds:.2f}s "
+            f"({restored.mb_per_second:.0f} MB/s)"
+        )
+        database.close_connections()
+
+
+if __name__ == "__main__":
+    main()
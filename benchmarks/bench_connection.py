@@ -0,0 +1,96 @@
+"""
+Compares per-call latency of the old connect-per-call pattern with the pooled
+connections in database.py.
+
+    python benchmarks/bench_connection.py --rows 10000 --calls 2000
+"""
+
+import argparse
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+
+def connect_per_call_exists(path, part_number):
+    # This is how every database.py function used to work.
+    conn = sqlite3.connect(path)
+    cursor = conn.cursor()
+    cursor.execute(
+        "SELECT COUNT(*) FROM Inventory WHERE part_number = ?", (part_number,)
+    )
+    result = cursor.fetchone()
+    conn.close()
+    return result[0] > 0
+
+
+def connect_per_call_update(path, part_number, quantity, description):
+    conn = sqlite3.connect(path)
+    cursor = conn.cursor()
+    cursor.execute(
+        "UPDATE Inventory SET quantity = ?, description = ? WHERE part_number = ?",
+        (quantity, description, part_number),
+    )
+    conn.commit()
+    conn.close()
+
+
+def time_calls(func, args_list):
+    start = time.perf_counter()
+    for args in args_list:
+        func(*args)
+    return (time.perf_counter() - start) / len(args_list)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=10000)
+    parser.add_argument("--calls", type=int, default=2000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "Inventory.db")
+        os.environ["INVENTORY_DB"] = path
+        import database
+
+        database.set_db_path(path)
+        conn = database.get_connection()
+        with conn:
+            conn.executemany(
+                "INSERT INTO Inventory (part_number, quantity, description) VALUES (?, ?, ?)",
+                ((f"P{i:07d}", i % 50, f"Part {i}") for i in range(args.rows)),
+            )
+
+        rng = random.Random(1)
+        keys = [f"P{rng.randrange(args.rows):07d}" for _ in range(args.calls)]
+        reads = [(k,) for k in keys]
+        writes = [(k, 5, "Updated part") for k in keys]
+
+        results = [
+            (
+                "exists, connect per call",
+                time_calls(lambda k: connect_per_call_exists(path, k), reads),
+            ),
+            ("exists, pooled", time_calls(database.part_numbers_exists, reads)),
+            (
+                "update, connect per call",
+                time_calls(lambda *a: connect_per_call_update(path, *a), writes),
+            ),
+            ("update, pooled", time_calls(database.update_inventory, writes)),
+        ]
+        database.close_connections()
+
+    print(
+        f"{args.calls} calls against {args.rows} rows ({database.journal_mode()} journal)"
+    )
+    for name, seconds in results:
+        print(f"  {name:<28} {seconds * 1e6:10.1f} us/call")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""
+Measures bulk import throughput: excel.import_dataframe() on an in-memory DataFrame, then
+the streaming CSV and .xlsx imports on files with a share of invalid rows.
+
+    python benchmarks/bench_import.py --rows 50000
+    python benchmarks/bench_import.py --rows 1000000 --formats csv --bad 0.01
+"""
+
+import argparse
+import csv
+import os
+import resource
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+
+def write_file(path, rows, bad):
+    every = int(1 / bad) if bad else 0
+    header = ["Part Number", "Quantity", "Description"]
+
+    def generate():
+        for i in range(rows):
+            quantity = "five" if every and i % every == 0 else i % 50
+            yield [f"P{i:07d}", quantity, f"Part {i}"]
+
+    if path.suffix == ".csv":
+        with open(path, "w", newline="", encoding="utf-8") as handle:
+            writer = csv.writer(handle)
+            writer.writerow(header)
+            writer.writerows(generate())
+    else:
+        from openpyxl import Workbook
+
+        workbook = Workbook(write_only=True)
+        sheet = workbook.create_sheet("Inventory")
+        sheet.append(header)
+        for row in generate():
+            sheet.append(row)
+        workbook.save(path)
+
+
+def peak_mb():
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS.
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024 if sys.platform == "darwin" else 1024)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=50000)
+    parser.add_argument("--formats", nargs="+", default=["dataframe", "csv", "xlsx"])
+    parser.add_argument("--bad", type=float, default=0.01, help="share of bad rows")
+    args = parser.parse_args()
+
+    import pandas as pd
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "Inventory.db")
+        os.environ["INVENTORY_DB"] = path
+        import database
+        import excel
+
+        database.set_db_path(path)
+        for name in args.formats:
+            database.delete_all_inventory()
+            if name == "dataframe":
+                df = pd.DataFrame(
+                    {
+                        "Part Number": [f"P{i:07d}" for i in range(args.rows)],
+                        "Quantity": [i % 50 for i in range(args.rows)],
+                        "Description": [f"Part {i}" for i in range(args.rows)],
+                    }
+                )
+                start = time.perf_counter()
+                result = excel.import_dataframe(df)
+            else:
+                source = Path(tmp) / f"parts.{name}"
+                write_file(source, args.rows, args.bad)
+                start = time.perf_counter()
+                result = excel.import_inventory(
+                    source, report_path=excel.default_report_path(source)
+                )
+            elapsed = time.perf_counter() - start
+            print(
+                f"{name:<10} inserted {result.inserted}, rejected {result.rejected} "
+                f"in {elapsed:.3f}s ({args.rows / elapsed:,.0f} rows/s), "
+                f"peak RSS {peak_mb():.0f} MB"
+            )
+        database.close_connections()
+
+
+if __name__ == "__main__":
+    main()
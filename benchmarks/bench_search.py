@@ -0,0 +1,111 @@
+"""
+Compares FTS5 search with a LIKE '%...%' scan, then times search-as-you-type: every prefix of
+a few typed queries, with the cache cleared, as the live search in main.py runs them.
+
+    python benchmarks/bench_search.py --rows 1000000
+"""
+
+import argparse
+import os
+import re
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from synthetic import generate_parts  # noqa: E402
+
+QUERIES = ["bearing", "bear", "roller chain", '"hex bolt"', "AB-000"]
+# (what is typed, search_by) for the search-as-you-type timings.
+TYPED = [
+    ("AB-0001234", "Part Number"),
+    ("00012", "Part Number"),
+    ("ball bearing 6204", "Keyword"),
+    ("hex bolt m8", "Description"),
+    ("AB-00012", "Keyword"),
+]
+
+
+def like_scan(conn, text):
+    # Ranking LIKE results means finding every match first, so there is no LIMIT here.
+    where = " AND ".join(
+        "(part_number LIKE ? OR description LIKE ?)" for _ in text.split()
+    )
+    params = [p for word in text.split() for p in (f"%{word.strip(chr(34))}%",) * 2]
+    return conn.execute(
+        f"SELECT part_number, quantity, description FROM Inventory WHERE {where}",
+        params,
+    ).fetchall()
+
+
+def best_of(func, setup=None, repeat=3):
+    times = []
+    for _ in range(repeat):
+        if setup:
+            setup()
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1000000)
+    parser.add_argument("--limit", type=int, default=100)
+    parser.add_argument("--page", type=int, default=15, help="rows shown by the grid")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "Inventory.db")
+        os.environ["INVENTORY_DB"] = path
+        import database
+
+        database.set_db_path(path)
+        start = time.perf_counter()
+        database.insert_many(generate_parts(args.rows))
+        print(
+            f"Loaded {args.rows} rows (with index triggers) in {time.perf_counter() - start:.1f}s"
+        )
+
+        conn = database.get_connection()
+        print(f"{'query':<16}{'LIKE scan':>12}{'FTS5':>12}")
+        for query in QUERIES:
+            like = best_of(lambda: like_scan(conn, query))
+            fts = best_of(
+                lambda: database.search_text(query, limit=args.limit),
+                setup=database.clear_cache,
+            )
+            print(f"{query:<16}{like * 1000:>10.1f}ms{fts * 1000:>10.1f}ms")
+
+        print(f"\nSearch-as-you-type, {args.page} rows per result, slowest keystroke:")
+        for typed, search_by in TYPED:
+            slowest = max(
+                best_of(lambda: live_search(database, search_by, prefix, args.page))
+                for prefix in keystrokes(typed, search_by)
+            )
+            print(f"  {search_by:<12} {typed:<20}{slowest * 1000:>8.2f}ms")
+        database.close_connections()
+
+
+def keystrokes(typed, search_by):
+    """The prefixes main.search_as_you_type() would search for while typed is entered."""
+    for end in range(1, len(typed) + 1):
+        prefix = typed[:end].strip()
+        words = re.findall(r"\w+", prefix)
+        if search_by == "Part Number" or (words and len(words[-1]) >= 2):
+            yield prefix
+
+
+def live_search(database, search_by, text, limit):
+    database.clear_cache()
+    if search_by == "Part Number":
+        return database.search_prefix(text, limit=limit)
+    column = "description" if search_by == "Description" else None
+    return database.search_text(text, column=column, limit=limit, ranked=False)
+
+
+if __name__ == "__main__":
+    main()
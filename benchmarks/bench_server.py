@@ -0,0 +1,171 @@
+"""
+Load test for server.py on localhost.
+
+Starts the service against a synthetic inventory, then keeps --connections keep-alive client
+connections busy for --seconds with a mix of page reads, searches, ETag revalidations and
+adjustments. Prints requests per second and latency percentiles per endpoint.
+
+    python benchmarks/bench_server.py --rows 100000 --connections 32 --seconds 10
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+import synthetic  # noqa: E402
+
+WORDS = ["bearing", "bolt", "hex", "fuse", "relay", "valve", "o-ring", "sensor"]
+
+
+async def fetch(reader, writer, method, path, body=None, headers=()):
+    payload = b"" if body is None else json.dumps(body).encode()
+    lines = [f"{method} {path} HTTP/1.1", "Host: localhost"]
+    lines += [f"{name}: {value}" for name, value in headers]
+    lines.append(f"Content-Length: {len(payload)}")
+    writer.write(("\r\n".join(lines) + "\r\n\r\n").encode() + payload)
+    await writer.drain()
+    status = int((await reader.readline()).split()[1])
+    response_headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b""):
+            break
+        name, _, value = line.decode().partition(":")
+        response_headers[name.strip().lower()] = value.strip()
+    length = int(response_headers.get("content-length", 0))
+    data = await reader.readexactly(length) if length else b""
+    return status, response_headers, data
+
+
+async def client(port, keys, deadline, latencies, errors, seed):
+    rng = random.Random(seed)
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    etag = None
+    while time.perf_counter() < deadline:
+        choice = rng.random()
+        headers = ()
+        body = None
+        method = "GET"
+        if choice < 0.6:
+            name, path = "page", f"/parts?limit=50&after={rng.choice(keys)}"
+        elif choice < 0.8:
+            name, path = "search", f"/search?q={rng.choice(WORDS)}&limit=20"
+        elif choice < 0.95:
+            name, path = "revalidate", "/parts?limit=50"
+            headers = [("If-None-Match", etag)] if etag else ()
+        else:
+            name, path, method = "adjust", f"/parts/{rng.choice(keys)}/adjust", "POST"
+            body = {"delta": rng.choice([-1, 1])}
+        start = time.perf_counter()
+        status, response_headers, _ = await fetch(
+            reader, writer, method, path, body, headers
+        )
+        latencies.setdefault(name, []).append(time.perf_counter() - start)
+        if name == "revalidate":
+            etag = response_headers.get("etag", etag)
+        if status >= 400:
+            errors[status] = errors.get(status, 0) + 1
+    writer.close()
+
+
+async def load(port, keys, connections, seconds):
+    latencies = {}
+    errors = {}
+    deadline = time.perf_counter() + seconds
+    start = time.perf_counter()
+    await asyncio.gather(
+        *(
+            client(port, keys, deadline, latencies, errors, seed)
+            for seed in range(connections)
+        )
+    )
+    return time.perf_counter() - start, latencies, errors
+
+
+def wait_for_port(port, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=1).close()
+            return
+        except OSError:
+            time.sleep(0.05)
+    sys.exit("The server did not start.")
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=100000)
+    parser.add_argument("--connections", type=int, default=32)
+    parser.add_argument("--seconds", type=float, default=10.0)
+    parser.add_argument("--workers", type=int, default=4)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="inventory-bench-") as workdir:
+        path = os.path.join(workdir, "Inventory.db")
+        os.environ["INVENTORY_DB"] = path
+        database = synthetic.build_database(path, args.rows)
+        step = max(1, args.rows // 1000)
+        keys = [
+            row[0]
+            for row in database.get_connection().execute(
+                "SELECT part_number FROM Inventory WHERE rowid % ? = 0", (step,)
+            )
+        ]
+        database.close_connections()
+
+        with socket.socket() as probe:
+            probe.bind(("127.0.0.1", 0))
+            port = probe.getsockname()[1]
+        server = subprocess.Popen(
+            [
+                sys.executable,
+                str(ROOT / "server.py"),
+                "--port",
+                str(port),
+                "--workers",
+                str(args.workers),
+            ],
+            env=dict(os.environ, INVENTORY_DB=path),
+        )
+        try:
+            wait_for_port(port)
+            elapsed, latencies, errors = asyncio.run(
+                load(port, keys, args.connections, args.seconds)
+            )
+        finally:
+            server.terminate()
+            server.wait()
+
+    total = sum(len(values) for values in latencies.values())
+    print(
+        f"{args.rows} parts, {args.connections} connections, {args.workers} DB workers: "
+        f"{total / elapsed:.0f} requests/s, errors {errors or 'none'}"
+    )
+    everything = [value for values in latencies.values() for value in values]
+    for name, values in sorted(latencies.items()) + [("all", everything)]:
+        print(
+            f"  {name:<12} {len(values):>8} requests  "
+            f"p50 {percentile(values, 0.5) * 1000:7.2f} ms  "
+            f"p99 {percentile(values, 0.99) * 1000:7.2f} ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
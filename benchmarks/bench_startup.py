@@ -0,0 +1,106 @@
+"""
+Times a cold start of the desktop application.
+
+Starts main.py with INVENTORY_STARTUP_PROFILE=exit and -X importtime against a synthetic
+inventory, and prints the startup phases and the slowest imports. The application quits on
+its own once the first page of rows is shown.
+
+    python benchmarks/bench_startup.py --rows 100000 --runs 3
+
+Needs a display; without one Xvfb is started if it is installed.
+"""
+
+import argparse
+import os
+import re
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+IMPORT_LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \| (\s*)(\S+)")
+STARTUP_LINE = re.compile(r"startup: (.+?)\s+([\d.]+) ms")
+
+
+def start_once(env):
+    start = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "main.py"],
+        cwd=ROOT,
+        env=env,
+        capture_output=True,
+        text=True,
+        timeout=120,
+    )
+    wall = time.perf_counter() - start
+    if result.returncode:
+        sys.exit(f"main.py exited with {result.returncode}:\n{result.stderr[-2000:]}")
+
+    imports = {}
+    phases = {}
+    for line in result.stderr.splitlines():
+        match = IMPORT_LINE.match(line)
+        if match and not match.group(3):
+            # Only top-level imports; their cumulative time includes everything below them.
+            imports[match.group(4)] = int(match.group(2)) / 1e6
+        match = STARTUP_LINE.match(line)
+        if match:
+            phases[match.group(1)] = float(match.group(2)) / 1000
+    return wall, phases, imports
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=100000)
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--top", type=int, default=15, help="imports to list")
+    args = parser.parse_args()
+
+    import synthetic
+
+    xvfb = None
+    env = dict(os.environ, INVENTORY_STARTUP_PROFILE="exit")
+    if not env.get("DISPLAY") and sys.platform.startswith("linux"):
+        if not shutil.which("Xvfb"):
+            sys.exit("No display and Xvfb is not installed.")
+        xvfb = subprocess.Popen(
+            ["Xvfb", ":98", "-screen", "0", "1024x768x24", "-nolisten", "tcp"],
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+        )
+        env["DISPLAY"] = ":98"
+        time.sleep(0.5)
+
+    try:
+        with tempfile.TemporaryDirectory(prefix="inventory-bench-") as workdir:
+            env["INVENTORY_DB"] = os.path.join(workdir, "Inventory.db")
+            os.environ["INVENTORY_DB"] = env["INVENTORY_DB"]
+            synthetic.build_database(env["INVENTORY_DB"], args.rows).close_connections()
+            runs = [start_once(env) for _ in range(args.runs)]
+    finally:
+        if xvfb:
+            xvfb.terminate()
+
+    print(f"Cold start with {args.rows} parts, {args.runs} run(s), median of each:")
+    print(
+        f"  {'process (wall)':<24} {statistics.median(r[0] for r in runs) * 1000:8.1f} ms"
+    )
+    for name in runs[0][1]:
+        seconds = statistics.median(r[1].get(name, 0.0) for r in runs)
+        print(f"  {name:<24} {seconds * 1000:8.1f} ms")
+
+    print("Slowest top-level imports (first run, cumulative):")
+    imports = sorted(runs[0][2].items(), key=lambda item: item[1], reverse=True)
+    for name, seconds in imports[: args.top]:
+        print(f"  {name:<24} {seconds * 1000:8.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
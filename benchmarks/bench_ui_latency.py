@@ -0,0 +1,105 @@
+"""
+Measures how late a 60 fps event loop runs while a background job imports rows.
+
+The loop stands in for the Tk mainloop: it schedules a frame every 16 ms and records how late
+each one fires while JobRunner imports a DataFrame on a worker thread. No display is needed.
+
+    python benchmarks/bench_ui_latency.py --rows 100000
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+FRAME = 0.016
+
+
+class EventLoop:
+    """Minimal stand-in for tk.Tk: after() callbacks run in order of their due time."""
+
+    def __init__(self):
+        self.pending = []
+
+    def after(self, ms, callback):
+        self.pending.append((time.perf_counter() + ms / 1000, callback))
+        return callback
+
+    def after_cancel(self, after_id):
+        self.pending = [p for p in self.pending if p[1] is not after_id]
+
+    def report_callback_exception(self, exc_type, exc, tb):
+        raise exc
+
+    def run_once(self):
+        self.pending.sort(key=lambda p: p[0])
+        due, callback = self.pending.pop(0)
+        time.sleep(max(0.0, due - time.perf_counter()))
+        callback()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=100000)
+    args = parser.parse_args()
+
+    import pandas as pd
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "Inventory.db")
+        os.environ["INVENTORY_DB"] = path
+        import database
+        import excel
+        from jobs import JobRunner
+
+        database.set_db_path(path)
+        df = pd.DataFrame(
+            {
+                "Part Number": [f"P{i:07d}" for i in range(args.rows)],
+                "Quantity": [i % 50 for i in range(args.rows)],
+                "Description": [f"Part {i} ball bearing" for i in range(args.rows)],
+            }
+        )
+
+        loop = EventLoop()
+        runner = JobRunner(loop)
+        lateness = []
+        done = []
+
+        def schedule_frame():
+            expected = time.perf_counter() + FRAME
+            loop.after(FRAME * 1000, lambda: frame(expected))
+
+        def frame(expected):
+            lateness.append(time.perf_counter() - expected)
+            if not done:
+                schedule_frame()
+
+        start = time.perf_counter()
+        runner.submit(
+            lambda job: excel.import_dataframe(df, job.progress),
+            on_done=done.append,
+            on_progress=lambda done_rows, total: None,
+        )
+        schedule_frame()
+        while not done:
+            loop.run_once()
+        elapsed = time.perf_counter() - start
+        runner.shutdown()
+        database.close_connections()
+
+    lateness.sort()
+    p99 = lateness[int(len(lateness) * 0.99) - 1] if lateness else 0.0
+    print(f"{done[0]} in {elapsed:.2f}s, {len(lateness)} frames")
+    print(
+        f"frame lateness: p50 {lateness[len(lateness) // 2] * 1000:.1f} ms, "
+        f"p99 {p99 * 1000:.1f} ms, max {lateness[-1] * 1000:.1f} ms"
+    )
+
+
+if __name__ == "__main__":
+    main()
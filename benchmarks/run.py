@@ -0,0 +1,474 @@
+"""
+Benchmark suite for the Parts Inventory application.
+
+Builds synthetic inventories, times every database.py function, the Excel/CSV import and
+export, search and treeview population, and writes the results to a JSON file. Two result
+files can then be compared to flag regressions.
+
+    python benchmarks/run.py run --sizes 1000 100000 1000000 --output results.json
+    python benchmarks/run.py compare baseline.json results.json --threshold 0.15
+
+The treeview timings need a display. Without one, the harness starts Xvfb if it is installed
+and otherwise records those cases as skipped.
+"""
+
+import argparse
+import json
+import os
+import platform
+import shutil
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+# Keep database.py away from the real Inventory.db when it is imported.
+os.environ.setdefault(
+    "INVENTORY_DB",
+    os.path.join(tempfile.mkdtemp(prefix="inventory-bench-"), "Inventory.db"),
+)
+
+import synthetic  # noqa: E402
+
+
+class Suite:
+    """Collects timings for one inventory size."""
+
+    def __init__(self, size, repeat):
+        self.size = size
+        self.repeat = repeat
+        self.results = {}
+
+    def time(self, name, func, setup=None, repeat=None, rows=None):
+        times = []
+        for _ in range(repeat or self.repeat):
+            if setup:
+                setup()
+            start = time.perf_counter()
+            func()
+            times.append(time.perf_counter() - start)
+        self.results[name] = {
+            "median": statistics.median(times),
+            "min": min(times),
+            "repeat": len(times),
+        }
+        if rows:
+            self.results[name]["rows_per_second"] = rows / statistics.median(times)
+        print(f"  {name:<32} {statistics.median(times) * 1000:>12.3f} ms")
+
+    def skip(self, name, reason):
+        self.results[name] = {"skipped": reason}
+        print(f"  {name:<32} {'skipped':>12} ({reason})")
+
+
+def run_database(suite, database):
+    size = suite.size
+    middle = database.part_number_at(size // 2)
+    # 100 part numbers spread over the table.
+    step = max(1, size // 100)
+    keys = [
+        row[0]
+        for row in database.get_connection().execute(
+            "SELECT part_number FROM Inventory WHERE rowid % ? = 0 LIMIT 100", (step,)
+        )
+    ]
+    cold = database.clear_cache
+    big = suite.repeat if size <= 100000 else 1
+
+    suite.time("count_inventory", database.count_inventory, setup=cold)
+    suite.time(
+        "fetch_inventory", database.fetch_inventory, setup=cold, repeat=big, rows=size
+    )
+    suite.time("fetch_inventory (cached)", database.fetch_inventory)
+    suite.time(
+        "iter_inventory",
+        lambda: sum(len(rows) for rows in database.iter_inventory(5000)),
+        repeat=big,
+        rows=size,
+    )
+    suite.time("fetch_page (first)", lambda: database.fetch_page(limit=45))
+    suite.time(
+        "fetch_page (keyset)", lambda: database.fetch_page(after=middle, limit=45)
+    )
+    suite.time("part_number_at (middle)", lambda: database.part_number_at(size // 2))
+    by_quantity = database.key_at(size // 2, "quantity")
+    suite.time(
+        "fetch_page (by quantity)",
+        lambda: database.fetch_page(limit=45, order_by="quantity", descending=True),
+    )
+    suite.time(
+        "fetch_page (quantity keyset)",
+        lambda: database.fetch_page(after=by_quantity, limit=45, order_by="quantity"),
+    )
+    suite.time(
+        "fetch_page (by description)",
+        lambda: database.fetch_page(limit=45, order_by="description"),
+    )
+    suite.time("fetch_parts (100 keys)", lambda: database.fetch_parts(keys))
+    suite.time(
+        "part_numbers_exists",
+        lambda: [database.part_numbers_exists(k) for k in keys],
+        rows=len(keys),
+    )
+    suite.time(
+        "search (part_number)",
+        lambda: [database.search("part_number", k) for k in keys],
+        setup=cold,
+        rows=len(keys),
+    )
+    suite.time(
+        "search (description)",
+        lambda: database.search("description", "Fuse 10A"),
+        setup=cold,
+    )
+    suite.time(
+        "search_text (word)", lambda: database.search_text("bearing"), setup=cold
+    )
+    suite.time(
+        "search_text (prefix)", lambda: database.search_text("bear 62"), setup=cold
+    )
+    suite.time(
+        "search_text (phrase)", lambda: database.search_text('"hex bolt"'), setup=cold
+    )
+
+    new_rows = [(f"BENCH-{i:06d}", 1, "Benchmark part") for i in range(1000)]
+    suite.time(
+        "insert_part_numbers",
+        lambda: [database.insert_part_numbers(*row) for row in new_rows[:100]],
+        setup=lambda: _delete(database, new_rows[:100]),
+        rows=100,
+    )
+    suite.time(
+        "update_inventory",
+        lambda: [database.update_inventory(k, 7, "Updated part") for k in keys],
+        rows=len(keys),
+    )
+    suite.time(
+        "delete_inventory",
+        lambda: [database.delete_inventory(row[0]) for row in new_rows[:100]],
+        setup=lambda: database.insert_many(new_rows[:100]),
+        rows=100,
+    )
+    suite.time(
+        "insert_many (1000 rows)",
+        lambda: database.insert_many(new_rows),
+        setup=lambda: _delete(database, new_rows),
+        rows=len(new_rows),
+    )
+    suite.time(
+        "update_many (100 keys)",
+        lambda: database.update_many([(k, 7, None) for k in keys]),
+        rows=len(keys),
+    )
+    suite.time(
+        "delete_many (100 rows)",
+        lambda: database.delete_many([row[0] for row in new_rows[:100]]),
+        setup=lambda: database.insert_many(new_rows[:100]),
+        rows=100,
+    )
+    suite.time(
+        "adjust_quantity",
+        lambda: [database.adjust_quantity(k, 1) for k in keys],
+        rows=len(keys),
+    )
+    # Half the rows are new parts, half update existing ones.
+    merge = [(k, 3, "Merged part") for k in keys] + new_rows[:100]
+    suite.time(
+        "merge_rows (replace)",
+        lambda: database.merge_rows(merge, mode="replace"),
+        setup=lambda: _delete(database, new_rows[:100]),
+        rows=len(merge),
+    )
+    suite.time("search_prefix", lambda: database.search_prefix(middle[:3]), setup=cold)
+    now = datetime.now(timezone.utc)
+    suite.time(
+        "stock_as_of",
+        lambda: [database.stock_as_of(k, now) for k in keys],
+        rows=len(keys),
+    )
+    _delete(database, new_rows)
+
+    # Delete All runs on a copy, so the cases after this one still have their parts.
+    original = database.DB_PATH
+    scratch = os.path.join(os.path.dirname(original), "DeleteAll.db")
+
+    def copy():
+        database.close_connections()
+        source, target = sqlite3.connect(original), sqlite3.connect(scratch)
+        source.backup(target)
+        source.close()
+        target.close()
+        database.set_db_path(scratch)
+
+    suite.time(
+        "delete_all_inventory",
+        database.delete_all_inventory,
+        setup=copy,
+        repeat=big,
+        rows=size,
+    )
+    database.set_db_path(original)
+
+
+def _delete(database, rows):
+    for row in rows:
+        database.delete_inventory(row[0])
+
+
+def run_excel(suite, database, workdir):
+    try:
+        import pandas as pd
+
+        import excel
+    except ImportError as error:
+        for name in (
+            "export_to_csv",
+            "export_to_excel",
+            "export_changes",
+            "import_excel",
+        ):
+            suite.skip(name, str(error))
+        return
+
+    size = suite.size
+    repeat = suite.repeat if size <= 100000 else 1
+    csv_path = os.path.join(workdir, "export.csv")
+    xlsx_path = os.path.join(workdir, "export.xlsx")
+    suite.time(
+        "export_to_csv", lambda: excel.export_to_csv(csv_path), repeat=repeat, rows=size
+    )
+    suite.time(
+        "export_to_excel",
+        lambda: excel.export_to_excel(xlsx_path),
+        repeat=repeat,
+        rows=size,
+    )
+
+    # A delta export after 1000 parts changed: should not depend on the table size.
+    log_path = os.path.join(workdir, "changes.csv")
+    excel.export_changes(log_path, name="bench")
+    keys = [row[0] for row in database.fetch_page(limit=1000)]
+    rounds = iter(range(1, 1000000))
+
+    def change_parts():
+        delta = next(rounds)
+        database.update_many([(key, delta, None) for key in keys])
+
+    suite.time(
+        "export_changes",
+        lambda: excel.export_changes(log_path, name="bench"),
+        setup=change_parts,
+        rows=len(keys),
+    )
+
+    # Import the exported workbook into an empty database.
+    import_path = os.path.join(workdir, "Import.db")
+
+    def empty_database():
+        if os.path.exists(import_path):
+            database.close_connections()
+            os.remove(import_path)
+        database.set_db_path(import_path)
+
+    suite.time(
+        "import_excel",
+        lambda: excel.import_excel(xlsx_path),
+        setup=empty_database,
+        repeat=1,
+        rows=size,
+    )
+    frame = pd.read_csv(csv_path, dtype={"Part Number": str, "Description": str})
+    suite.time(
+        "import_dataframe",
+        lambda: excel.import_dataframe(frame),
+        setup=empty_database,
+        repeat=1,
+        rows=size,
+    )
+
+
+def run_treeview(suite, database, db_path):
+    xvfb = None
+    if not os.environ.get("DISPLAY") and sys.platform.startswith("linux"):
+        if not shutil.which("Xvfb"):
+            for name in (
+                "grid.refresh",
+                "grid.scroll (100 lines)",
+                "grid.scroll (jumps)",
+            ):
+                suite.skip(name, "no display and Xvfb is not installed")
+            return
+        xvfb = subprocess.Popen(
+            ["Xvfb", ":97", "-screen", "0", "1024x768x24", "-nolisten", "tcp"],
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+        )
+        os.environ["DISPLAY"] = ":97"
+        time.sleep(0.5)
+    try:
+        import tkinter as tk
+        from tkinter import ttk
+
+        from grid import VirtualGrid
+
+        database.set_db_path(db_path)
+        root = tk.Tk()
+        tree = ttk.Treeview(root, height=15, columns=("a", "b", "c"), show="headings")
+        scrollbar = ttk.Scrollbar(root)
+        tree.pack()
+        grid = VirtualGrid(tree, scrollbar)
+
+        def update(func):
+            def run():
+                func()
+                root.update()
+
+            return run
+
+        suite.time("grid.refresh", update(grid.refresh), setup=database.clear_cache)
+
+        def scroll_lines():
+            for _ in range(100):
+                grid.scroll_to(grid.offset + 1)
+            root.update()
+
+        suite.time(
+            "grid.scroll (100 lines)", scroll_lines, setup=lambda: grid.scroll_to(0)
+        )
+
+        def jumps():
+            for fraction in (0.9, 0.1, 0.5, 0.75, 0.25):
+                grid.scroll_to(int(grid.total * fraction))
+            root.update()
+
+        suite.time("grid.scroll (jumps)", jumps)
+        root.destroy()
+    finally:
+        if xvfb:
+            xvfb.terminate()
+            del os.environ["DISPLAY"]
+
+
+def run(args):
+    import database
+
+    results = {}
+    for size in args.sizes:
+        print(f"{size} parts")
+        suite = Suite(size, args.repeat)
+        with tempfile.TemporaryDirectory(prefix="inventory-bench-") as workdir:
+            db_path = os.path.join(workdir, "Inventory.db")
+            start = time.perf_counter()
+            synthetic.build_database(db_path, size, seed=args.seed)
+            suite.results["build"] = {
+                "median": time.perf_counter() - start,
+                "min": 0,
+                "repeat": 1,
+            }
+            if "database" in args.only:
+                run_database(suite, database)
+            if "treeview" in args.only:
+                run_treeview(suite, database, db_path)
+            if "excel" in args.only:
+                database.set_db_path(db_path)
+                run_excel(suite, database, workdir)
+            database.close_connections()
+        results[str(size)] = suite.results
+
+    report = {"meta": metadata(args), "results": results}
+    Path(args.output).write_text(json.dumps(report, indent=2))
+    print(f"Wrote {args.output}")
+
+
+def metadata(args):
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=ROOT,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "commit": commit,
+        "python": platform.python_version(),
+        "sqlite": sqlite3.sqlite_version,
+        "platform": platform.platform(),
+        "seed": args.seed,
+        "repeat": args.repeat,
+    }
+
+
+def compare(args):
+    """Prints the change for every case and returns 1 if any got slower than the threshold."""
+    old = json.loads(Path(args.baseline).read_text())["results"]
+    new = json.loads(Path(args.current).read_text())["results"]
+    regressions = 0
+    for size in sorted(set(old) & set(new), key=int):
+        print(f"{size} parts")
+        for name, current in new[size].items():
+            baseline = old[size].get(name)
+            if not baseline or "median" not in baseline or "median" not in current:
+                continue
+            change = (
+                current["median"] / baseline["median"] - 1
+                if baseline["median"]
+                else 0.0
+            )
+            flag = ""
+            if change > args.threshold:
+                flag = "  REGRESSION"
+                regressions += 1
+            elif change < -args.threshold:
+                flag = "  faster"
+            print(
+                f"  {name:<32} {baseline['median'] * 1000:>10.3f} -> "
+                f"{current['median'] * 1000:>10.3f} ms ({change:+.0%}){flag}"
+            )
+    print(f"{regressions} regression(s) above {args.threshold:.0%}")
+    return 1 if regressions else 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Parts Inventory benchmark suite.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = commands.add_parser("run", help="run the benchmarks")
+    run_parser.add_argument(
+        "--sizes", type=int, nargs="+", default=[1000, 100000, 1000000]
+    )
+    run_parser.add_argument("--repeat", type=int, default=5)
+    run_parser.add_argument("--seed", type=int, default=0)
+    run_parser.add_argument(
+        "--only",
+        nargs="+",
+        choices=["database", "excel", "treeview"],
+        default=["database", "excel", "treeview"],
+    )
+    run_parser.add_argument("--output", default="bench_results.json")
+
+    compare_parser = commands.add_parser("compare", help="compare two result files")
+    compare_parser.add_argument("baseline")
+    compare_parser.add_argument("current")
+    compare_parser.add_argument("--threshold", type=float, default=0.15)
+
+    args = parser.parse_args(argv)
+    if args.command == "run":
+        run(args)
+        return 0
+    return compare(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,140 @@
+"""
+Multi-user stress test: several processes writing to one database file at the same time.
+
+Each writer process runs a mix of operations for --seconds: quantity adjustments, versioned
+edits (read the version, then update_inventory(..., version=...)) and inserts. The harness
+reports throughput, stale edits and lock errors for each writer count, and checks that no
+adjustment was lost.
+
+    python benchmarks/stress_writers.py --writers 2 8 32 --seconds 5
+    python benchmarks/stress_writers.py --journal DELETE --db /mnt/share/Stress.db
+"""
+
+import argparse
+import multiprocessing
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+PARTS = 200
+
+
+def writer(index, path, journal, seconds, results):
+    os.environ["INVENTORY_DB"] = path
+    os.environ["INVENTORY_JOURNAL_MODE"] = journal
+    import database
+
+    rng = random.Random(index)
+    counts = {"ops": 0, "adjusted": 0, "stale": 0, "locked": 0, "other": 0}
+    latencies = []
+    deadline = time.perf_counter() + seconds
+    inserted = 0
+    while time.perf_counter() < deadline:
+        part_number = f"S-{rng.randrange(PARTS):04d}"
+        choice = rng.random()
+        start = time.perf_counter()
+        try:
+            if choice < 0.6:
+                database.adjust_quantity(part_number, 1)
+                counts["adjusted"] += 1
+            elif choice < 0.9:
+                version = database.fetch_version(part_number)
+                database.update_inventory(
+                    part_number,
+                    database.stock_as_of(part_number),
+                    f"Edited by writer {index}",
+                    version=version,
+                )
+            else:
+                inserted += 1
+                database.insert_part_numbers(f"W{index}-{inserted}", 1, "Stress part")
+            counts["ops"] += 1
+        except database.StaleEditError:
+            counts["stale"] += 1
+        except sqlite3.OperationalError as error:
+            counts["locked" if database._is_locked(error) else "other"] += 1
+        latencies.append(time.perf_counter() - start)
+    latencies.sort()
+    counts["p99"] = latencies[int(len(latencies) * 0.99)] if latencies else 0.0
+    results.put(counts)
+
+
+def run(writers, args):
+    with tempfile.TemporaryDirectory(prefix="inventory-stress-") as workdir:
+        path = args.db or os.path.join(workdir, "Stress.db")
+        os.environ["INVENTORY_DB"] = path
+        os.environ["INVENTORY_JOURNAL_MODE"] = args.journal
+        import database
+
+        database.set_db_path(path)
+        database.delete_all_inventory()
+        database.insert_many((f"S-{i:04d}", 0, "Stress part") for i in range(PARTS))
+        database.close_connections()
+
+        # Fresh interpreters, like separate users; nothing is inherited from this process.
+        context = multiprocessing.get_context("spawn")
+        results = context.Queue()
+        processes = [
+            context.Process(
+                target=writer, args=(i, path, args.journal, args.seconds, results)
+            )
+            for i in range(writers)
+        ]
+        start = time.perf_counter()
+        for process in processes:
+            process.start()
+        totals = [results.get() for _ in processes]
+        for process in processes:
+            process.join()
+        elapsed = time.perf_counter() - start
+
+        ops = sum(t["ops"] for t in totals)
+        adjusted = sum(t["adjusted"] for t in totals)
+        failed = sum(t["locked"] + t["other"] for t in totals)
+        stale = sum(t["stale"] for t in totals)
+        attempts = ops + failed + stale
+        stock = sum(database.stock_as_of(f"S-{i:04d}") for i in range(PARTS))
+        ledger = (
+            database.get_connection()
+            .execute(
+                "SELECT COALESCE(SUM(delta), 0) FROM Movements WHERE part_number LIKE 'S-%'"
+            )
+            .fetchone()[0]
+        )
+        database.close_connections()
+        if args.db:
+            database.set_db_path(path)
+            database.delete_all_inventory()
+            database.close_connections()
+
+    print(
+        f"{writers:>3} writers: {ops / elapsed:8.0f} ops/s, "
+        f"errors {failed / max(attempts, 1):6.2%} ({failed}), "
+        f"stale edits {stale / max(attempts, 1):6.2%}, "
+        f"p99 {max(t['p99'] for t in totals) * 1000:7.1f} ms, "
+        f"stock {stock} for {adjusted} adjustments "
+        f"({'ok' if stock == adjusted == ledger else 'LOST UPDATES'})"
+    )
+    return stock == adjusted == ledger
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--writers", type=int, nargs="+", default=[2, 8, 32])
+    parser.add_argument("--seconds", type=float, default=5.0)
+    parser.add_argument("--journal", default="WAL", help="WAL or DELETE")
+    parser.add_argument("--db", help="database file to use, e.g. on a network share")
+    args = parser.parse_args()
+
+    ok = all([run(writers, args) for writers in args.writers])
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
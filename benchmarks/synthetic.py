@@ -0,0 +1,114 @@
+"""
+Synthetic inventories for benchmarks.
+
+Part numbers and descriptions look like the ones in a real parts room (bearings, fasteners,
+electrical parts, ...) and are generated from a seed, so every run builds the same data.
+
+    python benchmarks/synthetic.py 100000 Inventory-100k.db
+"""
+
+import argparse
+import os
+import random
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+CATEGORIES = {
+    "Ball bearing": ["6204", "6205", "6206", "6305", "608"],
+    "Roller bearing": ["NU205", "NJ206", "22210"],
+    "Hex bolt": ["M6x20", "M8x25", "M10x40", "1/4-20x1"],
+    "Hex nut": ["M6", "M8", "M10", "3/8-16"],
+    "Flat washer": ["M6", "M8", "M10", "1/2in"],
+    "O-ring": ["10x2", "20x3", "-012", "-214"],
+    "V-belt": ["A32", "B45", "3L280"],
+    "Roller chain": ["#40", "#50", "#60"],
+    "Fuse": ["5A", "10A", "15A", "30A"],
+    "Relay": ["12VDC", "24VDC", "120VAC"],
+    "Proximity sensor": ["M12", "M18", "M30"],
+    "Hydraulic hose": ["1/4in", "3/8in", "1/2in"],
+    "Ball valve": ["1/2in", "3/4in", "1in"],
+    "Air filter": ["10x20x1", "16x25x2", "20x20x1"],
+}
+FINISHES = [
+    "zinc plated",
+    "stainless",
+    "2RS sealed",
+    "ZZ shielded",
+    "brass",
+    "nylon",
+    "steel",
+]
+BRANDS = [
+    "SKF",
+    "Timken",
+    "Gates",
+    "Parker",
+    "Bussmann",
+    "Omron",
+    "Grainger",
+    "McMaster",
+]
+
+
+def part_number(rng, index):
+    """A mix of the formats found in real inventories. index keeps every number unique."""
+    style = rng.random()
+    if style < 0.4:
+        return f"{rng.choice('ABCDEFGHJKLMNPRSTUVW')}{rng.choice('ABCDEFGHJKLMNPRSTUVW')}-{index:07d}"
+    if style < 0.7:
+        return f"{index:08d}"
+    if style < 0.9:
+        return f"{rng.choice(BRANDS)[:3].upper()}{index:06d}-{rng.choice(['2RS', 'ZZ', 'C3', 'SS'])}"
+    return f"{rng.randrange(100, 999)}-{index:06d}-{rng.randrange(10)}"
+
+
+def description(rng):
+    category = rng.choice(list(CATEGORIES))
+    size = rng.choice(CATEGORIES[category])
+    words = [category, size]
+    if rng.random() < 0.6:
+        words.append(rng.choice(FINISHES))
+    if rng.random() < 0.4:
+        words.append(rng.choice(BRANDS))
+    return " ".join(words)
+
+
+def quantity(rng):
+    # Most bins hold a few parts, some hold hundreds.
+    return min(int(rng.expovariate(1 / 12)), 5000)
+
+
+def generate_parts(count, seed=0):
+    """Yields count (part_number, quantity, description) rows."""
+    rng = random.Random(seed)
+    for index in range(count):
+        yield part_number(rng, index), quantity(rng), description(rng)
+
+
+def build_database(path, count, seed=0):
+    """Creates (or fills) an inventory database at path and points database.py at it."""
+    # Importing database.py opens INVENTORY_DB, so point it at path first.
+    os.environ.setdefault("INVENTORY_DB", os.fspath(path))
+    import database
+
+    database.set_db_path(path)
+    database.insert_many(generate_parts(count, seed))
+    return database
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Build a synthetic inventory database."
+    )
+    parser.add_argument("count", type=int)
+    parser.add_argument("path")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    build_database(args.path, args.count, args.seed)
+    print(f"Wrote {args.count} parts to {args.path}")
+
+
+if __name__ == "__main__":
+    main()
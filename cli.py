@@ -0,0 +1,290 @@
+"""
+Command line interface for the Parts Inventory application.
+
+Runs without a display and without the GUI packages, so it can be used from scripts, cron and
+servers:
+
+    python cli.py import parts.xlsx
+    python cli.py import count.csv --mode replace --dry-run
+    python cli.py export inventory.csv
+    python cli.py export changes.csv --changes
+    python cli.py search "hex bolt" --column description
+    python cli.py search --where "qty < 5 and desc ~ bearing"
+    python cli.py adjust AB-0001234 -- -3
+    python cli.py serve --port 8765
+    python cli.py backup --scheduled monthly
+    python cli.py restore backups/inventory-monthly-2026-09.db
+    python cli.py audit 50 --by quantity --out audit-2026-10.xlsx
+
+Use --db (or the INVENTORY_DB environment variable) to work on another database file.
+"""
+
+import argparse
+import csv
+import os
+import sys
+from datetime import datetime
+
+
+def import_command(args):
+    import excel
+
+    report = args.errors or excel.default_report_path(args.file)
+    result = excel.import_inventory(
+        args.file, report_path=report, mode=args.mode, dry_run=args.dry_run
+    )
+    if args.dry_run:
+        print("Dry run, nothing was imported. First changes:")
+        for part_number, old, new in result.preview:
+            print(f"  {part_number}: {'new' if old is None else old} -> {new}")
+    repeated = result.skipped - result.unchanged
+    print(
+        f"New: {result.inserted}  Changed: {result.updated}  "
+        f"Unchanged: {result.unchanged}  Rejected: {result.rejected}"
+        + (f"  Repeated in the file: {repeated}" if repeated else "")
+    )
+    if result.report:
+        print(f"Rejected rows are listed in {result.report}")
+    return 0
+
+
+def export_command(args):
+    import excel
+
+    if args.changes:
+        written = excel.export_changes(args.file, name=args.name)
+        print(f"Exported {written} changed parts to {args.file}")
+        return 0
+    written = excel.export_inventory(args.file)
+    print(f"Exported {written} parts to {args.file}")
+    return 0
+
+
+def search_command(args):
+    import database
+
+    if args.where:
+        import query
+
+        rows = query.search(args.text, limit=args.limit)
+    elif args.exact:
+        rows = database.search(args.column or "part_number", args.text)
+    else:
+        rows = database.search_text(args.text, column=args.column, limit=args.limit)
+    writer = csv.writer(sys.stdout, delimiter="\t", lineterminator="\n")
+    writer.writerows(rows)
+    return 0 if rows else 1
+
+
+def adjust_command(args):
+    import database
+
+    quantity = database.adjust_quantity(args.part_number, args.delta)
+    if quantity is None:
+        print(f"Part number {args.part_number} does not exist", file=sys.stderr)
+        return 1
+    print(f"{args.part_number}: {quantity}")
+    return 0
+
+
+def backup_command(args):
+    import backup
+
+    if args.list:
+        for path, period, label in backup.list_snapshots():
+            print(f"{period}\t{label}\t{path}")
+        return 0
+    if args.file:
+        result = backup.backup(args.file)
+    elif args.scheduled:
+        result = backup.scheduled_snapshot(args.scheduled)
+    else:
+        result = backup.snapshot()
+    print(f"Backed up {result}" if result else "This period's snapshot already exists")
+    return 0
+
+
+def restore_command(args):
+    import backup
+
+    result = backup.restore(args.file)
+    print(
+        f"Restored {result.path} ({result.bytes / 1e6:.1f} MB) "
+        f"in {result.seconds:.2f}s"
+    )
+    return 0
+
+
+def audit_command(args):
+    import audit
+
+    strata = None
+    if args.by == "quantity":
+        strata = audit.quantity_bands()
+    elif args.by == "description":
+        strata = audit.description_categories()
+    picked = audit.sample(
+        args.n,
+        seed=args.seed,
+        strata=strata,
+        allocation="equal" if args.equal else "proportional",
+    )
+    if args.out:
+        written = audit.export_count_sheet(picked, args.out, blind=not args.quantities)
+        print(f"Wrote {written} parts to {args.out} (seed {picked.seed})")
+        return 0
+    writer = csv.writer(sys.stdout, delimiter="\t", lineterminator="\n")
+    writer.writerows(picked.rows)
+    return 0
+
+
+def serve_command(args):
+    import server
+
+    server.serve(args.host, args.port, args.workers)
+    return 0
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        prog="inventory", description="Parts Inventory command line tools."
+    )
+    parser.add_argument(
+        "--db", help="database file (default: INVENTORY_DB or Inventory.db)"
+    )
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    command = commands.add_parser(
+        "import", help="import parts from an .xlsx or .csv file"
+    )
+    command.add_argument("file")
+    command.add_argument(
+        "--errors",
+        help="where to list rejected rows (default: e.g. parts.errors.csv next to FILE)",
+    )
+    command.add_argument(
+        "--mode",
+        choices=["skip", "replace", "add"],
+        default="skip",
+        help="what to do with parts that already exist: leave them (default), "
+        "replace their quantity or add to it",
+    )
+    command.add_argument(
+        "--dry-run",
+        action="store_true",
+        help="only show what the import would change",
+    )
+    command.set_defaults(func=import_command)
+
+    command = commands.add_parser(
+        "export", help="export the inventory to .xlsx or .csv"
+    )
+    command.add_argument("file")
+    command.add_argument(
+        "--changes",
+        action="store_true",
+        help="append only the parts changed since the last --changes export to FILE",
+    )
+    command.add_argument(
+        "--name",
+        default="export",
+        help="which --changes export this is, when several consumers keep their own log",
+    )
+    command.set_defaults(func=export_command)
+
+    command = commands.add_parser(
+        "search", help="full-text search, printed as tab separated rows"
+    )
+    command.add_argument("text")
+    command.add_argument("--column", choices=["part_number", "description"])
+    command.add_argument(
+        "--exact", action="store_true", help="match the whole value exactly"
+    )
+    command.add_argument(
+        "--where",
+        action="store_true",
+        help="TEXT is a query, e.g. 'qty < 5 and part ^= AB-' (see query.py)",
+    )
+    command.add_argument("--limit", type=int, default=100)
+    command.set_defaults(func=search_command)
+
+    command = commands.add_parser(
+        "adjust", help="add to (or take from) a part's quantity"
+    )
+    command.add_argument("part_number")
+    command.add_argument("delta", type=int)
+    command.set_defaults(func=adjust_command)
+
+    command = commands.add_parser(
+        "audit", help="pick parts at random for a stock count"
+    )
+    command.add_argument("n", type=int, help="number of parts to pick")
+    command.add_argument(
+        "--seed",
+        default=datetime.now().strftime("%Y-%m"),
+        help="the same seed picks the same parts (default: this month, e.g. 2026-10)",
+    )
+    command.add_argument(
+        "--by", choices=["quantity", "description"], help="stratify the sample"
+    )
+    command.add_argument(
+        "--equal",
+        action="store_true",
+        help="equal shares per stratum instead of shares by size",
+    )
+    command.add_argument("--out", help="write a count sheet (.csv or .xlsx)")
+    command.add_argument(
+        "--quantities",
+        action="store_true",
+        help="show the quantity on record on the count sheet",
+    )
+    command.set_defaults(func=audit_command)
+
+    command = commands.add_parser(
+        "backup", help="back up the database while it is in use"
+    )
+    command.add_argument(
+        "file", nargs="?", help="where to write the copy (default: a new snapshot)"
+    )
+    command.add_argument(
+        "--scheduled",
+        choices=["daily", "weekly", "monthly"],
+        help="take this period's snapshot if it has not been taken yet (for cron)",
+    )
+    command.add_argument("--list", action="store_true", help="list the snapshots")
+    command.set_defaults(func=backup_command)
+
+    command = commands.add_parser("restore", help="replace the database with a backup")
+    command.add_argument("file")
+    command.set_defaults(func=restore_command)
+
+    command = commands.add_parser("serve", help="run the HTTP/JSON service")
+    command.add_argument("--host", default="127.0.0.1")
+    command.add_argument("--port", type=int, default=8765)
+    command.add_argument("--workers", type=int, default=4)
+    command.set_defaults(func=serve_command)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    if args.db:
+        # Set before database.py is first imported so it never touches the default file.
+        os.environ["INVENTORY_DB"] = args.db
+    import database
+    import instrumentation
+
+    if args.db:
+        database.set_db_path(args.db)
+    instrumentation.install()
+    try:
+        return args.func(args)
+    except (OSError, ValueError) as error:
+        print(f"Error: {error}", file=sys.stderr)
+        return 1
+    finally:
+        database.close_connections()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
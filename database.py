@@ -1,94 +1,1407 @@
+import atexit
+import contextlib
+import functools
+import logging
+import os
+import queue
+import random
+import re
 import sqlite3
+import threading
+import time
+from collections import OrderedDict, namedtuple
+from concurrent.futures import Future
+from concurrent.futures import TimeoutError as FutureTimeout
+from datetime import datetime, timezone
 
+####################################################################################################
+# Connection settings.
+# The database file can be changed with the INVENTORY_DB environment variable or set_db_path().
+DB_PATH = os.environ.get("INVENTORY_DB", "Inventory.db")
+# WAL or DELETE. By default WAL, except for a file on a network share (see journal_mode()).
+JOURNAL_MODE = os.environ.get("INVENTORY_JOURNAL_MODE")
+# Number of prepared statements each connection keeps for reuse. The queries below are
+# constant strings so every call after the first one reuses the compiled statement.
+STATEMENT_CACHE_SIZE = 128
+# Most part numbers bound to one IN (...) query by the bulk functions.
+BATCH_SIZE = 500
 
-def create_table():
-    conn = sqlite3.connect("Inventory.db")
-    cursor = conn.cursor()
+# Several users can share one database file. SQLite waits up to BUSY_TIMEOUT seconds for another
+# writer's lock; if it is still locked, the write is retried WRITE_RETRIES times with jittered
+# exponential backoff (so waiting writers don't all retry at the same moment) before giving up.
+# On a network share the DELETE journal is used: WAL needs shared memory, which only works for
+# processes on the same machine.
+BUSY_TIMEOUT = float(os.environ.get("INVENTORY_BUSY_TIMEOUT", 5.0))
+WRITE_RETRIES = int(os.environ.get("INVENTORY_WRITE_RETRIES", 5))
+RETRY_BACKOFF = 0.05  # Seconds before the first retry; doubles each time ...
+RETRY_BACKOFF_MAX = 2.0  # ... up to this.
 
-    cursor.execute(
-        """
+# Every thread (the Tk mainloop and any worker threads) gets its own long-lived connection.
+# SQLite connections must not be used by two threads at the same time, so they are never shared.
+_local = threading.local()
+_connections = []
+_connections_lock = threading.Lock()
+_generation = 0
+
+
+def _open_connection(path):
+    conn = sqlite3.connect(
+        path,
+        timeout=BUSY_TIMEOUT,
+        check_same_thread=False,
+        cached_statements=STATEMENT_CACHE_SIZE,
+    )
+    mode = conn.execute(f"PRAGMA journal_mode={journal_mode(path)}").fetchone()[0]
+    if mode.lower() == "wal":
+        # NORMAL skips the fsync on every commit. The database stays consistent, and an
+        # application crash loses nothing, but a power loss or OS crash can roll back the
+        # last few commits.
+        conn.execute("PRAGMA synchronous=NORMAL")
+    return conn
+
+
+_MOUNTS = "/proc/mounts"
+# File systems of network shares, as /proc/mounts names them.
+_NETWORK_FILESYSTEMS = {
+    "9p",
+    "afs",
+    "ceph",
+    "cifs",
+    "davfs",
+    "fuse.sshfs",
+    "glusterfs",
+    "ncpfs",
+    "nfs",
+    "nfs4",
+    "smb3",
+    "smbfs",
+}
+
+
+def journal_mode(path=None):
+    """
+    The journal mode used for the database at path (default DB_PATH): JOURNAL_MODE if it is
+    set, otherwise DELETE on a network share and WAL anywhere else.
+    """
+    if JOURNAL_MODE:
+        return JOURNAL_MODE
+    return "DELETE" if _on_network_share(path or DB_PATH) else "WAL"
+
+
+@functools.lru_cache(maxsize=16)
+def _on_network_share(path):
+    path = os.path.realpath(path)
+    if os.name == "nt":
+        if path.startswith("\\\\"):
+            return True  # A UNC path, \\server\share.
+        import ctypes
+
+        drive = os.path.splitdrive(path)[0] + "\\"
+        return ctypes.windll.kernel32.GetDriveTypeW(drive) == 4  # DRIVE_REMOTE
+    try:
+        with open(_MOUNTS, encoding="utf-8") as mounts:
+            entries = [line.split()[1:3] for line in mounts]
+    except OSError:
+        # No /proc (e.g. macOS): set INVENTORY_JOURNAL_MODE=DELETE for a share.
+        return False
+    mount, filesystem = "", ""
+    for point, kind in entries:
+        point = point.replace("\\040", " ")
+        inside = path == point or path.startswith(point.rstrip("/") + "/")
+        # The longest mount point containing the path is the one it is on.
+        if inside and len(point) >= len(mount):
+            mount, filesystem = point, kind
+    return filesystem in _NETWORK_FILESYSTEMS
+
+
+def get_connection():
+    """Return the connection for the calling thread, opening it on first use."""
+    conn = getattr(_local, "conn", None)
+    if conn is None or _local.generation != _generation:
+        conn = _open_connection(DB_PATH)
+        with _connections_lock:
+            _connections.append(conn)
+            _local.generation = _generation
+        _local.conn = conn
+        _local.data_version = None
+    return conn
+
+
+def _begin(conn):
+    """
+    Starts a write transaction. BEGIN IMMEDIATE takes the write lock up front, so any wait for
+    another writer happens here (and shows up as lock wait in instrumentation.py) rather than
+    part way through the transaction.
+    """
+    for attempt in range(WRITE_RETRIES):
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            return
+        except sqlite3.OperationalError as error:
+            if not _is_locked(error):
+                raise
+            _backoff(attempt)
+    conn.execute("BEGIN IMMEDIATE")
+
+
+def _is_locked(error):
+    message = str(error).lower()
+    return "locked" in message or "busy" in message
+
+
+def _backoff(attempt):
+    time.sleep(random.uniform(0, min(RETRY_BACKOFF_MAX, RETRY_BACKOFF * 2**attempt)))
+
+
+def _retry(func):
+    """
+    Runs a whole write transaction again if it failed because the database was locked, e.g.
+    when the commit could not get the lock in time. func must be safe to run again, so it
+    must not call _notify(): a listener that hits a lock would otherwise repeat a write that
+    was already committed. Notify after the retried function returns.
+    """
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        for attempt in range(WRITE_RETRIES):
+            try:
+                return func(*args, **kwargs)
+            except sqlite3.OperationalError as error:
+                if not _is_locked(error):
+                    raise
+                _backoff(attempt)
+        return func(*args, **kwargs)
+
+    return wrapper
+
+
+def close_connections():
+    """Close every open connection. Threads reconnect on their next call."""
+    global _generation
+    with _connections_lock:
+        for conn in _connections:
+            conn.close()
+        _connections.clear()
+        _generation += 1
+
+
+def set_db_path(path):
+    """Point the application at another database file and make sure the table exists."""
+    global DB_PATH
+    close_connections()
+    clear_cache()
+    DB_PATH = os.fspath(path)
+    create_table()
+
+
+atexit.register(close_connections)
+
+
+####################################################################################################
+# Change notifications.
+# Listeners are told which part numbers a write inserted, updated or deleted so views can patch
+# just those rows. reload is set when a write touched too many rows to list (imports, Delete All).
+# Listeners run on the thread that made the change, after it has been committed.
+
+Change = namedtuple("Change", ["inserted", "updated", "deleted", "reload"])
+
+_listeners = []
+_writes = 0  # Writes made through this module, for change_stamp().
+
+
+def add_listener(callback):
+    _listeners.append(callback)
+
+
+def remove_listener(callback):
+    _listeners.remove(callback)
+
+
+def _notify(inserted=(), updated=(), deleted=(), reload=False):
+    global _writes
+    _writes += 1
+    # Part numbers are stored as TEXT, so report them the way they come back from a query.
+    change = Change(
+        tuple(map(str, inserted)),
+        tuple(map(str, updated)),
+        tuple(map(str, deleted)),
+        reload,
+    )
+    _invalidate_cache()
+    _maybe_snapshot()
+    for callback in list(_listeners):
+        callback(change)
+
+
+def notify_reload():
+    """Tells listeners that anything may have changed, e.g. after a restore."""
+    _notify(reload=True)
+
+
+####################################################################################################
+# Read cache.
+# fetch_inventory(), count_inventory() and search results are kept in a small LRU cache. Entries
+# are stamped with a generation number that moves on whenever the data may have changed:
+#   - writes made through this module bump it straight away (see _notify), and
+#   - commits by any other connection or process are noticed through PRAGMA data_version,
+#     which SQLite changes on a connection whenever someone else has committed.
+# A cached result is only returned if nothing has been written since it was read.
+
+CACHE_SIZE = 64  # Most results kept.
+# Most rows kept across all results; bigger results are not cached.
+CACHE_MAX_ROWS = 200000
+
+_cache = OrderedDict()
+_cache_lock = threading.Lock()
+_cache_rows = 0
+_cache_generation = 0
+_cache_stats = {"hits": 0, "misses": 0, "invalidations": 0, "evictions": 0}
+
+
+def _invalidate_cache():
+    global _cache_generation
+    with _cache_lock:
+        _cache_generation += 1
+        _cache_stats["invalidations"] += 1
+
+
+def clear_cache():
+    global _cache_rows
+    with _cache_lock:
+        _cache.clear()
+        _cache_rows = 0
+
+
+def cache_info():
+    """Hit/miss statistics for the read cache."""
+    with _cache_lock:
+        return dict(_cache_stats, size=len(_cache), rows=_cache_rows)
+
+
+def _check_data_version():
+    """Returns the cache generation after checking whether another connection has written."""
+    version = get_connection().execute("PRAGMA data_version").fetchone()[0]
+    if _local.data_version != version:
+        # Also true the first time this connection looks: anything may have happened before.
+        _local.data_version = version
+        _invalidate_cache()
+    return _cache_generation
+
+
+def change_stamp():
+    """
+    A value that changes whenever the inventory may have changed, in this process or another
+    one. Cheap enough to check before every read, e.g. for HTTP ETags.
+
+    Only compare values from the same thread: each connection sees other connections' commits
+    through its own PRAGMA data_version, which does not move when nothing is written.
+    """
+    version = get_connection().execute("PRAGMA data_version").fetchone()[0]
+    return f"{_writes}.{version}"
+
+
+def _cached(key, query):
+    global _cache_rows
+    generation = _check_data_version()
+    with _cache_lock:
+        entry = _cache.get(key)
+        if entry is not None and entry[0] == generation:
+            _cache.move_to_end(key)
+            _cache_stats["hits"] += 1
+            return entry[1]
+        _cache_stats["misses"] += 1
+
+    value = query()
+    size = len(value) if isinstance(value, list) else 1
+    if size > CACHE_MAX_ROWS:
+        return value
+    with _cache_lock:
+        old = _cache.pop(key, None)
+        if old is not None:
+            _cache_rows -= old[2]
+        _cache[key] = (generation, value, size)
+        _cache_rows += size
+        while len(_cache) > CACHE_SIZE or _cache_rows > CACHE_MAX_ROWS:
+            _, (_, _, evicted) = _cache.popitem(last=False)
+            _cache_rows -= evicted
+            _cache_stats["evictions"] += 1
+    return value
+
+
+####################################################################################################
+# Inventory table.
+
+
+def create_table():
+    conn = get_connection()
+    with conn:
+        # Several processes may start at once; only one creates the schema.
+        _begin(conn)
+        conn.execute(
+            """
             CREATE TABLE IF NOT EXISTS Inventory (
             part_number TEXT PRIMARY KEY,
             quantity INTEGER,
             description TEXT) """
-    )
-    conn.commit()
-    conn.close()
+        )
+        columns = [row[1] for row in conn.execute("PRAGMA table_info(Inventory)")]
+        if "version" not in columns:
+            # Bumped on every change, for the optimistic check in update_inventory().
+            conn.execute(
+                "ALTER TABLE Inventory ADD COLUMN version INTEGER NOT NULL DEFAULT 0"
+            )
+        for statement in _SORT_INDEX_SQL:
+            conn.execute(statement)
+        _create_search_index(conn)
+        _create_ledger(conn)
+        _create_change_log(conn)
 
 
 def fetch_inventory():
-    conn = sqlite3.connect("Inventory.db")
-    cursor = conn.cursor()
-    cursor.execute("SELECT * FROM Inventory")
-    part_numbers = cursor.fetchall()
-    conn.close()
-    return part_numbers
+    # Copy, so callers can't change the cached list.
+    return list(_cached(("fetch_inventory",), _fetch_inventory))
 
 
-def insert_part_numbers(part_number, quantity, description):
-    conn = sqlite3.connect("Inventory.db")
-    cursor = conn.cursor()
-    cursor.execute(
-        "INSERT INTO Inventory (part_number, quantity, description) VALUES (?, ?, ?)",
-        (part_number, quantity, description),
+def _fetch_inventory():
+    cursor = get_connection().execute(
+        "SELECT part_number, quantity, description FROM Inventory"
+    )
+    return cursor.fetchall()
+
+
+def count_inventory():
+    return _cached(("count_inventory",), _count_inventory)
+
+
+def _count_inventory():
+    return get_connection().execute("SELECT COUNT(*) FROM Inventory").fetchone()[0]
+
+
+def iter_inventory(chunk_size=1000):
+    """Yields the inventory in lists of at most chunk_size rows, ordered by part number."""
+    cursor = get_connection().execute(
+        "SELECT part_number, quantity, description FROM Inventory ORDER BY part_number"
+    )
+    try:
+        while True:
+            rows = cursor.fetchmany(chunk_size)
+            if not rows:
+                break
+            yield rows
+    finally:
+        cursor.close()
+
+
+# Columns the inventory can be sorted by. Ties are broken by part number, so every row has a
+# unique sort key: the part number itself, or a (value, part number) pair for the other columns.
+# Each has an index on (column, part_number), so a sorted page is an index range scan too.
+SORT_COLUMNS = ("part_number", "quantity", "description")
+
+_SORT_INDEX_SQL = [
+    "CREATE INDEX IF NOT EXISTS Inventory_quantity ON Inventory (quantity, part_number)",
+    "CREATE INDEX IF NOT EXISTS Inventory_description "
+    "ON Inventory (description, part_number)",
+]
+
+
+def sort_key(row, order_by="part_number"):
+    """The key fetch_page() pages from for a (part_number, quantity, description) row."""
+    if order_by == "part_number":
+        return row[0]
+    return (row[SORT_COLUMNS.index(order_by)], row[0])
+
+
+def fetch_page(
+    after=None, before=None, limit=50, order_by="part_number", descending=False
+):
+    """
+    Keyset pagination. Returns up to limit rows that come after (or before) the given key,
+    sorted on order_by and then part number. With neither key the first page is returned.
+    Keys are as given by sort_key(): a part number when sorting by part number.
+    """
+    if order_by not in SORT_COLUMNS:
+        raise ValueError(f"Cannot sort by {order_by!r}")
+    key = after if before is None else before
+    # Which way to read in ascending order: towards the end of the table or the start.
+    forward = (before is None) != descending
+    order = "" if forward else " DESC"
+    if order_by == "part_number":
+        order_clause = f"part_number{order}"
+    else:
+        order_clause = f"{order_by}{order}, part_number{order}"
+    conn = get_connection()
+    rows = []
+    for where, params in _page_ranges(order_by, key, forward):
+        if len(rows) >= limit:
+            break
+        rows += conn.execute(
+            "SELECT part_number, quantity, description FROM Inventory "
+            f"WHERE {where} ORDER BY {order_clause} LIMIT ?",
+            params + [limit - len(rows)],
+        ).fetchall()
+    if before is not None:
+        rows.reverse()
+    return rows
+
+
+def _page_ranges(column, key, forward):
+    """(WHERE clause, parameters) for each index range to read, in the order they are reached."""
+    compare = ">" if forward else "<"
+    if column == "part_number":
+        if key is None:
+            return [("1", [])]
+        return [(f"part_number {compare} ?", [key])]
+    # NULLs sort before everything else (as in SQLite). A single WHERE that also allowed for
+    # them would stop SQLite using the index range, so the NULL rows and the rest are read
+    # with separate queries.
+    null = (f"{column} IS NULL", [])
+    not_null = (f"{column} IS NOT NULL", [])
+    if key is not None:
+        value, part_number = key
+        if value is None:
+            null = (f"{column} IS NULL AND part_number {compare} ?", [part_number])
+            not_null = not_null if forward else None
+        else:
+            not_null = (
+                f"({column}, part_number) {compare} (?, ?)",
+                [value, part_number],
+            )
+            null = None if forward else null
+    ranges = [null, not_null] if forward else [not_null, null]
+    return [where for where in ranges if where is not None]
+
+
+def part_number_at(offset):
+    """Returns the part number at a position in part number order (uses the primary key index)."""
+    return key_at(offset)
+
+
+def key_at(offset, order_by="part_number", descending=False):
+    """
+    Returns the sort key (see sort_key()) of the row at a position in the given order, reading
+    only the index for that column.
+    """
+    if order_by not in SORT_COLUMNS:
+        raise ValueError(f"Cannot sort by {order_by!r}")
+    order = " DESC" if descending else ""
+    if order_by == "part_number":
+        sql = f"SELECT part_number FROM Inventory ORDER BY part_number{order} LIMIT 1 OFFSET ?"
+    else:
+        sql = (
+            f"SELECT {order_by}, part_number FROM Inventory "
+            f"ORDER BY {order_by}{order}, part_number{order} LIMIT 1 OFFSET ?"
+        )
+    row = get_connection().execute(sql, (offset,)).fetchone()
+    if row is None:
+        return None
+    return row[0] if order_by == "part_number" else tuple(row)
+
+
+def fetch_parts(part_numbers):
+    """Returns the rows for the given part numbers, in part number order."""
+    part_numbers = list(part_numbers)
+    if not part_numbers:
+        return []
+    placeholders = ", ".join("?" * len(part_numbers))
+    return (
+        get_connection()
+        .execute(
+            "SELECT part_number, quantity, description FROM Inventory "
+            f"WHERE part_number IN ({placeholders}) ORDER BY part_number",
+            part_numbers,
+        )
+        .fetchall()
     )
-    conn.commit()
-    conn.close()
+
+
+def insert_part_numbers(part_number, quantity, description):
+    _insert_part_number(part_number, quantity, description)
+    _notify(inserted=[part_number])
+
+
+@_retry
+def _insert_part_number(part_number, quantity, description):
+    conn = get_connection()
+    with conn:
+        _begin(conn)
+        conn.execute(
+            "INSERT INTO Inventory (part_number, quantity, description) VALUES (?, ?, ?)",
+            (part_number, quantity, description),
+        )
+
+
+def insert_many(rows):
+    """
+    Inserts (part_number, quantity, description) rows in a single transaction.
+    Rows whose part number already exists are left alone. Returns the number inserted.
+    """
+    # A list, so the rows are still there if the transaction has to run again.
+    inserted = _insert_many(list(rows))
+    if inserted:
+        _notify(reload=True)
+    return inserted
+
+
+@_retry
+def _insert_many(rows):
+    conn = get_connection()
+    with conn:
+        _begin(conn)
+        cursor = conn.executemany(
+            "INSERT INTO Inventory (part_number, quantity, description) VALUES (?, ?, ?) "
+            "ON CONFLICT(part_number) DO NOTHING",
+            rows,
+        )
+    return max(cursor.rowcount, 0)
 
 
 def delete_inventory(part_number):
-    conn = sqlite3.connect("Inventory.db")
-    cursor = conn.cursor()
-    cursor.execute("DELETE FROM Inventory WHERE part_number = ?", (part_number,))
-    conn.commit()
-    conn.close()
+    if _delete_inventory(part_number):
+        _notify(deleted=[part_number])
+
+
+@_retry
+def _delete_inventory(part_number):
+    conn = get_connection()
+    with conn:
+        _begin(conn)
+        cursor = conn.execute(
+            "DELETE FROM Inventory WHERE part_number = ?", (part_number,)
+        )
+    return cursor.rowcount
+
+
+def delete_many(part_numbers):
+    """Deletes many parts in a single transaction. Returns the number deleted."""
+    deleted = _delete_many(list(dict.fromkeys(map(str, part_numbers))))
+    if deleted:
+        _notify(deleted=deleted)
+    return len(deleted)
+
+
+@_retry
+def _delete_many(part_numbers):
+    deleted = []
+    conn = get_connection()
+    with conn:
+        _begin(conn)
+        for start in range(0, len(part_numbers), BATCH_SIZE):
+            chunk = part_numbers[start : start + BATCH_SIZE]
+            placeholders = ", ".join("?" * len(chunk))
+            # RETURNING reports only the parts that existed, which is what listeners need.
+            deleted += conn.execute(
+                f"DELETE FROM Inventory WHERE part_number IN ({placeholders}) "
+                "RETURNING part_number",
+                chunk,
+            ).fetchall()
+    return [row[0] for row in deleted]
 
 
 def delete_all_inventory():
-    conn = sqlite3.connect("Inventory.db")
-    cursor = conn.cursor()
-    cursor.execute("DELETE FROM Inventory")
-    conn.commit()
-    conn.close()
+    _delete_all_inventory()
+    _notify(reload=True)
 
 
-def update_inventory(
-    part_number,
-    quantity,
-    description,
-):
-    conn = sqlite3.connect("Inventory.db")
-    cursor = conn.cursor()
-    cursor.execute(
-        "UPDATE Inventory SET quantity = ?, description = ? WHERE part_number = ?",
-        (
-            quantity,
-            description,
-            part_number,
-        ),
+@_retry
+def _delete_all_inventory():
+    conn = get_connection()
+    with conn:
+        _begin(conn)
+        conn.execute("DELETE FROM Inventory")
+
+
+class StaleEditError(Exception):
+    """The part was changed by someone else after the version being edited was read."""
+
+
+def update_inventory(part_number, quantity, description, version=None):
+    """
+    Overwrites a part's quantity and description. Returns the part's new version, or None if it
+    does not exist.
+
+    Pass the version read with fetch_version() when the edit was made to check that nobody
+    changed the part in the meantime; if they did, nothing is written and StaleEditError is
+    raised.
+    """
+    new_version = _update_inventory(part_number, quantity, description, version)
+    if new_version is not None:
+        _notify(updated=[part_number])
+    return new_version
+
+
+@_retry
+def _update_inventory(part_number, quantity, description, version):
+    conn = get_connection()
+    with conn:
+        _begin(conn)
+        row = conn.execute(
+            "UPDATE Inventory SET quantity = ?, description = ?, version = version + 1 "
+            "WHERE part_number = ? AND (? IS NULL OR version = ?) RETURNING version",
+            (quantity, description, part_number, version, version),
+        ).fetchone()
+        if row is None and version is not None:
+            current = conn.execute(
+                "SELECT version FROM Inventory WHERE part_number = ?", (part_number,)
+            ).fetchone()
+            if current is not None:
+                raise StaleEditError(
+                    f"Part {part_number} was changed by someone else "
+                    f"(version {current[0]}, edited version {version})"
+                )
+    return None if row is None else row[0]
+
+
+def fetch_version(part_number):
+    """Returns a part's version, which goes up by one on every change, or None."""
+    row = (
+        get_connection()
+        .execute("SELECT version FROM Inventory WHERE part_number = ?", (part_number,))
+        .fetchone()
     )
-    conn.commit()
-    conn.close()
+    return row[0] if row else None
+
+
+def update_many(rows):
+    """
+    Updates (part_number, quantity, description) rows in a single transaction. A quantity or
+    description of None leaves that field as it is. Returns the number of parts updated.
+    """
+    rows = list(rows)
+    updated = _update_many(rows)
+    if updated:
+        _notify(updated=[row[0] for row in rows])
+    return updated
+
+
+@_retry
+def _update_many(rows):
+    conn = get_connection()
+    with conn:
+        _begin(conn)
+        cursor = conn.executemany(
+            "UPDATE Inventory SET quantity = COALESCE(?, quantity), "
+            "description = COALESCE(?, description), version = version + 1 "
+            "WHERE part_number = ?",
+            (
+                (quantity, description, part_number)
+                for part_number, quantity, description in rows
+            ),
+        )
+    return max(cursor.rowcount, 0)
+
+
+def adjust_quantity(part_number, delta):
+    """
+    Adds delta (which may be negative) to a part's quantity with "quantity = quantity + ?", so
+    concurrent adjustments are never lost. Returns the new quantity, or None if the part does
+    not exist. The change is recorded in the Movements ledger.
+
+    Adjustments from all threads are committed together by one writer thread (see
+    _GroupCommitWriter), so many small adjustments share one transaction and one fsync.
+    """
+    return _writer.wait(_writer.submit(str(part_number), delta))
 
 
 def search(option, value):
-    conn = sqlite3.connect("Inventory.db")
-    cursor = conn.cursor()
-    query = f'SELECT * FROM Inventory WHERE "{option}" = ?'
-    cursor.execute(query, (value,))
-    results = cursor.fetchall()
-    conn.close()
-    return results
+    """Rows whose option column equals value. See query.py for anything more involved."""
+    if option not in SORT_COLUMNS:
+        raise ValueError(f"Cannot search column {option!r}")
+    return list(_cached(("search", option, value), lambda: _search(option, value)))
+
+
+def search_prefix(prefix, limit=100):
+    """
+    Part numbers starting with prefix (case-sensitive), in part number order. Runs as a range
+    scan on the primary key index, so it costs the same on any size of inventory.
+    """
+    prefix = str(prefix)
+    if not prefix:
+        return fetch_page(limit=limit)
+    key = ("search_prefix", prefix, limit)
+    return list(_cached(key, lambda: _search_prefix(prefix, limit)))
+
+
+def _search_prefix(prefix, limit):
+    # Every string starting with prefix sorts between prefix and prefix with its last
+    # character moved on by one.
+    end = prefix[:-1] + chr(ord(prefix[-1]) + 1)
+    return (
+        get_connection()
+        .execute(
+            "SELECT part_number, quantity, description FROM Inventory "
+            "WHERE part_number >= ? AND part_number < ? ORDER BY part_number LIMIT ?",
+            (prefix, end, limit),
+        )
+        .fetchall()
+    )
+
+
+@contextlib.contextmanager
+def interruptible(cancelled, every=1000):
+    """
+    Aborts any statement this thread runs inside the block as soon as cancelled() returns
+    true (checked every `every` SQLite instructions), e.g. a search that has gone stale while
+    it ran. The aborted statement raises sqlite3.OperationalError("interrupted").
+    """
+    conn = get_connection()
+    conn.set_progress_handler(lambda: bool(cancelled()), every)
+    try:
+        yield
+    finally:
+        conn.set_progress_handler(None, every)
+
+
+def _search(option, value):
+    # option is one of SORT_COLUMNS, each of which has an index.
+    query = (
+        f"SELECT part_number, quantity, description FROM Inventory WHERE {option} = ?"
+    )
+    cursor = get_connection().execute(query, (value,))
+    return cursor.fetchall()
+
+
+####################################################################################################
+# Merging imports.
+# merge_rows() loads the rows into a TEMP staging table first, which only this connection can see
+# and which takes no lock on the database, so reading and validating a big file never blocks other
+# writers. The diff summary and the merge itself are then each one set-based statement, run in a
+# single short write transaction.
+
+MERGE_MODES = ("skip", "replace", "add")
+PREVIEW_ROWS = 20  # Changes listed in MergeResult.preview.
+
+# new, changed and unchanged count parts. preview lists up to PREVIEW_ROWS of the new and changed
+# parts as (part_number, old quantity or None, new quantity).
+MergeResult = namedtuple("MergeResult", ["new", "changed", "unchanged", "preview"])
+
+# The quantity each mode leaves an existing part with: i is the part, s the staged row.
+_MERGED_QUANTITY = {
+    "skip": "i.quantity",
+    "replace": "s.quantity",
+    "add": "COALESCE(i.quantity, 0) + s.quantity",
+}
+_MERGE_CONFLICT = {
+    "skip": "DO NOTHING",
+    "replace": "DO UPDATE SET quantity = excluded.quantity, version = version + 1 "
+    "WHERE quantity IS NOT excluded.quantity",
+    "add": "DO UPDATE SET quantity = COALESCE(quantity, 0) + excluded.quantity, "
+    "version = version + 1 WHERE excluded.quantity != 0",
+}
+
+
+def merge_rows(rows, mode="skip", dry_run=False):
+    """
+    Merges (part_number, quantity, description) rows into the inventory in one transaction.
+    New parts are inserted; for parts that already exist, mode decides what happens:
+
+        skip     leave them as they are
+        replace  set their quantity to the one in rows (e.g. a stock count)
+        add      add the quantity in rows to theirs (e.g. goods received)
+
+    Descriptions of existing parts are never changed. A part number repeated in rows counts
+    once: with "add" the quantities are added up, otherwise the first row wins.
+
+    With dry_run the database is left untouched and the result says what would happen.
+    Returns a MergeResult.
+    """
+    if mode not in MERGE_MODES:
+        raise ValueError(f"Unknown merge mode {mode!r}; use one of {MERGE_MODES}")
+    conn = get_connection()
+    try:
+        _stage(conn, rows, mode)
+        result = _merge_staged(mode, dry_run)
+    finally:
+        with conn:
+            conn.execute("DELETE FROM temp.Staging")
+    if not dry_run and (result.new or result.changed):
+        _notify(reload=True)
+    return result
+
+
+def _stage(conn, rows, mode):
+    conn.execute(
+        "CREATE TEMP TABLE IF NOT EXISTS Staging ("
+        "part_number TEXT PRIMARY KEY, quantity INTEGER, description TEXT)"
+    )
+    if mode == "add":
+        conflict = "DO UPDATE SET quantity = quantity + excluded.quantity"
+    else:
+        conflict = "DO NOTHING"
+    with conn:
+        conn.execute("DELETE FROM temp.Staging")
+        conn.executemany(
+            "INSERT INTO temp.Staging (part_number, quantity, description) "
+            f"VALUES (?, ?, ?) ON CONFLICT(part_number) {conflict}",
+            rows,
+        )
+
+
+@_retry
+def _merge_staged(mode, dry_run):
+    merged = _MERGED_QUANTITY[mode]
+    conn = get_connection()
+    with conn:
+        if dry_run:
+            conn.execute("BEGIN")  # Both reads below see the same data.
+        else:
+            _begin(conn)
+        new, changed, unchanged = conn.execute(
+            "SELECT COUNT(*) - COUNT(i.part_number), "
+            f"COALESCE(SUM(i.part_number IS NOT NULL AND {merged} IS NOT i.quantity), 0), "
+            f"COALESCE(SUM(i.part_number IS NOT NULL AND {merged} IS i.quantity), 0) "
+            "FROM temp.Staging s LEFT JOIN Inventory i ON i.part_number = s.part_number"
+        ).fetchone()
+        preview = conn.execute(
+            f"SELECT s.part_number, i.quantity, COALESCE({merged}, s.quantity) "
+            "FROM temp.Staging s LEFT JOIN Inventory i ON i.part_number = s.part_number "
+            f"WHERE i.part_number IS NULL OR {merged} IS NOT i.quantity "
+            "ORDER BY s.part_number LIMIT ?",
+            (PREVIEW_ROWS,),
+        ).fetchall()
+        if dry_run:
+            conn.rollback()
+        else:
+            # "WHERE true" tells the parser that ON CONFLICT belongs to the INSERT.
+            conn.execute(
+                "INSERT INTO Inventory (part_number, quantity, description) "
+                "SELECT part_number, quantity, description FROM temp.Staging WHERE true "
+                f"ON CONFLICT(part_number) {_MERGE_CONFLICT[mode]}"
+            )
+    return MergeResult(new, changed, unchanged, preview)
+
+
+####################################################################################################
+# Full-text search.
+# Inventory_fts is an FTS5 index over part_number and description. It reads its text from the
+# Inventory table (external content) and is kept in sync by the triggers below. It is keyed on
+# the Inventory rowid, so run rebuild_search_index() after a VACUUM.
+
+FTS_AVAILABLE = True
+
+_SEARCH_INDEX_SQL = [
+    """
+    CREATE VIRTUAL TABLE Inventory_fts USING fts5(
+        part_number, description,
+        content='Inventory', content_rowid='rowid',
+        tokenize='unicode61 remove_diacritics 2', prefix='2 3')
+    """,
+    """
+    CREATE TRIGGER Inventory_fts_insert AFTER INSERT ON Inventory BEGIN
+        INSERT INTO Inventory_fts (rowid, part_number, description)
+        VALUES (new.rowid, new.part_number, new.description);
+    END
+    """,
+    """
+    CREATE TRIGGER Inventory_fts_delete AFTER DELETE ON Inventory BEGIN
+        INSERT INTO Inventory_fts (Inventory_fts, rowid, part_number, description)
+        VALUES ('delete', old.rowid, old.part_number, old.description);
+    END
+    """,
+    """
+    CREATE TRIGGER Inventory_fts_update AFTER UPDATE OF part_number, description
+    ON Inventory BEGIN
+        INSERT INTO Inventory_fts (Inventory_fts, rowid, part_number, description)
+        VALUES ('delete', old.rowid, old.part_number, old.description);
+        INSERT INTO Inventory_fts (rowid, part_number, description)
+        VALUES (new.rowid, new.part_number, new.description);
+    END
+    """,
+]
+
+
+def _create_search_index(conn):
+    global FTS_AVAILABLE
+    exists = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE name = 'Inventory_fts'"
+    ).fetchone()
+    if exists:
+        return
+    try:
+        for statement in _SEARCH_INDEX_SQL:
+            conn.execute(statement)
+    except sqlite3.OperationalError:
+        # This SQLite was built without FTS5. search_text() falls back to LIKE.
+        FTS_AVAILABLE = False
+        return
+    conn.execute("INSERT INTO Inventory_fts (Inventory_fts) VALUES ('rebuild')")
+
+
+@_retry
+def rebuild_search_index():
+    conn = get_connection()
+    with conn:
+        _begin(conn)
+        conn.execute("INSERT INTO Inventory_fts (Inventory_fts) VALUES ('rebuild')")
+
+
+def fts_query(text, column=None):
+    """
+    Turns what the user typed into an FTS5 query. Text in double quotes is matched as an exact
+    phrase; every other word matches as a prefix, so "bear" finds "Ball bearing 6204" and
+    "AB-12" finds "AB-1234". All terms must match.
+    """
+    terms = []
+    for phrase, word in re.findall(r'"([^"]*)"|(\S+)', text):
+        tokens = re.findall(r"\w+", phrase or word)
+        if tokens:
+            terms.append('"' + " ".join(tokens) + '"' + ("" if phrase else "*"))
+    if not terms:
+        return None
+    query = " ".join(terms)
+    if column:
+        query = f"{column} : ({query})"
+    return query
+
+
+def search_text(text, column=None, limit=100, ranked=True):
+    """
+    Ranked full-text search over part numbers and descriptions (or just one column).
+    Returns at most limit rows, best matches first.
+
+    Ranking has to score every match before the first row comes back, which is slow for short
+    prefixes on a large inventory. With ranked=False the first limit matches are returned as
+    soon as they are found (in the order they were added), for search-as-you-type.
+    """
+    if column not in (None, "part_number", "description"):
+        raise ValueError(f"Cannot search column {column!r}")
+    key = ("search_text", text, column, limit, ranked)
+    return list(_cached(key, lambda: _search_text(text, column, limit, ranked)))
+
+
+def _search_text(text, column, limit, ranked):
+    if not FTS_AVAILABLE:
+        return _search_like(text, column, limit)
+    query = fts_query(text, column)
+    if query is None:
+        return []
+    if ranked:
+        sql = (
+            "SELECT i.part_number, i.quantity, i.description "
+            "FROM Inventory_fts JOIN Inventory i ON i.rowid = Inventory_fts.rowid "
+            "WHERE Inventory_fts MATCH ? ORDER BY rank LIMIT ?"
+        )
+    else:
+        sql = (
+            "SELECT i.part_number, i.quantity, i.description "
+            "FROM Inventory_fts JOIN Inventory i ON i.rowid = Inventory_fts.rowid "
+            "WHERE Inventory_fts MATCH ? LIMIT ?"
+        )
+    return get_connection().execute(sql, (query, limit)).fetchall()
+
+
+def _search_like(text, column, limit):
+    columns = [column] if column else ["part_number", "description"]
+    where, params = [], []
+    for word in text.split():
+        where.append("(" + " OR ".join(f"{c} LIKE ?" for c in columns) + ")")
+        params += [f"%{word}%"] * len(columns)
+    if not where:
+        return []
+    return (
+        get_connection()
+        .execute(
+            "SELECT part_number, quantity, description FROM Inventory "
+            f"WHERE {' AND '.join(where)} ORDER BY part_number LIMIT ?",
+            params + [limit],
+        )
+        .fetchall()
+    )
+
+
+####################################################################################################
+# Stock ledger.
+# Triggers append every change to a quantity to Movements, whichever function (or program) made
+# it, so the history cannot miss a write. StockSnapshots records each part's quantity at one of
+# its movements; stock_as_of() starts from the latest snapshot before the requested time and only
+# adds up the movements after it, instead of replaying the whole history.
+
+SNAPSHOT_EVERY = 10000  # Movements between automatic snapshots.
+GROUP_COMMIT_MAX = 500  # Most adjustments committed in one transaction.
+# Seconds between checks that the writer thread is still running while waiting for it.
+WRITER_POLL = 1.0
+
+_writer_log = logging.getLogger("inventory.writer")
+
+_LEDGER_SQL = [
+    """
+    CREATE TABLE Movements (
+        id INTEGER PRIMARY KEY,
+        part_number TEXT NOT NULL,
+        delta INTEGER NOT NULL,
+        created_at TEXT NOT NULL DEFAULT (strftime('%Y-%m-%d %H:%M:%f', 'now')))
+    """,
+    "CREATE INDEX Movements_part ON Movements (part_number, id)",
+    """
+    CREATE TABLE StockSnapshots (
+        part_number TEXT NOT NULL,
+        movement_id INTEGER NOT NULL,
+        taken_at TEXT NOT NULL,
+        quantity INTEGER NOT NULL,
+        PRIMARY KEY (part_number, movement_id)) WITHOUT ROWID
+    """,
+    "CREATE INDEX StockSnapshots_movement ON StockSnapshots (movement_id)",
+    """
+    CREATE TRIGGER Movements_insert AFTER INSERT ON Inventory
+    WHEN COALESCE(new.quantity, 0) != 0 BEGIN
+        INSERT INTO Movements (part_number, delta) VALUES (new.part_number, new.quantity);
+    END
+    """,
+    """
+    CREATE TRIGGER Movements_delete AFTER DELETE ON Inventory
+    WHEN COALESCE(old.quantity, 0) != 0 BEGIN
+        INSERT INTO Movements (part_number, delta) VALUES (old.part_number, -old.quantity);
+    END
+    """,
+    """
+    CREATE TRIGGER Movements_update AFTER UPDATE OF quantity ON Inventory
+    WHEN new.quantity IS NOT old.quantity BEGIN
+        INSERT INTO Movements (part_number, delta)
+        VALUES (new.part_number, COALESCE(new.quantity, 0) - COALESCE(old.quantity, 0));
+    END
+    """,
+]
+
+
+def _create_ledger(conn):
+    exists = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE name = 'Movements'"
+    ).fetchone()
+    if exists:
+        return
+    for statement in _LEDGER_SQL:
+        conn.execute(statement)
+    # Parts that were already in the database start the ledger with their current quantity.
+    conn.execute(
+        "INSERT INTO Movements (part_number, delta) "
+        "SELECT part_number, quantity FROM Inventory WHERE COALESCE(quantity, 0) != 0"
+    )
+
+
+@_retry
+def take_snapshot():
+    """
+    Records the current quantity of every part that has moved since the last snapshot.
+    Returns the number of snapshot rows written.
+    """
+    conn = get_connection()
+    with conn:
+        _begin(conn)
+        cursor = conn.execute(
+            "INSERT INTO StockSnapshots (part_number, movement_id, taken_at, quantity) "
+            "SELECT m.part_number, MAX(m.id), MAX(m.created_at), COALESCE(i.quantity, 0) "
+            "FROM Movements m LEFT JOIN Inventory i ON i.part_number = m.part_number "
+            "WHERE m.id > (SELECT COALESCE(MAX(movement_id), 0) FROM StockSnapshots) "
+            "GROUP BY m.part_number"
+        )
+    return max(cursor.rowcount, 0)
+
+
+def _maybe_snapshot():
+    conn = get_connection()
+    movements, snapshot = conn.execute(
+        "SELECT (SELECT COALESCE(MAX(id), 0) FROM Movements), "
+        "(SELECT COALESCE(MAX(movement_id), 0) FROM StockSnapshots)"
+    ).fetchone()
+    if movements - snapshot >= SNAPSHOT_EVERY:
+        try:
+            take_snapshot()
+        except sqlite3.OperationalError as error:
+            # Only an optimisation; the next write tries again.
+            if not _is_locked(error):
+                raise
+
+
+def stock_as_of(part_number, when=None):
+    """
+    Returns a part's quantity at a point in time (a datetime, or an ISO string in UTC), or its
+    current quantity when when is None. A part that did not exist yet has a quantity of 0.
+    """
+    conn = get_connection()
+    if when is None:
+        row = conn.execute(
+            "SELECT quantity FROM Inventory WHERE part_number = ?", (part_number,)
+        ).fetchone()
+        return row[0] if row else 0
+    when = _timestamp(when)
+    snapshot = conn.execute(
+        "SELECT movement_id, quantity FROM StockSnapshots "
+        "WHERE part_number = ? AND taken_at <= ? ORDER BY movement_id DESC LIMIT 1",
+        (part_number, when),
+    ).fetchone()
+    movement_id, quantity = snapshot or (0, 0)
+    (delta,) = conn.execute(
+        "SELECT COALESCE(SUM(delta), 0) FROM Movements "
+        "WHERE part_number = ? AND id > ? AND created_at <= ?",
+        (part_number, movement_id, when),
+    ).fetchone()
+    return quantity + delta
+
+
+def fetch_movements(part_number, limit=100):
+    """The most recent movements of a part as (id, delta, created_at) rows, newest first."""
+    return (
+        get_connection()
+        .execute(
+            "SELECT id, delta, created_at FROM Movements WHERE part_number = ? "
+            "ORDER BY id DESC LIMIT ?",
+            (part_number, limit),
+        )
+        .fetchall()
+    )
+
+
+def _timestamp(when):
+    # Movements.created_at is UTC in SQLite's "YYYY-MM-DD HH:MM:SS.SSS" format.
+    if isinstance(when, datetime):
+        if when.tzinfo is not None:
+            when = when.astimezone(timezone.utc).replace(tzinfo=None)
+        return when.isoformat(sep=" ", timespec="milliseconds")
+    return str(when).replace("T", " ")
+
+
+class _GroupCommitWriter:
+    """
+    Applies quantity adjustments on one background thread. While a transaction is being
+    committed, new adjustments queue up and then all go into the next transaction together
+    (group commit), so a burst of adjustments costs a few commits instead of one each. A
+    single adjustment is committed straight away.
+    """
+
+    def __init__(self):
+        self._queue = queue.SimpleQueue()
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def submit(self, part_number, delta):
+        future = Future()
+        self._queue.put((part_number, delta, future))
+        self._ensure_running()
+        return future
+
+    def wait(self, future):
+        """The future's result. Restarts the thread if it stopped with adjustments queued."""
+        while True:
+            try:
+                return future.result(timeout=WRITER_POLL)
+            except FutureTimeout:
+                self._ensure_running()
+
+    def _ensure_running(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(
+                    target=self._run, name="inventory-writer", daemon=True
+                )
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            while len(batch) < GROUP_COMMIT_MAX:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                self._commit(batch)
+            except Exception as error:
+                # Keep the thread alive for the next batch; nobody may wait forever.
+                _writer_log.exception("Adjustments failed")
+                for *_, future in batch:
+                    if not future.done():
+                        future.set_exception(error)
+
+    def _commit(self, batch):
+        try:
+            results = self._apply(batch)
+        except Exception as error:
+            for *_, future in batch:
+                future.set_exception(error)
+            return
+        updated = [
+            item[0]
+            for item, result in zip(batch, results)
+            if result is not None and not isinstance(result, Exception)
+        ]
+        if updated:
+            # Committed whatever a listener does; the callers still get their results.
+            try:
+                _notify(updated=updated)
+            except Exception:
+                _writer_log.exception("A listener failed after adjusting quantities")
+        for (_, _, future), result in zip(batch, results):
+            if isinstance(result, Exception):
+                future.set_exception(result)
+            else:
+                future.set_result(None if result is None else result[0])
+
+    @staticmethod
+    @_retry
+    def _apply(batch):
+        """
+        Runs each adjustment in its own savepoint, so a bad one (a delta that does not fit in
+        64 bits, say) fails on its own and the rest of the batch is still committed. Returns
+        the RETURNING row, None or the exception for each adjustment.
+        """
+        conn = get_connection()
+        results = []
+        with conn:
+            _begin(conn)
+            for part_number, delta, _ in batch:
+                conn.execute("SAVEPOINT adjustment")
+                try:
+                    row = conn.execute(
+                        "UPDATE Inventory SET quantity = quantity + ?, "
+                        "version = version + 1 WHERE part_number = ? RETURNING quantity",
+                        (delta, part_number),
+                    ).fetchone()
+                except (sqlite3.Error, OverflowError, TypeError) as error:
+                    if isinstance(error, sqlite3.OperationalError) and _is_locked(
+                        error
+                    ):
+                        raise  # The whole transaction is retried.
+                    conn.execute("ROLLBACK TO adjustment")
+                    row = error
+                conn.execute("RELEASE adjustment")
+                results.append(row)
+        return results
+
+
+_writer = _GroupCommitWriter()
+
+
+####################################################################################################
+# Change log for delta exports.
+# Triggers append the part number to ChangeLog whenever a part is inserted, deleted or has its
+# quantity or description changed, in commit order (only one transaction writes at a time).
+# ExportWatermarks remembers the last ChangeLog.seq each named export has written, so the next
+# one only reads the log after it: its cost follows the number of changes, not the table size.
+
+_CHANGE_LOG_SQL = [
+    """
+    CREATE TABLE ChangeLog (
+        seq INTEGER PRIMARY KEY,
+        part_number TEXT NOT NULL,
+        op TEXT NOT NULL,
+        changed_at TEXT NOT NULL DEFAULT (strftime('%Y-%m-%d %H:%M:%f', 'now')))
+    """,
+    """
+    CREATE TABLE ExportWatermarks (
+        name TEXT PRIMARY KEY,
+        seq INTEGER NOT NULL,
+        exported_at TEXT NOT NULL)
+    """,
+    """
+    CREATE TRIGGER ChangeLog_insert AFTER INSERT ON Inventory BEGIN
+        INSERT INTO ChangeLog (part_number, op) VALUES (new.part_number, 'insert');
+    END
+    """,
+    """
+    CREATE TRIGGER ChangeLog_delete AFTER DELETE ON Inventory BEGIN
+        INSERT INTO ChangeLog (part_number, op) VALUES (old.part_number, 'delete');
+    END
+    """,
+    # Version-only updates are not changes. A renamed part is a delete and an insert.
+    """
+    CREATE TRIGGER ChangeLog_update AFTER UPDATE OF part_number, quantity, description
+    ON Inventory WHEN new.part_number IS NOT old.part_number
+        OR new.quantity IS NOT old.quantity OR new.description IS NOT old.description BEGIN
+        INSERT INTO ChangeLog (part_number, op)
+        SELECT old.part_number, 'delete' WHERE new.part_number IS NOT old.part_number;
+        INSERT INTO ChangeLog (part_number, op)
+        VALUES (new.part_number,
+                CASE WHEN new.part_number IS old.part_number THEN 'update' ELSE 'insert' END);
+    END
+    """,
+]
+
+
+def _create_change_log(conn):
+    exists = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE name = 'ChangeLog'"
+    ).fetchone()
+    if exists:
+        return
+    for statement in _CHANGE_LOG_SQL:
+        conn.execute(statement)
+    # Parts that were already in the database count as inserted, so the first delta export
+    # has everything.
+    conn.execute(
+        "INSERT INTO ChangeLog (part_number, op) "
+        "SELECT part_number, 'insert' FROM Inventory ORDER BY part_number"
+    )
+
+
+def change_seq():
+    """The sequence number of the latest change, to pass to iter_changes() as until."""
+    return get_connection().execute("SELECT MAX(seq) FROM ChangeLog").fetchone()[0] or 0
+
+
+def fetch_watermark(name):
+    """The last change written by the export called name, or 0 if it has never run."""
+    row = (
+        get_connection()
+        .execute("SELECT seq FROM ExportWatermarks WHERE name = ?", (name,))
+        .fetchone()
+    )
+    return row[0] if row else 0
+
+
+@_retry
+def set_watermark(name, seq):
+    conn = get_connection()
+    with conn:
+        _begin(conn)
+        conn.execute(
+            "INSERT INTO ExportWatermarks (name, seq, exported_at) "
+            "VALUES (?, ?, strftime('%Y-%m-%d %H:%M:%f', 'now')) "
+            "ON CONFLICT(name) DO UPDATE SET seq = excluded.seq, "
+            "exported_at = excluded.exported_at",
+            (name, seq),
+        )
+
+
+def iter_changes(since=0, until=None, chunk_size=1000):
+    """
+    Yields the parts changed after change since and up to change until (default: now), in
+    lists of at most chunk_size (part_number, quantity, description, change, changed_at) rows,
+    in the order of their last change. Each part appears once, with its current values:
+
+        insert  the part is new since then
+        update  the part existed then and still does
+        delete  the part existed then and has been deleted (quantity and description are None)
+
+    A part added and deleted again in between is left out.
+    """
+    conn = get_connection()
+    cursor = conn.execute(
+        "SELECT c.part_number, i.quantity, i.description, "
+        "CASE WHEN i.part_number IS NULL THEN 'delete' "
+        "WHEN f.op = 'insert' THEN 'insert' ELSE 'update' END, c.changed_at "
+        "FROM (SELECT part_number, MIN(seq) AS first, MAX(seq) AS last, "
+        "      MAX(changed_at) AS changed_at FROM ChangeLog "
+        "      WHERE seq > ? AND seq <= ? GROUP BY part_number) c "
+        "JOIN ChangeLog f ON f.seq = c.first "
+        "LEFT JOIN Inventory i ON i.part_number = c.part_number "
+        "WHERE i.part_number IS NOT NULL OR f.op != 'insert' "
+        "ORDER BY c.last",
+        (since, change_seq() if until is None else until),
+    )
+    try:
+        while True:
+            rows = cursor.fetchmany(chunk_size)
+            if not rows:
+                break
+            yield rows
+    finally:
+        cursor.close()
 
 
 def part_numbers_exists(part_number):
-    conn = sqlite3.connect("Inventory.db")
-    cursor = conn.cursor()
-    cursor.execute(
+    cursor = get_connection().execute(
         "SELECT COUNT(*) FROM Inventory WHERE part_number = ?", (part_number,)
     )
     result = cursor.fetchone()
-    conn.close()
     return result[0] > 0
 
 
@@ -0,0 +1,449 @@
+"""
+Excel import and export for the Parts Inventory application.
+
+Spreadsheets use the same table format as the application: Part Number, Quantity, Description.
+pandas and openpyxl are imported on first use, so importing this module stays cheap for code
+that never touches a spreadsheet.
+"""
+
+import csv
+import os
+from collections import namedtuple
+from pathlib import Path
+
+import database
+
+COLUMNS = ["Part Number", "Quantity", "Description"]
+# Delta exports add what happened to each part (insert, update or delete) and when.
+CHANGE_COLUMNS = COLUMNS + ["Change", "Changed At"]
+# Rows read from the database per round trip while exporting.
+EXPORT_CHUNK_SIZE = 5000
+
+# Rows validated and written per chunk while importing.
+IMPORT_CHUNK_SIZE = 5000
+REPORT_COLUMNS = ["Row", "Part Number", "Quantity", "Description", "Reason"]
+
+# report is the path of the error report, or None when no row was rejected. updated, unchanged
+# and preview are the merge summary, see database.merge_rows().
+ImportResult = namedtuple(
+    "ImportResult",
+    ["inserted", "skipped", "rejected", "report", "updated", "unchanged", "preview"],
+    defaults=[None, 0, 0, ()],
+)
+
+
+def import_inventory(
+    file_path,
+    progress=None,
+    report_path=None,
+    chunk_size=IMPORT_CHUNK_SIZE,
+    mode="skip",
+    dry_run=False,
+):
+    """Imports a CSV file when the file name ends in .csv and an Excel workbook otherwise."""
+    if Path(file_path).suffix.lower() == ".csv":
+        return import_csv(file_path, progress, report_path, chunk_size, mode, dry_run)
+    return import_excel(file_path, progress, report_path, chunk_size, mode, dry_run)
+
+
+def import_excel(
+    file_path,
+    progress=None,
+    report_path=None,
+    chunk_size=IMPORT_CHUNK_SIZE,
+    mode="skip",
+    dry_run=False,
+):
+    """
+    Imports a workbook in one transaction, reading it a chunk at a time so a large file is
+    never held in memory. Rejected rows are listed in report_path; mode and dry_run are
+    described in import_chunks(). Returns an ImportResult.
+    """
+    from openpyxl import load_workbook
+
+    workbook = load_workbook(file_path, read_only=True, data_only=True)
+    try:
+        sheet = workbook.active
+        # The sheet's own idea of its size; only used for the progress bar.
+        total = max(0, (sheet.max_row or 1) - 1)
+        return import_chunks(
+            _read_sheet(sheet, chunk_size), progress, report_path, total, mode, dry_run
+        )
+    finally:
+        workbook.close()
+
+
+def import_csv(
+    file_path,
+    progress=None,
+    report_path=None,
+    chunk_size=IMPORT_CHUNK_SIZE,
+    mode="skip",
+    dry_run=False,
+):
+    """Same as import_excel() for a CSV file with the same columns."""
+    import pandas as pd
+
+    # Every cell is read as text so that "00123" and "five" reach validation unchanged.
+    # Blank lines are dropped below, after numbering, so row numbers match the file's lines.
+    chunks = pd.read_csv(
+        file_path,
+        dtype=str,
+        encoding="utf-8",
+        chunksize=chunk_size,
+        skip_blank_lines=False,
+    )
+    total = _count_lines(file_path) - 1 if progress else None
+    with chunks:
+        return import_chunks(
+            # Row numbers as a spreadsheet shows them: the header is row 1. Header names and
+            # empty rows are treated as in _read_sheet().
+            (
+                chunk.rename(columns=lambda name: str(name).strip())
+                .set_axis(chunk.index + 2)
+                .dropna(how="all")
+                for chunk in chunks
+            ),
+            progress,
+            report_path,
+            total,
+            mode,
+            dry_run,
+        )
+
+
+def import_dataframe(df, progress=None, report_path=None, mode="skip", dry_run=False):
+    """Imports a DataFrame with the spreadsheet columns. Row 1 is taken to be the header."""
+    return import_chunks(
+        [df.set_axis(range(2, len(df) + 2))],
+        progress,
+        report_path,
+        mode=mode,
+        dry_run=dry_run,
+    )
+
+
+def import_chunks(
+    chunks, progress=None, report_path=None, total=None, mode="skip", dry_run=False
+):
+    """
+    Validates each DataFrame chunk with vectorized pandas operations and merges the valid
+    rows into the inventory with database.merge_rows(), which also says what mode does with
+    parts that already exist. The chunks' index holds the spreadsheet row numbers.
+    progress(rows_read, total_rows) is called after each chunk; if it raises, nothing is
+    imported. With dry_run nothing is imported either, and the result says what would be.
+
+    inserted:  new parts.
+    updated:   existing parts whose quantity was changed ("replace" and "add").
+    unchanged: existing parts left as they were.
+    skipped:   valid rows that changed nothing: those for unchanged parts and repeated part
+               numbers inside the file.
+    rejected:  rows missing a field or with a quantity that is not a whole number. When
+               report_path is given they are written there as CSV, with the reason.
+    """
+    counts = {"read": 0, "valid": 0, "rejected": 0}
+    report = _ErrorReport(report_path)
+
+    def rows():
+        for chunk in chunks:
+            clean, rejects = validate_chunk(chunk)
+            counts["read"] += len(chunk)
+            counts["valid"] += len(clean)
+            counts["rejected"] += len(rejects)
+            report.write(rejects)
+            # Repeated part numbers are left to the merge.
+            yield from zip(
+                clean["part_number"].tolist(),
+                clean["quantity"].tolist(),
+                clean["description"].tolist(),
+            )
+            if progress:
+                progress(counts["read"], max(total or 0, counts["read"]) or None)
+
+    try:
+        merged = database.merge_rows(rows(), mode, dry_run)
+    except BaseException:
+        report.discard()
+        raise
+    report.close()
+    return ImportResult(
+        inserted=merged.new,
+        skipped=counts["valid"] - merged.new - merged.changed,
+        rejected=counts["rejected"],
+        report=report.path if counts["rejected"] else None,
+        updated=merged.changed,
+        unchanged=merged.unchanged,
+        preview=merged.preview,
+    )
+
+
+def validate_chunk(df):
+    """
+    Normalizes one chunk: trims part numbers and descriptions and converts quantities to
+    whole numbers. Returns (clean, rejects): clean has part_number, quantity and description
+    columns; rejects has the REPORT_COLUMNS, with the chunk's index as the row number.
+    """
+    import numpy as np
+    import pandas as pd
+
+    missing = [column for column in COLUMNS if column not in df.columns]
+    if missing:
+        raise ValueError(f"Missing column(s): {', '.join(missing)}")
+
+    part_numbers = df["Part Number"].astype("string").str.strip()
+    descriptions = df["Description"].astype("string").str.strip()
+    raw_quantities = df["Quantity"].astype("string").str.strip()
+    quantities = pd.to_numeric(df["Quantity"], errors="coerce").astype("float64")
+
+    problems = [
+        (part_numbers.fillna("").eq(""), "Part Number is empty"),
+        (descriptions.fillna("").eq(""), "Description is empty"),
+        (raw_quantities.fillna("").eq(""), "Quantity is empty"),
+        (quantities.isna(), "Quantity is not a number"),
+        (quantities.mod(1).ne(0), "Quantity is not a whole number"),
+        (quantities.abs().ge(2.0**63), "Quantity is too large"),
+    ]
+    reasons = pd.Series(
+        np.select(
+            [condition.to_numpy(dtype=bool) for condition, _ in problems],
+            [reason for _, reason in problems],
+            default="",
+        ),
+        index=df.index,
+    )
+    valid = reasons.eq("")
+
+    clean = pd.DataFrame(
+        {
+            "part_number": part_numbers[valid].astype(object),
+            "quantity": quantities[valid].astype("int64"),
+            "description": descriptions[valid].astype(object),
+        }
+    )
+    rejects = pd.DataFrame(
+        {
+            "Row": df.index[~valid],
+            "Part Number": df["Part Number"][~valid],
+            "Quantity": df["Quantity"][~valid],
+            "Description": df["Description"][~valid],
+            "Reason": reasons[~valid],
+        }
+    )
+    return clean, rejects
+
+
+def default_report_path(file_path):
+    """Where the rejected rows of an import of file_path are listed: parts.errors.csv."""
+    path = Path(file_path)
+    return path.with_name(path.stem + ".errors.csv")
+
+
+class _ErrorReport:
+    """CSV file of rejected rows, created when the first one is written."""
+
+    def __init__(self, path):
+        self.path = path
+        self._handle = None
+        self._writer = None
+
+    def write(self, rejects):
+        if self.path is None or rejects.empty:
+            return
+        if self._handle is None:
+            self._handle = open(self.path, "w", newline="", encoding="utf-8")
+            self._writer = csv.writer(self._handle)
+            self._writer.writerow(REPORT_COLUMNS)
+        self._writer.writerows(
+            rejects.astype(object).where(rejects.notna(), "").itertuples(index=False)
+        )
+
+    def close(self):
+        if self._handle is not None:
+            self._handle.close()
+
+    def discard(self):
+        if self._handle is not None:
+            self._handle.close()
+            os.remove(self.path)
+
+
+def _read_sheet(sheet, chunk_size):
+    """Yields the rows of a read-only worksheet as DataFrames of up to chunk_size rows."""
+    import pandas as pd
+
+    rows = sheet.iter_rows(values_only=True)
+    header = next(rows, None)
+    if header is None:
+        raise ValueError("The worksheet is empty")
+    names = [str(name).strip() if name is not None else "" for name in header]
+    missing = [column for column in COLUMNS if column not in names]
+    if missing:
+        raise ValueError(f"Missing column(s): {', '.join(missing)}")
+    positions = [names.index(column) for column in COLUMNS]
+    width = len(names)
+
+    chunk = []
+    numbers = []
+    for number, row in enumerate(rows, start=2):
+        # Empty rows (often just formatted cells) are skipped, like blank lines in import_csv().
+        if all(value is None for value in row):
+            continue
+        if len(row) < width:
+            row = tuple(row) + (None,) * (width - len(row))
+        part_number, quantity, description = (row[i] for i in positions)
+        chunk.append((_cell_text(part_number), quantity, _cell_text(description)))
+        numbers.append(number)
+        if len(chunk) == chunk_size:
+            yield pd.DataFrame(chunk, columns=COLUMNS, index=numbers)
+            chunk = []
+            numbers = []
+    if chunk:
+        yield pd.DataFrame(chunk, columns=COLUMNS, index=numbers)
+
+
+def _cell_text(value):
+    # Excel keeps numbers as floats: a part number typed as 123 comes back as 123 or 123.0.
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return value if value is None or isinstance(value, str) else str(value)
+
+
+def _count_lines(file_path):
+    lines = 0
+    with open(file_path, "rb") as handle:
+        for block in iter(lambda: handle.read(1 << 20), b""):
+            lines += block.count(b"\n")
+    return lines
+
+
+def export_inventory(file_path, chunk_size=EXPORT_CHUNK_SIZE, progress=None):
+    """Exports to CSV when the file name ends in .csv and to Excel otherwise."""
+    if Path(file_path).suffix.lower() == ".csv":
+        return export_to_csv(file_path, chunk_size, progress)
+    return export_to_excel(file_path, chunk_size, progress)
+
+
+def export_to_excel(file_path, chunk_size=EXPORT_CHUNK_SIZE, progress=None):
+    """
+    Streams the inventory into a write-only workbook, one chunk at a time, so memory stays
+    flat however large the table is. progress(rows_written, total_rows) is called after
+    every chunk. Returns the number of rows written.
+    """
+    from openpyxl import Workbook
+
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet("Inventory")
+    sheet.append(COLUMNS)
+
+    def append_rows(rows):
+        for row in rows:
+            sheet.append(row)
+
+    written = _write_chunks(append_rows, chunk_size, progress)
+    workbook.save(file_path)
+    return written
+
+
+def export_to_csv(file_path, chunk_size=EXPORT_CHUNK_SIZE, progress=None):
+    """Same as export_to_excel() but writes a CSV file, which is much faster."""
+    try:
+        with open(file_path, "w", newline="", encoding="utf-8") as handle:
+            writer = csv.writer(handle)
+            writer.writerow(COLUMNS)
+            return _write_chunks(writer.writerows, chunk_size, progress)
+    except BaseException:
+        # Don't leave half a file behind if the export failed or was cancelled.
+        os.remove(file_path)
+        raise
+
+
+def _write_chunks(write_rows, chunk_size, progress):
+    total = database.count_inventory() if progress else None
+    written = 0
+    for rows in database.iter_inventory(chunk_size):
+        write_rows(rows)
+        written += len(rows)
+        if progress:
+            progress(written, total)
+    return written
+
+
+def export_changes(
+    file_path, name="export", chunk_size=EXPORT_CHUNK_SIZE, progress=None
+):
+    """
+    Appends the parts changed since the last export_changes() with the same name to a CSV file
+    or workbook, creating it if needed, then moves that export's watermark on (see
+    database.iter_changes()). Deleted parts are written with an empty quantity and
+    description. The first export of a name writes every part. Returns the number of rows
+    written.
+
+    The watermark only moves once the file has been written, so a failed export is simply
+    repeated next time. Appending to a workbook means loading and saving the whole log; use
+    CSV for a log that keeps growing.
+    """
+    since = database.fetch_watermark(name)
+    until = database.change_seq()
+    changes = database.iter_changes(since, until, chunk_size)
+    if Path(file_path).suffix.lower() == ".csv":
+        written = _append_csv(file_path, changes, progress)
+    else:
+        written = _append_excel(file_path, changes, progress)
+    database.set_watermark(name, until)
+    return written
+
+
+def _append_csv(file_path, changes, progress):
+    size = os.path.getsize(file_path) if os.path.exists(file_path) else 0
+    try:
+        with open(file_path, "a", newline="", encoding="utf-8") as handle:
+            writer = csv.writer(handle)
+            if not size:
+                writer.writerow(CHANGE_COLUMNS)
+            return _write_changes(writer.writerows, changes, progress)
+    except BaseException:
+        # Put the log back the way it was, so the next export can append these rows again.
+        if size:
+            os.truncate(file_path, size)
+        else:
+            os.remove(file_path)
+        raise
+
+
+def _append_excel(file_path, changes, progress):
+    from openpyxl import Workbook, load_workbook
+
+    if os.path.exists(file_path):
+        workbook = load_workbook(file_path)
+        sheet = workbook.active
+    else:
+        workbook = Workbook()
+        sheet = workbook.active
+        sheet.title = "Changes"
+        sheet.append(CHANGE_COLUMNS)
+
+    def append_rows(rows):
+        for row in rows:
+            sheet.append(row)
+
+    written = _write_changes(append_rows, changes, progress)
+    # Saved next to the log and then swapped in, so a failure never leaves half a workbook.
+    temporary = Path(file_path).with_name(Path(file_path).name + ".tmp")
+    try:
+        workbook.save(temporary)
+        os.replace(temporary, file_path)
+    except BaseException:
+        if temporary.exists():
+            os.remove(temporary)
+        raise
+    return written
+
+
+def _write_changes(write_rows, changes, progress):
+    written = 0
+    for rows in changes:
+        write_rows(rows)
+        written += len(rows)
+        if progress:
+            progress(written, None)
+    return written
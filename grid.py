@@ -0,0 +1,352 @@
+"""
+Virtual (paged) inventory grid.
+
+The ttk.Treeview only ever holds the rows that fit on screen. Everything else stays in SQLite
+and is fetched a page at a time with keyset pagination on part_number (or on the sort column
+and part_number, see sort_by()) as the user scrolls.
+"""
+
+from bisect import bisect_left
+
+import database
+
+# Modifier bits in a Tk event's state: Shift and Control clicks add to the selection.
+_SHIFT = 0x0001
+_CONTROL = 0x0004
+
+
+class VirtualGrid:
+    """
+    Drives a ttk.Treeview and its scrollbar.
+
+    visible_rows Tk items are kept in the tree. A buffer of buffer_rows rows above and below
+    the window is kept in memory so scrolling line by line rarely goes back to the database.
+    Each item's iid is its part number, and rows are striped with the "evenrow"/"oddrow" tags
+    by their absolute position in the inventory, not their position on screen.
+    """
+
+    def __init__(self, tree, scrollbar, visible_rows=15, buffer_rows=15):
+        self.tree = tree
+        self.scrollbar = scrollbar
+        self.visible_rows = visible_rows
+        self.buffer_rows = buffer_rows
+        self.total = 0
+        self.offset = 0  # Absolute index of the first visible row.
+        self._rows = []  # Buffered rows ...
+        self._rows_start = 0  # ... and the absolute index of the first one.
+        # A fixed list of rows (search results) shown instead of the table.
+        self._static = None
+        # (column, descending) chosen with sort_by(), or None for part number order (and
+        # search results in the order they were found).
+        self.sort = None
+        self._selected = set()
+        self._pending_offset = None
+
+        scrollbar.configure(command=self.yview)
+        tree.configure(yscrollcommand="")
+        tree.bind("<<TreeviewSelect>>", self._on_select, add="+")
+        tree.bind("<Button-1>", self._on_click, add="+")
+        tree.bind("<MouseWheel>", self._on_mousewheel)
+        tree.bind("<Button-4>", lambda event: self._scroll_by(-1))
+        tree.bind("<Button-5>", lambda event: self._scroll_by(1))
+        tree.bind("<Up>", lambda event: self._on_arrow(-1))
+        tree.bind("<Down>", lambda event: self._on_arrow(1))
+        tree.bind("<Prior>", lambda event: self._scroll_by(-self.visible_rows))
+        tree.bind("<Next>", lambda event: self._scroll_by(self.visible_rows))
+
+    ################################################################################################
+    # Public API.
+
+    def refresh(self, total=None):
+        """
+        Shows the whole inventory, keeping the scroll position where possible. Pass total when
+        the row count has already been worked out (e.g. on a background thread).
+        """
+        self._static = None
+        self._selected.clear()
+        self._reload(total)
+
+    def show_rows(self, rows):
+        """Shows a fixed list of rows, e.g. search results."""
+        self._static = self._sorted(rows)
+        self.offset = 0
+        self._selected.clear()
+        self._reload()
+
+    def sort_by(self, column, descending=None):
+        """
+        Sorts on column (one of database.SORT_COLUMNS). The sort runs in SQLite, one page at a
+        time, so it costs the same on any size of inventory. Sorting on the same column again
+        reverses the order. The sort stays in effect for refresh() and show_rows().
+        """
+        if descending is None:
+            descending = self.sort == (column, False)
+        self.sort = (column, descending)
+        self.offset = 0
+        if self._static is not None:
+            self._static = self._sorted(self._static)
+        self._reload(self.total)
+
+    @property
+    def order_by(self):
+        return self.sort[0] if self.sort else "part_number"
+
+    @property
+    def descending(self):
+        return bool(self.sort and self.sort[1])
+
+    def apply_change(self, change):
+        """
+        Patches the grid after a database.Change instead of reloading it. Only rows that are
+        buffered are touched, so the cost does not depend on the size of the inventory. The
+        scroll position stays on the same rows and the selection is kept.
+        """
+        if change.reload:
+            self.refresh()
+            return
+        if self._static is not None:
+            self._patch_static(change)
+            return
+        if not self._rows:
+            self._reload()
+            return
+        if self.order_by != "part_number" or self.descending:
+            # Rows may have moved anywhere in the sort order. Read the window again.
+            self._selected.difference_update(change.deleted)
+            self._reload(self.total + len(change.inserted) - len(change.deleted))
+            return
+
+        keys = [row[0] for row in self._rows]
+        for key in change.deleted:
+            self._selected.discard(key)
+            self.total -= 1
+            index = bisect_left(keys, key)
+            if index < len(keys) and keys[index] == key:
+                del keys[index], self._rows[index]
+                if self._rows_start + index < self.offset:
+                    self.offset -= 1
+            elif index == 0 and self._rows_start:
+                # Somewhere above the buffer: everything below moves up by one.
+                self._rows_start -= 1
+                self.offset -= 1
+
+        new_rows = {row[0]: row for row in database.fetch_parts(change.inserted)}
+        for key in change.inserted:
+            self.total += 1
+            index = bisect_left(keys, key)
+            if index == 0 and self._rows_start:
+                self._rows_start += 1
+                self.offset += 1
+            elif key in new_rows and (
+                index < len(keys) or self._rows_start + len(keys) == self.total - 1
+            ):
+                keys.insert(index, key)
+                self._rows.insert(index, new_rows[key])
+                if self._rows_start + index < self.offset:
+                    self.offset += 1
+
+        for row in database.fetch_parts(k for k in change.updated if k in keys):
+            self._rows[bisect_left(keys, row[0])] = row
+
+        self.scroll_to(self.offset)
+
+    def _patch_static(self, change):
+        deleted = set(change.deleted)
+        updated = {row[0]: row for row in database.fetch_parts(change.updated)}
+        self._static = self._sorted(
+            updated.get(row[0], row) for row in self._static if row[0] not in deleted
+        )
+        self._selected -= deleted
+        self.total = len(self._static)
+        self.scroll_to(self.offset)
+
+    def scroll_to(self, offset):
+        self.offset = max(0, min(offset, self.total - self.visible_rows))
+        self._load()
+        self._render()
+
+    def selected_keys(self):
+        """Part numbers of every selected row, including rows scrolled out of view."""
+        return sorted(self._selected)
+
+    def clear_selection(self):
+        """Deselects every row, including rows scrolled out of view."""
+        self._selected.clear()
+        self.tree.selection_set(())
+
+    def yview(self, *args):
+        """Scrollbar command."""
+        if args[0] == "moveto":
+            offset = round(float(args[1]) * self.total)
+        else:
+            step = int(args[1])
+            if args[2] == "pages":
+                step *= self.visible_rows
+            offset = (
+                self.offset if self._pending_offset is None else self._pending_offset
+            ) + step
+        # Dragging the scrollbar fires many events. Only the last one is drawn.
+        if self._pending_offset is None:
+            self.tree.after_idle(self._apply_pending)
+        self._pending_offset = offset
+
+    ################################################################################################
+    # Loading rows.
+
+    def _reload(self, total=None):
+        self._rows = []
+        self._rows_start = 0
+        if self._static is not None:
+            self.total = len(self._static)
+        elif total is not None:
+            self.total = total
+        else:
+            self.total = database.count_inventory()
+        self.scroll_to(self.offset)
+
+    def _load(self):
+        """Makes sure the rows for the visible window are in the buffer."""
+        if self._static is not None:
+            self._rows = self._static
+            self._rows_start = 0
+            return
+
+        first = self.offset
+        last = min(self.total, first + self.visible_rows)
+        have_first = self._rows_start
+        have_last = have_first + len(self._rows)
+        if have_first <= first and last <= have_last:
+            return
+
+        want_first = max(0, first - self.buffer_rows)
+        want_last = min(self.total, last + self.buffer_rows)
+        if self._rows and first <= have_last and have_first <= last:
+            if first < have_first:
+                # Scrolling up: continue before the first buffered key.
+                more = database.fetch_page(
+                    before=self._key(self._rows[0]),
+                    limit=have_first - want_first,
+                    order_by=self.order_by,
+                    descending=self.descending,
+                )
+                self._rows = more + self._rows
+                self._rows_start = have_first - len(more)
+            if last > have_last:
+                # Scrolling down: continue after the last buffered key.
+                more = database.fetch_page(
+                    after=self._key(self._rows[-1]),
+                    limit=want_last - have_last,
+                    order_by=self.order_by,
+                    descending=self.descending,
+                )
+                self._rows = self._rows + more
+        else:
+            # Jumping somewhere new. Find the key just before the window with the
+            # index for the sort column, then page forward from it.
+            anchor = None
+            if want_first:
+                anchor = database.key_at(want_first - 1, self.order_by, self.descending)
+            self._rows = database.fetch_page(
+                after=anchor,
+                limit=want_last - want_first,
+                order_by=self.order_by,
+                descending=self.descending,
+            )
+            self._rows_start = want_first
+
+        # Drop rows that fell too far outside the window.
+        trim_front = max(0, want_first - self._rows_start)
+        self._rows = self._rows[trim_front : want_last - self._rows_start]
+        self._rows_start += trim_front
+
+    def _key(self, row):
+        return database.sort_key(row, self.order_by)
+
+    def _sorted(self, rows):
+        rows = list(rows)
+        if self.sort is None:
+            return rows
+        index = database.SORT_COLUMNS.index(self.order_by)
+        # The same order as SQLite: NULL, then numbers, then text; ties by part number.
+        rows.sort(
+            key=lambda row: (
+                row[index] is not None,
+                isinstance(row[index], str),
+                0 if row[index] is None else row[index],
+                row[0],
+            ),
+            reverse=self.descending,
+        )
+        return rows
+
+    ################################################################################################
+    # Drawing.
+
+    def _render(self):
+        start = self.offset - self._rows_start
+        rows = self._rows[start : start + self.visible_rows]
+        keys = [str(row[0]) for row in rows]
+
+        shown = set(keys)
+        stale = [iid for iid in self.tree.get_children() if iid not in shown]
+        if stale:
+            self.tree.delete(*stale)
+        for index, (key, row) in enumerate(zip(keys, rows)):
+            tag = "evenrow" if (self.offset + index) % 2 == 0 else "oddrow"
+            if self.tree.exists(key):
+                self.tree.item(key, values=row, tags=(tag,))
+                self.tree.move(key, "", index)
+            else:
+                self.tree.insert("", index, iid=key, values=row, tags=(tag,))
+
+        selection = [key for key in keys if key in self._selected]
+        if selection != list(self.tree.selection()):
+            self.tree.selection_set(selection)
+        self.scrollbar.set(*self._fractions())
+
+    def _fractions(self):
+        if not self.total:
+            return 0.0, 1.0
+        return self.offset / self.total, min(
+            1.0, (self.offset + self.visible_rows) / self.total
+        )
+
+    ################################################################################################
+    # Events.
+
+    def _apply_pending(self):
+        offset, self._pending_offset = self._pending_offset, None
+        if offset is not None:
+            self.scroll_to(offset)
+
+    def _scroll_by(self, step):
+        self.scroll_to(self.offset + step)
+        return "break"
+
+    def _on_mousewheel(self, event):
+        step = -1 if event.delta > 0 else 1
+        return self._scroll_by(step * max(1, abs(event.delta) // 120) * 3)
+
+    def _on_arrow(self, step):
+        # Arrow keys move inside the window as usual and scroll when they reach its edge.
+        children = self.tree.get_children()
+        if not children or self.tree.focus() != children[-1 if step > 0 else 0]:
+            return None
+        self._scroll_by(step)
+        children = self.tree.get_children()
+        edge = children[-1 if step > 0 else 0]
+        self.tree.focus(edge)
+        self.tree.selection_set(edge)
+        return "break"
+
+    def _on_click(self, event):
+        # Runs before the Treeview's own binding selects the row: a plain click on a row starts
+        # a new selection, so rows selected out of view are dropped too.
+        if event.state & (_SHIFT | _CONTROL):
+            return
+        if self.tree.identify_region(event.x, event.y) in ("cell", "tree"):
+            self._selected.clear()
+
+    def _on_select(self, event):
+        shown = set(self.tree.get_children())
+        self._selected = (self._selected - shown) | set(self.tree.selection())
@@ -0,0 +1,251 @@
+"""
+Optional timing of database calls, button commands and background jobs.
+
+Off unless INVENTORY_METRICS is set. When it is off, install() and timed() return without
+wrapping anything, so the application runs exactly as it would without this module.
+
+    INVENTORY_METRICS=1          turn instrumentation on
+    INVENTORY_METRICS_FILE=path  write the stats there on exit (.prom for Prometheus, else JSON)
+    INVENTORY_SLOW_MS=200        log operations slower than this many milliseconds
+    INVENTORY_SLOW_LOG=path      write the slow-operation log there instead of stderr
+
+For every operation a latency histogram, the number of calls, the rows returned or written
+and the number of errors are kept. db.lock_wait is the time spent waiting for the SQLite
+write lock at the start of each write transaction.
+"""
+
+import atexit
+import functools
+import inspect
+import json
+import logging
+import math
+import os
+import threading
+import time
+from pathlib import Path
+
+ENABLED = bool(os.environ.get("INVENTORY_METRICS"))
+METRICS_FILE = os.environ.get("INVENTORY_METRICS_FILE")
+SLOW_MS = float(os.environ.get("INVENTORY_SLOW_MS", 200))
+SLOW_LOG = os.environ.get("INVENTORY_SLOW_LOG")
+
+# Histogram bucket upper bounds in seconds.
+BUCKETS = (0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 10.0, math.inf)
+
+slow_log = logging.getLogger("inventory.slow")
+
+_metrics = {}
+_metrics_lock = threading.Lock()
+_installed = []  # (owner, attribute, original) for uninstall().
+
+
+class Metric:
+    """Latency histogram and row count for one operation."""
+
+    __slots__ = ("count", "errors", "rows", "total", "max", "buckets")
+
+    def __init__(self):
+        self.count = 0
+        self.errors = 0
+        self.rows = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.buckets = [0] * len(BUCKETS)
+
+    def add(self, seconds, rows, failed):
+        self.count += 1
+        self.errors += failed
+        self.rows += rows or 0
+        self.total += seconds
+        self.max = max(self.max, seconds)
+        for index, bound in enumerate(BUCKETS):
+            if seconds <= bound:
+                self.buckets[index] += 1
+                break
+
+    def as_dict(self):
+        return {
+            "count": self.count,
+            "errors": self.errors,
+            "rows": self.rows,
+            "total_seconds": self.total,
+            "mean_seconds": self.total / self.count if self.count else 0.0,
+            "max_seconds": self.max,
+            "buckets": {
+                ("+Inf" if bound == math.inf else str(bound)): count
+                for bound, count in zip(BUCKETS, self.buckets)
+            },
+        }
+
+
+def record(name, seconds, rows=None, failed=False, args=None):
+    with _metrics_lock:
+        metric = _metrics.get(name)
+        if metric is None:
+            metric = _metrics[name] = Metric()
+        metric.add(seconds, rows, failed)
+    if seconds * 1000 >= SLOW_MS:
+        slow_log.warning(
+            "%s took %.1f ms (rows=%s%s) args=%.200r",
+            name,
+            seconds * 1000,
+            rows,
+            ", failed" if failed else "",
+            args,
+        )
+
+
+def _count_rows(result):
+    if isinstance(result, bool):
+        return None
+    if isinstance(result, int):
+        return result
+    if isinstance(result, (list, tuple)):
+        return len(result)
+    return None
+
+
+def timed(name, func, force=False):
+    """Returns func wrapped to record its timings under name, or func itself when disabled."""
+    if not (ENABLED or force):
+        return func
+
+    if inspect.isgeneratorfunction(func):
+        # Time the whole iteration; each item is a chunk of rows.
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            rows = 0
+            failed = True
+            try:
+                for chunk in func(*args, **kwargs):
+                    rows += len(chunk)
+                    yield chunk
+                failed = False
+            finally:
+                record(name, time.perf_counter() - start, rows, failed, args)
+
+        wrapper._instrumented = True
+        return wrapper
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            result = func(*args, **kwargs)
+        except BaseException:
+            record(name, time.perf_counter() - start, None, True, args)
+            raise
+        record(name, time.perf_counter() - start, _count_rows(result), False, args)
+        return result
+
+    wrapper._instrumented = True
+    return wrapper
+
+
+def instrument(owner, names=None, prefix="", force=False):
+    """
+    Replaces functions on owner (a module or class) with timed versions. names is a list of
+    attribute names or a {attribute: metric name} dict; by default every public function
+    defined in owner is wrapped.
+    """
+    if not (ENABLED or force):
+        return
+    if names is None:
+        names = [
+            name
+            for name, value in vars(owner).items()
+            if inspect.isfunction(value)
+            and not name.startswith("_")
+            and value.__module__ == getattr(owner, "__name__", value.__module__)
+        ]
+    if not isinstance(names, dict):
+        names = {name: prefix + name for name in names}
+    for attribute, metric in names.items():
+        original = getattr(owner, attribute)
+        if getattr(original, "_instrumented", False):
+            continue
+        setattr(owner, attribute, timed(metric, original, force=True))
+        _installed.append((owner, attribute, original))
+
+
+def install(force=False):
+    """Instruments the database layer and the grid. Safe to call more than once."""
+    if not (ENABLED or force) or _installed:
+        return
+    import database
+    import grid
+
+    instrument(database, prefix="db.", force=True)
+    instrument(database, {"_begin": "db.lock_wait"}, force=True)
+    instrument(grid.VirtualGrid, {"_render": "grid.render"}, force=True)
+    if SLOW_LOG and not slow_log.handlers:
+        handler = logging.FileHandler(SLOW_LOG, encoding="utf-8")
+        handler.setFormatter(logging.Formatter("%(asctime)s %(message)s"))
+        slow_log.addHandler(handler)
+    if METRICS_FILE:
+        atexit.register(dump, METRICS_FILE)
+
+
+def uninstall():
+    """Puts back every function replaced by instrument()."""
+    while _installed:
+        owner, attribute, original = _installed.pop()
+        setattr(owner, attribute, original)
+
+
+def reset():
+    with _metrics_lock:
+        _metrics.clear()
+
+
+def snapshot():
+    """Returns {operation: stats} for everything recorded so far."""
+    with _metrics_lock:
+        return {name: metric.as_dict() for name, metric in sorted(_metrics.items())}
+
+
+def prometheus_text():
+    """The stats in the Prometheus text exposition format."""
+    lines = [
+        "# HELP inventory_operation_seconds Time spent in each operation.",
+        "# TYPE inventory_operation_seconds histogram",
+    ]
+    stats = snapshot()
+    for name, metric in stats.items():
+        label = f'operation="{name}"'
+        cumulative = 0
+        for bound, count in metric["buckets"].items():
+            cumulative += count
+            lines.append(
+                f'inventory_operation_seconds_bucket{{{label},le="{bound}"}} {cumulative}'
+            )
+        lines.append(
+            f"inventory_operation_seconds_sum{{{label}}} {metric['total_seconds']}"
+        )
+        lines.append(f"inventory_operation_seconds_count{{{label}}} {metric['count']}")
+    for key, help_text in (
+        ("rows", "Rows returned or written by each operation."),
+        ("errors", "Operations that raised an exception."),
+    ):
+        lines.append(f"# HELP inventory_operation_{key}_total {help_text}")
+        lines.append(f"# TYPE inventory_operation_{key}_total counter")
+        for name, metric in stats.items():
+            lines.append(
+                f'inventory_operation_{key}_total{{operation="{name}"}} {metric[key]}'
+            )
+    return "\n".join(lines) + "\n"
+
+
+def dump(path):
+    """Writes the stats to path: Prometheus text for .prom files, JSON otherwise."""
+    path = Path(path)
+    if path.suffix == ".prom":
+        text = prometheus_text()
+    else:
+        text = json.dumps(snapshot(), indent=2)
+    # Write to a temporary file first so a scraper never reads half a file.
+    temporary = path.with_name(path.name + ".tmp")
+    temporary.write_text(text, encoding="utf-8")
+    os.replace(temporary, path)
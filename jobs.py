@@ -0,0 +1,144 @@
+"""
+Background jobs for the Tk application.
+
+Tk may only be used from the mainloop thread, so long database and Excel work runs on a small
+thread pool instead. Results, progress and errors come back through a queue that the mainloop
+drains with root.after(), which keeps the window responsive while a job runs.
+"""
+
+import queue
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+
+class JobCancelled(Exception):
+    """Raised inside a job when it has been cancelled."""
+
+
+class Job:
+    """
+    Handle passed to the job function as its first argument and returned by submit().
+
+    The job function should call job.progress(done, total) or job.check() regularly. Both raise
+    JobCancelled once cancel() has been called, which unwinds the job (and rolls back any open
+    transaction) at a safe point.
+    """
+
+    # Progress updates are sent to the UI at most this often (seconds).
+    PROGRESS_INTERVAL = 0.05
+
+    def __init__(self, runner, name, on_progress):
+        self.name = name
+        self.done = False
+        self._runner = runner
+        self._on_progress = on_progress
+        self._cancel_event = threading.Event()
+        self._last_progress = 0.0
+
+    @property
+    def cancelled(self):
+        return self._cancel_event.is_set()
+
+    def cancel(self):
+        self._cancel_event.set()
+
+    def check(self):
+        if self._cancel_event.is_set():
+            raise JobCancelled(self.name)
+
+    def progress(self, done, total=None):
+        self.check()
+        now = time.monotonic()
+        if self._on_progress and (
+            now - self._last_progress >= self.PROGRESS_INTERVAL or done == total
+        ):
+            self._last_progress = now
+            self._runner.call_soon(self._on_progress, done, total)
+
+
+class JobRunner:
+    """Runs functions on worker threads and calls back on the Tk thread."""
+
+    def __init__(self, root, max_workers=2, poll_interval=25, poll_budget=0.02):
+        self.root = root
+        self.poll_interval = poll_interval  # Milliseconds between queue checks.
+        self.poll_budget = poll_budget  # Seconds of callbacks to run per check.
+        self._queue = queue.SimpleQueue()
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="inventory-job"
+        )
+        self._jobs = set()
+        self._after_id = self.root.after(self.poll_interval, self._poll)
+
+    def submit(
+        self,
+        func,
+        *args,
+        name=None,
+        on_done=None,
+        on_error=None,
+        on_cancel=None,
+        on_progress=None,
+        **kwargs,
+    ):
+        """
+        Runs func(job, *args, **kwargs) on a worker thread. on_done(result), on_error(exception),
+        on_cancel() and on_progress(done, total) are called on the Tk thread.
+        """
+        job = Job(self, name or getattr(func, "__name__", "job"), on_progress)
+        self._jobs.add(job)
+
+        def run():
+            try:
+                result = func(job, *args, **kwargs)
+            except JobCancelled:
+                self.call_soon(self._finish, job, on_cancel)
+            except Exception as error:
+                self.call_soon(self._finish, job, on_error or _reraise, error)
+            else:
+                self.call_soon(self._finish, job, on_done, result)
+
+        self._executor.submit(run)
+        return job
+
+    def call_soon(self, callback, *args):
+        """Schedules callback(*args) on the Tk thread. Safe to call from any thread."""
+        self._queue.put((callback, args))
+
+    @property
+    def busy(self):
+        return bool(self._jobs)
+
+    def shutdown(self):
+        for job in self._jobs:
+            job.cancel()
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        self.root.after_cancel(self._after_id)
+
+    def _finish(self, job, callback, *args):
+        job.done = True
+        self._jobs.discard(job)
+        if callback:
+            callback(*args)
+
+    def _poll(self):
+        # Run queued callbacks, but give the event loop back after poll_budget seconds so a
+        # burst of updates cannot stall redrawing.
+        deadline = time.monotonic() + self.poll_budget
+        while time.monotonic() < deadline:
+            try:
+                callback, args = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            try:
+                callback(*args)
+            except Exception:
+                self.root.report_callback_exception(*sys.exc_info())
+        self._after_id = self.root.after(self.poll_interval, self._poll)
+
+
+def _reraise(error):
+    # No error handler: let Tk report it like any other callback exception.
+    raise error
@@ -0,0 +1,81 @@
+"""
+Search-as-you-type for the Tk application.
+
+Every keystroke restarts a short timer; the search only runs once typing pauses. It runs on a
+JobRunner worker so the window keeps responding, and a search that has been overtaken by a
+newer one is interrupted in SQLite (see database.interruptible()) and its results are dropped,
+so the grid only ever shows the results for what is in the entry now.
+"""
+
+import sqlite3
+
+import database
+
+
+class LiveSearch:
+    """
+    Runs search(query) after each pause in typing and passes the rows to show(rows, query), on
+    the Tk thread. on_error(exception, query) is called if a search fails. query is whatever
+    the caller passes to schedule() or run(), e.g. the text typed and the column to search.
+    """
+
+    def __init__(self, root, runner, search, show, on_error=None, delay=150):
+        self.root = root
+        self.runner = runner
+        self.search = search
+        self.show = show
+        self.on_error = on_error
+        self.delay = delay  # Milliseconds without a keystroke before searching.
+        self._after_id = None
+        self._job = None
+
+    def schedule(self, query):
+        """Call on every keystroke: searches for query once typing pauses."""
+        self._cancel_timer()
+        self._after_id = self.root.after(self.delay, lambda: self.run(query))
+
+    def run(self, query):
+        """Searches for query now, interrupting any search still running."""
+        self.cancel()
+        # The callbacks run on this thread after submit() has returned, so job is set by then.
+        job = self._job = self.runner.submit(
+            self._search,
+            query,
+            name="search",
+            on_done=lambda rows: self._done(job, rows, query),
+            on_error=lambda error: self._failed(job, error, query),
+        )
+        return job
+
+    def cancel(self):
+        """Stops the waiting or running search, if any; its results will not be shown."""
+        self._cancel_timer()
+        if self._job is not None and not self._job.done:
+            self._job.cancel()
+        self._job = None
+
+    def _search(self, job, query):
+        try:
+            with database.interruptible(lambda: job.cancelled):
+                return self.search(query)
+        except sqlite3.OperationalError:
+            job.check()  # Raises JobCancelled if this is why the query stopped.
+            raise
+
+    def _cancel_timer(self):
+        if self._after_id is not None:
+            self.root.after_cancel(self._after_id)
+            self._after_id = None
+
+    def _done(self, job, rows, query):
+        # Otherwise a newer search has started since and these rows are stale.
+        if job is self._job:
+            self._job = None
+            self.show(rows, query)
+
+    def _failed(self, job, error, query):
+        if job is self._job:
+            self._job = None
+            if self.on_error is None:
+                raise error
+            self.on_error(error, query)
@@ -15,17 +15,34 @@ Description:
 
 ####################################################################################################
 # Import module functions.
+import startup  # First, so startup timing covers the other imports.
+
+import re
+import sys
+import threading
 import tkinter as tk
+from datetime import datetime
 from tkinter import *
 from tkinter import messagebox  # This will allow us to display message boxes.
 from tkinter import filedialog, ttk
 
 import customtkinter
-import pandas as pd  # This will allow us to use the pandas module for data manipulation such as exporting to excel. Also installed openpyxl.
 from customtkinter import *
 from PIL import Image, ImageTk
 
+import audit
+import backup
 import database
+import excel
+import instrumentation
+import query
+from grid import VirtualGrid
+from jobs import JobRunner
+from livesearch import LiveSearch
+
+startup.mark("imports")
+# Times database calls and the grid when INVENTORY_METRICS is set; does nothing otherwise.
+instrumentation.install()
 
 ####################################################################################################
 ########### Creating color pallette in case I want to use them. ####################################
@@ -65,6 +82,80 @@ font_6 = customtkinter.CTkFont(family="Arial", size=16, weight="normal", slant="
 font_7 = customtkinter.CTkFont(family="Arial", size=16, weight="bold")
 
 
+####################################################################################################
+########### Background Jobs ########################################################################
+####################################################################################################
+
+# Import, Export, Show All and Delete All run on a worker thread so the window keeps responding.
+# Only one of them runs at a time and its progress is shown in the top frame.
+jobs = JobRunner(root)
+current_job = None
+
+
+def start_job(name, func, on_done=None, error_message=None):
+    global current_job
+    if current_job is not None and not current_job.done:
+        messagebox.showerror("Error", f"Please wait for {current_job.name} to finish.")
+        return
+
+    def finished(callback, *args):
+        hide_job_status()
+        if callback:
+            callback(*args)
+
+    def failed(error):
+        hide_job_status()
+        messagebox.showerror("Error", f"{error_message or name + ' failed'}: {error}")
+
+    show_job_status(name)
+    current_job = jobs.submit(
+        instrumentation.timed(f"job.{name}", func),
+        name=name,
+        on_done=lambda result: finished(on_done, result),
+        on_error=failed,
+        on_cancel=lambda: finished(None),
+        on_progress=lambda done, total: show_job_progress(name, done, total),
+    )
+
+
+def cancel_job():
+    if current_job is not None:
+        current_job.cancel()
+        root.jobLabel.configure(text=f"Cancelling {current_job.name}...")
+
+
+def show_job_status(name):
+    root.jobLabel.configure(text=f"{name}...")
+    root.jobLabel.place(x=430, y=12)
+    root.jobProgress.configure(mode="indeterminate")
+    root.jobProgress.start()
+    root.jobProgress.place(x=430, y=40)
+    root.cancelLink.place(x=640, y=33)
+
+
+def show_job_progress(name, done, total):
+    if total:
+        root.jobProgress.stop()
+        root.jobProgress.configure(mode="determinate")
+        root.jobProgress.set(done / total)
+        root.jobLabel.configure(text=f"{name}: {done:,} of {total:,}")
+
+
+def hide_job_status():
+    root.jobProgress.stop()
+    root.jobLabel.place_forget()
+    root.jobProgress.place_forget()
+    root.cancelLink.place_forget()
+
+
+def on_database_change(change):
+    # Writes made by a job are reported on its worker thread; Tk must be updated on this one.
+    if threading.current_thread() is threading.main_thread():
+        grid.apply_change(change)
+    else:
+        jobs.call_soon(grid.apply_change, change)
+
+
 ####################################################################################################
 ########### Functions for Buttons ##################################################################
 ####################################################################################################
@@ -84,8 +175,6 @@ def insert():
         try:
             part_number_value = str(part_number)
             database.insert_part_numbers(part_number_value, quantity, description)
-            tree.delete(*tree.get_children())
-            add_to_treeview()
             messagebox.showinfo("Success", "Data has been inserted.")
         except TypeError:
             messagebox.showerror("Error", "Part Number should be an integer.")
@@ -96,6 +185,10 @@ def insert():
 
 
 def update_inventory():
+    selected = grid.selected_keys()
+    if len(selected) > 1:
+        update_selected(selected)
+        return
     selected_item = tree.focus()
     if selected_item is None:
         messagebox.showerror("Error", "Choose a part to update.")
@@ -105,60 +198,102 @@ def update_inventory():
         description = descriptionEntry.get()
         if not (part_number and quantity and description):
             messagebox.showerror("Error", "All fields are required")
+        elif loaded_row and loaded_row[0] == part_number:
+            save_loaded_row(part_number, quantity, description)
         else:
             try:
                 part_number_value = str(part_number)
                 database.update_inventory(part_number_value, quantity, description)
-                tree.delete(*tree.get_children())
-                add_to_treeview()
                 messagebox.showinfo("Success", "Data has been updated.")
             except ValueError:
                 messagebox.showerror("Error", "Part Number should be a string.")
 
 
+def save_loaded_row(part_number, quantity, description):
+    _, loaded_quantity, loaded_description, version = loaded_row
+    if (
+        description == loaded_description
+        and is_whole_number(quantity)
+        and is_whole_number(loaded_quantity)
+    ):
+        # Only the quantity changed: save it as a movement (+/- the difference from what was
+        # loaded), so an adjustment someone else made in the meantime is kept.
+        if int(quantity) != int(loaded_quantity):
+            database.adjust_quantity(part_number, int(quantity) - int(loaded_quantity))
+        messagebox.showinfo("Success", "Data has been updated.")
+        return
+    try:
+        # Rejected if anyone changed the part after it was loaded into the fields.
+        database.update_inventory(part_number, quantity, description, version=version)
+        messagebox.showinfo("Success", "Data has been updated.")
+    except database.StaleEditError:
+        messagebox.showerror(
+            "Error",
+            "This part was changed by someone else after you selected it, so your edit "
+            "was not saved. Select it again to see the current values.",
+        )
+
+
+def is_whole_number(text):
+    return text.strip().lstrip("+-").isdigit()
+
+
+def update_selected(part_numbers):
+    """
+    Bulk edit: sets the Quantity and/or Description entered on every selected part. A field
+    left empty is not changed.
+    """
+    quantity = quantityEntry.get() or None
+    description = descriptionEntry.get() or None
+    if quantity is None and description is None:
+        messagebox.showerror("Error", "Enter a quantity or description to apply.")
+        return
+    if quantity is not None and not is_whole_number(quantity):
+        messagebox.showerror("Error", "Quantity should be a whole number.")
+        return
+    if not messagebox.askyesno(
+        "Confirm", f"Update the {len(part_numbers):,} selected parts?"
+    ):
+        return
+    if quantity is not None:
+        quantity = int(quantity)
+    updated = database.update_many(
+        (part_number, quantity, description) for part_number in part_numbers
+    )
+    messagebox.showinfo("Success", f"{updated:,} parts updated.")
+
+
 ####################################################################################################
 # Define the Clear Button.
 
 
 def clear(*clicked):
     if clicked:
-        tree.selection_remove(tree.focus(""))
-        part_numberEntry.delete(0, END)
-        quantityEntry.delete(0, END)
-        descriptionEntry.delete(0, END)
+        grid.clear_selection()
+        clear_fields()
+
+
+def clear_fields():
+    global loaded_row
+    loaded_row = None
+    part_numberEntry.delete(0, END)
+    quantityEntry.delete(0, END)
+    descriptionEntry.delete(0, END)
 
 
 ####################################################################################################
 # Define the Search Button.
 
 
-def search_part_numbers():
+def search_part_numbers(*event):
     if searchEntry.get() == "":
         messagebox.showerror("Error", "Enter value to search")
-    elif searchBox.get() == "Search by":
+    elif searchBox.get() not in search_options:
         messagebox.showerror("Error", "Please select an option")
     else:
-        search_by = searchBox.get()
-        search_value = searchEntry.get()
-
-        # Map display values to actual column names
-        column_map = {
-            "Part Number": "part_number",
-            "Description": "description",
-            "Quantity": "quantity",
-        }
-
-        search_by_column = column_map.get(search_by)
-        print(f"Searching by: {search_by_column}, Value: {search_value}")  # Debug print
-        searched_inventory = database.search(search_by_column, search_value)
-        print(f"Search results: {searched_inventory}")  # Debug print
-
-        # Clear the treeview
-        tree.delete(*tree.get_children())
-
-        # Insert the search results into the treeview
-        for part in searched_inventory:
-            tree.insert("", END, values=part)
+        # Every match, best first. Runs in the background like the live search and replaces
+        # any live search still running.
+        live_search.run((searchBox.get(), searchEntry.get(), False))
 
 
 ####################################################################################################
@@ -166,7 +301,11 @@ def search_part_numbers():
 
 
 def show_all():
-    add_to_treeview()
+    global last_typed
+    live_search.cancel()
+    last_typed = None
+    # Counting a large table is the slow part, so do it off the UI thread.
+    start_job("Show All", lambda job: database.count_inventory(), on_done=grid.refresh)
     searchEntry.delete(0, END)
     searchEntry.insert(0, "")
     searchBox.set("Search By")
@@ -177,52 +316,207 @@ def show_all():
 
 
 def export():
-    part_numbers = database.fetch_inventory()
-    if not part_numbers:
+    changes = messagebox.askyesnocancel(
+        "Export",
+        "Export only the parts changed since the last changes export?\n\n"
+        "Yes adds them to a running change log (the first time, every part is written).\n"
+        "No exports the whole inventory.",
+    )
+    if changes is None:
+        return
+    if changes:
+        export_changes()
+        return
+    if not database.count_inventory():
         messagebox.showerror("Error", "No data available to export.")
         return
 
-    df = pd.DataFrame(part_numbers, columns=["Part Number", "Quantity", "Description"])
     file_path = (
         filedialog.asksaveasfilename(  # Ask user to save file and where to save it.
             defaultextension=".xlsx",
-            filetypes=[("Excel files", "*.xlsx"), ("All files", "*.*")],
+            filetypes=[
+                ("Excel files", "*.xlsx"),
+                ("CSV files", "*.csv"),
+                ("All files", "*.*"),
+            ],
             initialfile="parts_inventory.xlsx",
             initialdir="~/Desktop",
         )
     )
     if not file_path:
         return
-    try:
-        df.to_excel(file_path, index=False)
-        messagebox.showinfo("Success", f"Data exported successfully to {file_path}")
-    except Exception as e:
-        messagebox.showerror("Error", f"Failed to export data: {e}")
+    start_job(
+        "Export",
+        lambda job: excel.export_inventory(file_path, progress=job.progress),
+        on_done=lambda rows: messagebox.showinfo(
+            "Success", f"{rows} parts exported successfully to {file_path}"
+        ),
+        error_message="Failed to export data",
+    )
+
+
+def export_changes():
+    # The log is appended to, so choosing an existing file is the normal case.
+    file_path = filedialog.asksaveasfilename(
+        defaultextension=".csv",
+        filetypes=[
+            ("CSV files", "*.csv"),
+            ("Excel files", "*.xlsx"),
+            ("All files", "*.*"),
+        ],
+        initialfile="inventory_changes.csv",
+        initialdir="~/Desktop",
+        confirmoverwrite=False,
+    )
+    if not file_path:
+        return
+    start_job(
+        "Export changes",
+        lambda job: excel.export_changes(file_path, progress=job.progress),
+        on_done=lambda rows: messagebox.showinfo(
+            "Success", f"{rows} changed parts added to {file_path}"
+        ),
+        error_message="Failed to export the changes",
+    )
 
 
 ####################################################################################################
 # Define the Import from Excel Button.
 
 
+# What an import does with parts that are already in the database (see database.merge_rows()).
+IMPORT_MODES = {
+    "Skip parts that already exist": "skip",
+    "Replace their quantities (stock count)": "replace",
+    "Add to their quantities (goods received)": "add",
+}
+
+
+def ask_import_mode():
+    """Asks how to merge the file. Returns a database.MERGE_MODES value, or None to cancel."""
+    dialog = Toplevel(root, bg=color_5)
+    dialog.title("Import")
+    dialog.resizable(0, 0)
+    dialog.transient(root)
+    choice = StringVar(value="skip")
+    result = []
+
+    Label(
+        dialog, text="Parts already in the inventory:", font=(font_7), bg=color_5
+    ).pack(anchor="w", padx=15, pady=(15, 5))
+    for text, mode in IMPORT_MODES.items():
+        Radiobutton(
+            dialog,
+            text=text,
+            value=mode,
+            variable=choice,
+            font=(font_7),
+            bg=color_5,
+            activebackground=color_4,
+        ).pack(anchor="w", padx=25)
+
+    def close(mode):
+        result.append(mode)
+        dialog.destroy()
+
+    buttons = Frame(dialog, bg=color_5)
+    buttons.pack(pady=15)
+    for text, command in (
+        ("Preview", lambda: close(choice.get())),
+        ("Cancel", lambda: close(None)),
+    ):
+        customtkinter.CTkButton(
+            buttons,
+            text=text,
+            text_color=color_def2,
+            fg_color=color_4,
+            hover_color=color_def3,
+            border_color=color_2,
+            border_width=2,
+            width=100,
+            font=(font_3),
+            command=command,
+        ).pack(side="left", padx=5)
+    dialog.protocol("WM_DELETE_WINDOW", lambda: close(None))
+    dialog.grab_set()
+    root.wait_window(dialog)
+    return result[0] if result else None
+
+
+def describe_import(result):
+    lines = [
+        f"New parts: {result.inserted:,}",
+        f"Quantities changed: {result.updated:,}",
+        f"Unchanged: {result.unchanged:,}",
+        f"Rejected (missing or invalid fields): {result.rejected:,}",
+    ]
+    if result.report:
+        lines.append(
+            f"\nThe rejected rows and the reasons are listed in\n{result.report}"
+        )
+    return "\n".join(lines)
+
+
 def import_data():
+    """
+    Reads the file once as a dry run to show what would change, then imports it in one
+    transaction if the user agrees.
+    """
     file_path = filedialog.askopenfilename(
-        filetypes=[("Excel files", "*.xlsx"), ("All files", "*.*")]
+        filetypes=[
+            ("Excel files", "*.xlsx"),
+            ("CSV files", "*.csv"),
+            ("All files", "*.*"),
+        ]
     )
     if not file_path:
         return
+    mode = ask_import_mode()
+    if mode is None:
+        return
 
-    try:
-        df = pd.read_excel(file_path)
-        for _, row in df.iterrows():
-            part_number = row["Part Number"]
-            quantity = row["Quantity"]
-            description = row["Description"]
-            if not database.part_numbers_exists(part_number):
-                database.insert_part_numbers(part_number, quantity, description)
-        add_to_treeview()
-        messagebox.showinfo("Success", "Data imported successfully")
-    except Exception as e:
-        messagebox.showerror("Error", f"Failed to import data: {e}")
+    def run(job, dry_run):
+        return excel.import_inventory(
+            file_path,
+            progress=job.progress,
+            report_path=excel.default_report_path(file_path),
+            mode=mode,
+            dry_run=dry_run,
+        )
+
+    def previewed(result):
+        changes = "".join(
+            f"\n    {part_number}: {'new' if old is None else old} -> {new}"
+            for part_number, old, new in result.preview[:10]
+        )
+        if not result.inserted and not result.updated:
+            messagebox.showinfo(
+                "Import", "Nothing to import.\n\n" + describe_import(result)
+            )
+            return
+        if messagebox.askyesno(
+            "Import preview",
+            describe_import(result)
+            + (f"\n\nFirst changes:{changes}" if changes else "")
+            + "\n\nImport now?",
+        ):
+            # The import runs in one transaction, so cancelling it leaves the database unchanged.
+            start_job(
+                "Import",
+                lambda job: run(job, False),
+                on_done=lambda result: messagebox.showinfo(
+                    "Success",
+                    "Data imported successfully\n\n" + describe_import(result),
+                ),
+                error_message="Failed to import data",
+            )
+
+    start_job(
+        "Import preview",
+        lambda job: run(job, True),
+        on_done=previewed,
+        error_message="Failed to read the file",
+    )
 
 
 ####################################################################################################
@@ -231,28 +525,25 @@ def import_data():
 
 def delete():
     """
-    Deletes the selected part from the database.
+    Deletes every selected part, including selected rows that are scrolled out of view, in one
+    transaction after a single confirmation.
     """
-    selected_items = tree.selection()
-    print(f"Selected items: {selected_items}")  # Debugging statement
-    if not selected_items:
+    part_numbers = grid.selected_keys()  # The grid uses the part number as the item id.
+    if not part_numbers:
         messagebox.showerror("Error", "Choose a part to delete.")
-    else:
-        values = tree.item(selected_items[0]).get("values", [])
-        print(f"Values: {values}")  # Debugging statement
-        if not values:
-            messagebox.showerror("Error", "Selected item has no values.")
+        return
+    if len(part_numbers) > 1 and not messagebox.askyesno(
+        "Confirm", f"Delete the {len(part_numbers):,} selected parts?"
+    ):
+        return
+    try:
+        deleted = database.delete_many(part_numbers)
+        if len(part_numbers) == 1:
+            messagebox.showinfo("Success", "Part deleted successfully")
         else:
-            part_number = values[0]
-            try:
-                part_number_value = str(part_number)
-                database.delete_inventory(part_number_value)
-                tree.delete(selected_items[0])  # Remove the item from the tree view
-                tree.delete(*tree.get_children())  # Clear the treeview
-                add_to_treeview()  # Refresh the treeview
-                messagebox.showinfo("Success", "Part deleted successfully")
-            except Exception as e:
-                messagebox.showerror("Error", f"Failed to delete part: {e}")
+            messagebox.showinfo("Success", f"{deleted:,} parts deleted successfully")
+    except Exception as e:
+        messagebox.showerror("Error", f"Failed to delete part: {e}")
 
 
 ####################################################################################################
@@ -263,19 +554,263 @@ def deleteAll():
     print("DELETE ALL function called")
     confirm = messagebox.askyesnocancel(
         title="Delete All Inventory",
-        message="Are you sure you want to DELETE ALL INVENTORY in the DATABASE? \nThis action cannot be undone!!!",
+        message="Are you sure you want to DELETE ALL INVENTORY in the DATABASE? \n"
+        "A backup is saved first; it can be restored from Backups.",
     )
     if confirm:
-        database.delete_all_inventory()
-        add_to_treeview()
-        tree.delete(*tree.get_children())
-        messagebox.showinfo("Info", "All Parts Deleted")
+
+        def delete_all(job):
+            saved = backup.snapshot(progress=job.progress)
+            database.delete_all_inventory()
+            return saved
+
+        start_job(
+            "Delete All",
+            delete_all,
+            on_done=lambda saved: messagebox.showinfo(
+                "Info", f"All Parts Deleted\n\nThe backup is {saved.path}"
+            ),
+        )
     elif confirm is None:
         print("Action cancelled")
     else:
         print("No action taken")
 
 
+####################################################################################################
+# Define the Backups dialog.
+# Backups are taken with SQLite's online backup API on a job thread, so the window and other
+# users keep working while they run (see backup.py).
+
+
+def show_backups():
+    dialog = Toplevel(root, bg=color_5)
+    dialog.title("Backups")
+    dialog.resizable(0, 0)
+    dialog.transient(root)
+
+    Label(dialog, text="Snapshots, newest first:", font=(font_7), bg=color_5).pack(
+        anchor="w", padx=15, pady=(15, 5)
+    )
+    listbox = Listbox(dialog, width=50, height=10, font=(font_2))
+    listbox.pack(padx=15)
+    snapshots = []
+
+    def reload():
+        snapshots[:] = backup.list_snapshots()
+        listbox.delete(0, END)
+        for path, period, label in snapshots:
+            listbox.insert(END, f"{label}  ({period})")
+
+    def backed_up(result):
+        reload()
+        messagebox.showinfo("Backup", f"Backed up {result}", parent=dialog)
+
+    def back_up_now():
+        start_job(
+            "Backup",
+            lambda job: backup.snapshot(progress=job.progress),
+            on_done=backed_up,
+            error_message="Backup failed",
+        )
+
+    def restore_selected():
+        selected = listbox.curselection()
+        if not selected:
+            messagebox.showerror(
+                "Error", "Choose a snapshot to restore.", parent=dialog
+            )
+            return
+        path = snapshots[selected[0]][0]
+        if not messagebox.askyesno(
+            "Restore",
+            f"Replace the whole inventory with the snapshot\n{path}?",
+            parent=dialog,
+        ):
+            return
+        dialog.destroy()
+        start_job(
+            "Restore",
+            lambda job: backup.restore(path, progress=job.progress),
+            on_done=lambda result: messagebox.showinfo(
+                "Success", f"Restored {result.path}"
+            ),
+            error_message="Restore failed",
+        )
+
+    buttons = Frame(dialog, bg=color_5)
+    buttons.pack(pady=15)
+    for text, command in (
+        ("Back up now", back_up_now),
+        ("Restore", restore_selected),
+        ("Close", dialog.destroy),
+    ):
+        customtkinter.CTkButton(
+            buttons,
+            text=text,
+            text_color=color_def2,
+            fg_color=color_4,
+            hover_color=color_def3,
+            border_color=color_2,
+            border_width=2,
+            width=120,
+            font=(font_3),
+            command=command,
+        ).pack(side="left", padx=5)
+    reload()
+
+
+def take_scheduled_backup():
+    """Takes this period's snapshot in the background if it is due (backup.SCHEDULE)."""
+    if backup.SCHEDULE not in backup.PERIODS:
+        return
+    jobs.submit(
+        lambda job: backup.scheduled_snapshot(backup.SCHEDULE, progress=job.progress),
+        name="Scheduled backup",
+        on_error=lambda error: print(
+            f"Scheduled backup failed: {error}", file=sys.stderr
+        ),
+    )
+
+
+####################################################################################################
+# Define the Audit dialog.
+# Picks parts at random for the monthly stock count and writes them to a count sheet. The seed
+# defaults to the month, so the same pick list can be printed again (see audit.py).
+
+AUDIT_STRATA = {
+    "No strata": None,
+    "Quantity bands": audit.quantity_bands,
+    "Description categories": audit.description_categories,
+}
+
+
+def show_audit():
+    dialog = Toplevel(root, bg=color_5)
+    dialog.title("Audit")
+    dialog.resizable(0, 0)
+    dialog.transient(root)
+    size = StringVar(value="50")
+    seed = StringVar(value=datetime.now().strftime("%Y-%m"))
+    strata = StringVar(value="No strata")
+    allocation = StringVar(value="proportional")
+
+    fields = Frame(dialog, bg=color_5)
+    fields.pack(anchor="w", padx=15, pady=(15, 5))
+    for row, (text, variable) in enumerate(
+        (("Parts to count:", size), ("Seed:", seed))
+    ):
+        Label(fields, text=text, font=(font_7), bg=color_5).grid(
+            row=row, column=0, sticky="w"
+        )
+        Entry(fields, textvariable=variable, width=12, font=(font_2)).grid(
+            row=row, column=1, sticky="w", padx=5, pady=2
+        )
+
+    def add_choices(title, choices, variable):
+        Label(dialog, text=title, font=(font_7), bg=color_5).pack(
+            anchor="w", padx=15, pady=(10, 0)
+        )
+        for text, value in choices:
+            Radiobutton(
+                dialog,
+                text=text,
+                value=value,
+                variable=variable,
+                font=(font_7),
+                bg=color_5,
+                activebackground=color_4,
+            ).pack(anchor="w", padx=25)
+
+    add_choices("Stratify by:", [(text, text) for text in AUDIT_STRATA], strata)
+    add_choices(
+        "Share of each stratum:",
+        [("By size", "proportional"), ("Equal", "equal")],
+        allocation,
+    )
+
+    def pick():
+        if not size.get().strip().isdigit() or not int(size.get()):
+            messagebox.showerror(
+                "Error", "Enter the number of parts to count.", parent=dialog
+            )
+            return
+        file_path = filedialog.asksaveasfilename(
+            parent=dialog,
+            defaultextension=".xlsx",
+            filetypes=[
+                ("Excel files", "*.xlsx"),
+                ("CSV files", "*.csv"),
+                ("All files", "*.*"),
+            ],
+            initialfile=f"audit-{seed.get()}.xlsx",
+            initialdir="~/Desktop",
+        )
+        if not file_path:
+            return
+        n, chosen_seed = int(size.get()), seed.get() or None
+        make_strata = AUDIT_STRATA[strata.get()]
+        chosen_allocation = allocation.get()
+        dialog.destroy()
+
+        def run(job):
+            picked = audit.sample(
+                n,
+                seed=chosen_seed,
+                strata=make_strata() if make_strata else None,
+                allocation=chosen_allocation,
+            )
+            return audit.export_count_sheet(picked, file_path), picked.seed
+
+        start_job(
+            "Audit",
+            run,
+            on_done=lambda result: messagebox.showinfo(
+                "Success",
+                f"{result[0]} parts to count written to {file_path}\n"
+                f"(seed {result[1]})",
+            ),
+            error_message="Failed to pick the parts",
+        )
+
+    buttons = Frame(dialog, bg=color_5)
+    buttons.pack(pady=15)
+    for text, command in (("Pick parts", pick), ("Cancel", dialog.destroy)):
+        customtkinter.CTkButton(
+            buttons,
+            text=text,
+            text_color=color_def2,
+            fg_color=color_4,
+            hover_color=color_def3,
+            border_color=color_2,
+            border_width=2,
+            width=120,
+            font=(font_3),
+            command=command,
+        ).pack(side="left", padx=5)
+
+
+# Time every button command (only when instrumentation is on). Done before the buttons below
+# are created so each of them calls the timed version.
+instrumentation.instrument(
+    sys.modules[__name__],
+    [
+        "insert",
+        "update_inventory",
+        "clear",
+        "search_part_numbers",
+        "show_all",
+        "export",
+        "import_data",
+        "delete",
+        "deleteAll",
+        "show_backups",
+        "show_audit",
+    ],
+    prefix="button.",
+)
+
+
 ####################################################################################################
 ########## Top Frame ###############################################################################
 
@@ -320,11 +855,66 @@ root.logoutLink = customtkinter.CTkButton(
     cursor="hand2",
     text="Logout",
     font=(font_5),
-    command=root.quit,  # Used to close the program for "Logout".
+    command=lambda: (
+        jobs.shutdown(),
+        root.quit(),
+    ),  # Used to close the program for "Logout". Running jobs are cancelled.
 )
 
 root.logoutLink.place(x=785, y=25)
 
+root.backupsLink = customtkinter.CTkButton(
+    root.topFrame,
+    text_color=color_def1,
+    bg_color=color_2,
+    fg_color=color_2,
+    hover_color=color_2,
+    width=20,
+    height=4,
+    cursor="hand2",
+    text="Backups",
+    font=(font_5),
+    command=show_backups,
+)
+
+root.backupsLink.place(x=785, y=58)
+
+####################################################################################################
+# This is the status area for background jobs. It is only shown while a job is running.
+
+root.jobLabel = Label(
+    root.topFrame,
+    text="",
+    font=(font_2),
+    bg=color_2,
+    fg=color_5,
+)
+
+root.jobProgress = customtkinter.CTkProgressBar(
+    root.topFrame,
+    width=200,
+    height=12,
+    bg_color=color_2,
+    fg_color=color_1,
+    progress_color=color_5,
+)
+
+root.cancelLink = customtkinter.CTkButton(
+    root.topFrame,
+    text_color=color_def2,
+    bg_color=color_2,
+    fg_color=color_4,
+    hover_color=color_def3,  # Set the hover color for the button
+    width=80,
+    height=4,
+    border_color=color_2,
+    border_width=2,
+    cursor="hand2",
+    text="Cancel",
+    font=(font_2),
+    command=cancel_job,
+)
+
 ####################################################################################################
 ######### END OF MAIN WINDOW #######################################################################
 ####################################################################################################
@@ -576,18 +1166,100 @@ textLable.place(x=80, y=15)
 # This is the Search ComboBox.
 
 
-def search_by_part_number(part_number):
+def search_by_part_number(part_number, live=False):
+    if live:
+        # Part numbers starting with what has been typed so far, from the primary key index.
+        return database.search_prefix(part_number, limit=grid.visible_rows)
     return database.search("part_number", part_number)
 
 
-def search_by_description(description):
-    return database.search("description", description)
+def search_by_description(description, live=False):
+    # Full-text: "bearing" finds "Ball bearing 6204", "bear" works as a prefix.
+    if live:
+        return database.search_text(
+            description, column="description", limit=grid.visible_rows, ranked=False
+        )
+    return database.search_text(description, column="description")
+
+
+def search_by_keyword(keyword, live=False):
+    # Full-text over both part numbers and descriptions, best matches first.
+    if live:
+        return database.search_text(keyword, limit=grid.visible_rows, ranked=False)
+    return database.search_text(keyword)
+
+
+# Most rows a Quantity or Query search shows; a low stock list can be long.
+QUERY_LIMIT = 1000
+
+
+def search_by_quantity(quantity, live=False):
+    # "5", "< 5" (low stock) or "2..10", answered from the quantity index.
+    limit = grid.visible_rows if live else QUERY_LIMIT
+    return query.search(quantity, limit=limit, default_column="quantity")
+
+
+def search_by_query(text, live=False):
+    # Several conditions, e.g. "qty < 5 and desc ~ bearing" (see query.py).
+    return query.search(text, limit=grid.visible_rows if live else QUERY_LIMIT)
 
 
 search_options = {
     "Part Number": search_by_part_number,
     "Description": search_by_description,
+    "Keyword": search_by_keyword,
+    "Quantity": search_by_quantity,
+    "Query": search_by_query,
 }
+# The column a Quantity or Query search applies to when none is typed.
+query_columns = {"Quantity": "quantity", "Query": None}
+
+
+def run_search(query):
+    # Runs on a worker thread, so everything it needs from the widgets is in query.
+    search_by, text, live = query
+    return search_options[search_by](text, live)
+
+
+def show_search_results(rows, query):
+    grid.show_rows(rows)
+
+
+def search_failed(error, query):
+    messagebox.showerror("Error", f"Search failed: {error}")
+
+
+live_search = LiveSearch(root, jobs, run_search, show_search_results, search_failed)
+
+
+last_typed = None
+
+
+def search_as_you_type(*event):
+    global last_typed
+    text = searchEntry.get().strip()
+    search_by = searchBox.get()
+    if search_by not in search_options:
+        search_by = "Part Number"
+    if (search_by, text) == last_typed:
+        return  # Not a change to the search, e.g. an arrow key or Enter.
+    last_typed = (search_by, text)
+    if not text:
+        live_search.cancel()
+        grid.refresh()
+        return
+    if search_by in query_columns:
+        try:
+            query.parse(text, query_columns[search_by])
+        except query.QueryError:
+            return  # Not a whole query yet, e.g. "qty <".
+    elif search_by != "Part Number":
+        words = re.findall(r"\w+", text)
+        if not words or len(words[-1]) < 2:
+            # A one-letter prefix matches most of the full-text index; wait for the next one.
+            return
+    live_search.schedule((search_by, text, True))
+
 
 searchBox = customtkinter.CTkComboBox(
     root.midFrame2,
@@ -622,6 +1294,9 @@ entry.place(
     x=140,
     y=45,
 )
+searchEntry.bind("<KeyRelease>", search_as_you_type)
+searchEntry.bind("<Return>", search_part_numbers)
+searchBox.configure(command=search_as_you_type)
 
 ####################################################################################################
 # This is the Search Button.
@@ -729,6 +1404,28 @@ root.importLink = customtkinter.CTkButton(
 root.importLink.place(x=280, y=80)
 
 
+####################################################################################################
+# This is the Audit Button, to the left of the table.
+
+root.auditLink = customtkinter.CTkButton(
+    root,
+    text_color=color_def2,
+    bg_color=color_1,
+    fg_color=color_4,
+    hover_color=color_def3,  # Set the hover color for the button
+    width=100,
+    height=4,
+    border_color=color_2,
+    border_width=2,
+    cursor="hand2",
+    text="Audit",
+    font=(font_3),
+    command=show_audit,
+)
+
+root.auditLink.place(x=20, y=250)
+
+
 ####################################################################################################
 ####################################################################################################
 # Begin building the table. This will create a treeview for the Inventory List. ####################
@@ -737,23 +1434,26 @@ root.importLink.place(x=280, y=80)
 
 ####################################################################################################
 # Define the treeview function.
-def add_to_treeview():
-    part_numbers = database.fetch_inventory()
-    tree.delete(*tree.get_children())
-    for part_number in part_numbers:
-        tree.insert("", END, values=part_number)
+# The row last loaded into the entry fields, as (part_number, quantity, description, version).
+loaded_row = None
 
 
 def display_data_from_tree(event: None):
+    global loaded_row
     selected_item = tree.focus()
-    if selected_item:
+    loaded_row = None
+    if len(grid.selected_keys()) > 1:
+        # Several parts selected: leave the fields empty so Update only applies what is typed.
+        clear_fields()
+    elif selected_item:
         row = tree.item(selected_item)["values"]
-        clear(True)
-        part_numberEntry.insert(0, row[0])
-        quantityEntry.insert(0, row[1])
-        descriptionEntry.insert(0, row[2])
-    else:
-        pass
+        clear_fields()
+        # Tk turns numeric looking values into ints, so take the part number from the item id.
+        version = database.fetch_version(selected_item)
+        loaded_row = (selected_item, str(row[1]), str(row[2]), version)
+        part_numberEntry.insert(0, loaded_row[0])
+        quantityEntry.insert(0, loaded_row[1])
+        descriptionEntry.insert(0, loaded_row[2])
 
 
 ####################################################################################################
@@ -795,29 +1495,30 @@ tree.tag_configure("oddrow", background=color_3)
 tree.tag_configure("evenrow", background=color_2)
 
 
-# Insert parts into the treeview with alternating row colors
-def add_to_treeview():
-    part_numbers = database.fetch_inventory()
-    tree.delete(*tree.get_children())
-    for index, part_numbers in enumerate(part_numbers):
-        if index % 2 == 0:
-            tree.insert("", END, values=part_numbers, tags=("evenrow",))
-        else:
-            tree.insert("", END, values=part_numbers, tags=("oddrow",))
+# Clicking a heading sorts on that column; clicking it again reverses the order.
+headings = {
+    "#1": ("part_number", "Part Number"),
+    "#2": ("quantity", "Quantity"),
+    "#3": ("description", "Description"),
+}
+
 
+def sort_by_heading(heading):
+    grid.sort_by(headings[heading][0])
+    for other, (column, text) in headings.items():
+        if column == grid.order_by:
+            text += " \u25bc" if grid.descending else " \u25b2"
+        tree.heading(other, text=text)
 
-tree.heading("#1", text="Part Number")
-tree.heading("#2", text="Quantity")
-tree.heading("#3", text="Description")
+
+for heading, (column, text) in headings.items():
+    tree.heading(heading, text=text, command=lambda h=heading: sort_by_heading(h))
 
 tree.column("#0", width=0, stretch=tk.NO)  # Hide the default first column
 tree.column("#1", width=120, anchor="nw")
 tree.column("#2", width=80, anchor="center")
 tree.column("#3", width=400, anchor="nw")
 
-
-add_to_treeview()
-
 ####################################################################################################
 
 ####################################################################################################
@@ -828,7 +1529,12 @@ scrollbar = ttk.Scrollbar(
     command=tree.yview,
 )
 scrollbar.place(x=737, y=278, height=300)
-tree.configure(yscrollcommand=scrollbar.set)
+
+# The grid pages rows in from the database as the scrollbar moves, with alternating row colors.
+# Only the visible page of rows is loaded, so this stays fast no matter how many parts there are.
+grid = VirtualGrid(tree, scrollbar, visible_rows=15)
+# Edits patch only the rows they touched instead of reloading the grid.
+database.add_listener(on_database_change)
 
 tree.place(
     x=150,
@@ -837,5 +1543,38 @@ tree.place(
 
 tree.bind("<ButtonRelease>", display_data_from_tree)
 
+startup.mark("window built")
+
+
+####################################################################################################
+# The window is drawn before any rows are loaded. The first page is filled in once the mainloop
+# is running, with the row count worked out on a worker thread.
+
+
+def load_first_page():
+    root.update_idletasks()  # Draw the empty window now.
+    startup.mark("first paint")
+    start_job(
+        "Loading",
+        lambda job: database.count_inventory(),
+        on_done=show_first_page,
+        error_message="Failed to load the inventory",
+    )
+
+
+def show_first_page(total):
+    grid.refresh(total)
+    root.update_idletasks()
+    startup.mark("first page")
+    startup.report()
+    if startup.EXIT_WHEN_READY:
+        jobs.shutdown()
+        root.quit()
+        return
+    take_scheduled_backup()
+
+
+root.after_idle(load_first_page)
 
-root.mainloop()
+if __name__ == "__main__":
+    root.mainloop()
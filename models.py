@@ -0,0 +1,170 @@
+"""
+Part records and a repository over the Inventory table.
+
+database.py returns plain tuples. This module wraps them for code that wants either one
+object per part (Part) or whole columns at a time (Batch), e.g. exports and reports that
+add up quantities without creating an object per row.
+"""
+
+import sys
+from array import array
+
+import database
+
+
+class Part:
+    """One inventory row. Uses __slots__, so a Part is about as small as the tuple it replaces."""
+
+    __slots__ = ("part_number", "quantity", "description")
+
+    def __init__(self, part_number, quantity, description):
+        self.part_number = part_number
+        self.quantity = quantity
+        self.description = description
+
+    @classmethod
+    def from_row(cls, row):
+        return cls(*row)
+
+    def as_tuple(self):
+        return (self.part_number, self.quantity, self.description)
+
+    def __iter__(self):
+        # Unpacks like the database row: part_number, quantity, description = part
+        return iter(self.as_tuple())
+
+    def __eq__(self, other):
+        if isinstance(other, Part):
+            return self.as_tuple() == other.as_tuple()
+        return NotImplemented
+
+    def __hash__(self):
+        return hash(self.as_tuple())
+
+    def __repr__(self):
+        return f"Part({self.part_number!r}, {self.quantity!r}, {self.description!r})"
+
+
+class Batch:
+    """
+    A chunk of rows stored by column. Quantities are kept in an array of 64-bit integers and
+    descriptions are interned, so the many repeated descriptions in a real inventory share one
+    string object.
+    """
+
+    __slots__ = ("part_numbers", "quantities", "descriptions")
+
+    def __init__(self, part_numbers, quantities, descriptions):
+        self.part_numbers = part_numbers
+        self.quantities = quantities
+        self.descriptions = descriptions
+
+    @classmethod
+    def from_rows(cls, rows):
+        if not rows:
+            return cls([], array("q"), [])
+        part_numbers, quantities, descriptions = zip(*rows)
+        return cls(
+            list(part_numbers),
+            _int_column(quantities),
+            [None if d is None else sys.intern(d) for d in descriptions],
+        )
+
+    def __len__(self):
+        return len(self.part_numbers)
+
+    def rows(self):
+        """Iterates over the rows as (part_number, quantity, description) tuples."""
+        return zip(self.part_numbers, self.quantities, self.descriptions)
+
+    def parts(self):
+        return map(Part, self.part_numbers, self.quantities, self.descriptions)
+
+    def extend(self, other):
+        self.part_numbers.extend(other.part_numbers)
+        if isinstance(self.quantities, array) and isinstance(other.quantities, array):
+            self.quantities.extend(other.quantities)
+        else:
+            self.quantities = list(self.quantities) + list(other.quantities)
+        self.descriptions.extend(other.descriptions)
+
+
+def _int_column(values):
+    try:
+        return array("q", values)
+    except (TypeError, OverflowError):
+        # Old rows can hold text or NULL in the quantity column; keep them as they are.
+        return list(values)
+
+
+def _sum_ints(values):
+    if isinstance(values, array):
+        return sum(values)
+    return sum(value for value in values if type(value) is int)
+
+
+class Inventory:
+    """
+    Repository over the Inventory table.
+
+    Results come back as lazy iterators (parts(), batches()) so a large table is never held in
+    memory at once, or as a single columnar Batch (columns()) for code that works on whole
+    columns.
+    """
+
+    def __init__(self, chunk_size=5000):
+        self.chunk_size = chunk_size
+
+    def __len__(self):
+        return database.count_inventory()
+
+    def __iter__(self):
+        return self.parts()
+
+    def __contains__(self, part_number):
+        return database.part_numbers_exists(part_number)
+
+    def get(self, part_number):
+        """Returns the Part with this part number, or None."""
+        rows = database.fetch_parts([part_number])
+        return Part.from_row(rows[0]) if rows else None
+
+    def parts(self):
+        """Lazily yields every Part in part number order."""
+        for rows in database.iter_inventory(self.chunk_size):
+            yield from map(Part.from_row, rows)
+
+    def batches(self):
+        """Lazily yields the table as Batches of up to chunk_size rows."""
+        for rows in database.iter_inventory(self.chunk_size):
+            yield Batch.from_rows(rows)
+
+    def columns(self):
+        """The whole table as one Batch."""
+        result = Batch([], array("q"), [])
+        for batch in self.batches():
+            result.extend(batch)
+        return result
+
+    def search(self, text, column=None, limit=100):
+        """Full-text search (see database.search_text()), as Parts."""
+        return [
+            Part.from_row(row)
+            for row in database.search_text(text, column=column, limit=limit)
+        ]
+
+    def total_quantity(self):
+        """
+        Sum of every quantity, worked out a column at a time. Text and NULL quantities are
+        left out.
+        """
+        return sum(_sum_ints(batch.quantities) for batch in self.batches())
+
+    def add(self, part):
+        database.insert_part_numbers(*part)
+
+    def save(self, part):
+        database.update_inventory(*part)
+
+    def remove(self, part_number):
+        database.delete_inventory(part_number)
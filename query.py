@@ -0,0 +1,316 @@
+"""
+Multi-criteria inventory queries.
+
+Filters are built from conditions on part_number, quantity and description and combined with
+& (AND) and | (OR). They compile to parameterized SQL that SQLite answers from an index: the
+primary key, the (column, part_number) sort indexes or the full-text index. Column names are
+checked against database.SORT_COLUMNS and values are always bound as parameters.
+
+    import query
+    low = query.where("quantity", "<", 5) & query.where("description", "^=", "Ball bearing")
+    rows = query.Query(low, limit=100).fetch()
+
+parse() reads the same thing from text, as typed into the search panel:
+
+    qty < 5 and (part ^= AB- or desc ~ bearing)
+    quantity 2..10
+    desc ~ "hex bolt" or part = 00012345
+
+Operators: = != < <= > >= , ^= (starts with), ~ or : (contains the words, full-text) and a..b
+(between a and b, inclusive). Conditions next to each other are ANDed; AND binds tighter than
+OR. != cannot use an index; everything else can.
+"""
+
+import abc
+import re
+
+import database
+
+OPERATORS = ("=", "!=", "<", "<=", ">", ">=", "^=", "~", "between")
+
+COLUMN_NAMES = {
+    "part_number": "part_number",
+    "part": "part_number",
+    "pn": "part_number",
+    "quantity": "quantity",
+    "qty": "quantity",
+    "description": "description",
+    "desc": "description",
+}
+
+LOW_STOCK = 5  # Default threshold for low_stock().
+
+
+class QueryError(ValueError):
+    """A query that cannot be parsed or compiled."""
+
+
+class Filter(abc.ABC):
+    """Base class for conditions. Combine them with & and |."""
+
+    def __and__(self, other):
+        return All(self, other)
+
+    def __or__(self, other):
+        return Any(self, other)
+
+    @abc.abstractmethod
+    def compile(self):
+        """Returns (SQL expression, parameters)."""
+
+
+class Condition(Filter):
+    def __init__(self, column, op, value):
+        if column not in database.SORT_COLUMNS:
+            raise QueryError(f"Unknown column {column!r}")
+        if op not in OPERATORS:
+            raise QueryError(f"Unknown operator {op!r}")
+        if op == "between":
+            low, high = value
+            value = (_coerce(column, low), _coerce(column, high))
+        elif op in ("^=", "~"):
+            if column == "quantity":
+                raise QueryError(f"{op} only works on part_number and description")
+            value = str(value)
+        else:
+            value = _coerce(column, value)
+        self.column = column
+        self.op = op
+        self.value = value
+
+    def compile(self):
+        column, op, value = self.column, self.op, self.value
+        if op == "between":
+            return f"{column} BETWEEN ? AND ?", list(value)
+        if op == "^=":
+            if not value:
+                return f"{column} IS NOT NULL", []
+            # A range on the index: everything from value up to the next possible prefix.
+            end = value[:-1] + chr(ord(value[-1]) + 1)
+            return f"({column} >= ? AND {column} < ?)", [value, end]
+        if op == "~":
+            return _words(column, value)
+        return f"{column} {op} ?", [value]
+
+    def __repr__(self):
+        return f"where({self.column!r}, {self.op!r}, {self.value!r})"
+
+
+class All(Filter):
+    joiner = " AND "
+
+    def __init__(self, *filters):
+        self.filters = filters
+
+    def compile(self):
+        parts, params = [], []
+        for condition in self.filters:
+            sql, more = condition.compile()
+            parts.append(sql)
+            params += more
+        return "(" + self.joiner.join(parts) + ")", params
+
+    def __repr__(self):
+        return f"{type(self).__name__}{self.filters!r}"
+
+
+class Any(All):
+    joiner = " OR "
+
+
+def where(column, op, value):
+    """One condition, e.g. where("quantity", "<", 5)."""
+    return Condition(COLUMN_NAMES.get(column, column), op, value)
+
+
+def low_stock(threshold=LOW_STOCK):
+    """Parts with fewer than threshold in stock."""
+    return where("quantity", "<", threshold)
+
+
+def _coerce(column, value):
+    if column != "quantity":
+        return str(value)
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        raise QueryError(f"quantity must be a whole number, not {value!r}")
+
+
+def _words(column, text):
+    if not database.FTS_AVAILABLE:
+        words = text.split() or [""]
+        return (
+            "(" + " AND ".join(f"{column} LIKE ?" for _ in words) + ")",
+            [f"%{word}%" for word in words],
+        )
+    match = database.fts_query(text, column)
+    if match is None:
+        raise QueryError("~ needs at least one word")
+    return (
+        "rowid IN (SELECT rowid FROM Inventory_fts WHERE Inventory_fts MATCH ?)",
+        [match],
+    )
+
+
+class Query:
+    """
+    A filter with an order and a limit. With order_by=None rows come back in the order of the
+    index SQLite uses, which never needs a sort; pass a column from database.SORT_COLUMNS to
+    sort.
+    """
+
+    def __init__(self, where=None, order_by=None, descending=False, limit=100):
+        if order_by is not None and order_by not in database.SORT_COLUMNS:
+            raise QueryError(f"Cannot sort by {order_by!r}")
+        self.where = where
+        self.order_by = order_by
+        self.descending = descending
+        self.limit = limit
+
+    def sql(self):
+        """Returns (SQL, parameters)."""
+        sql = "SELECT part_number, quantity, description FROM Inventory"
+        params = []
+        if self.where is not None:
+            condition, params = self.where.compile()
+            sql += f" WHERE {condition}"
+        if self.order_by is not None:
+            order = " DESC" if self.descending else ""
+            sql += f" ORDER BY {self.order_by}{order}"
+            if self.order_by != "part_number":
+                sql += f", part_number{order}"
+        if self.limit is not None:
+            sql += " LIMIT ?"
+            params = params + [self.limit]
+        return sql, params
+
+    def fetch(self):
+        sql, params = self.sql()
+        return database.get_connection().execute(sql, params).fetchall()
+
+    def explain(self):
+        """The EXPLAIN QUERY PLAN lines for this query."""
+        sql, params = self.sql()
+        return [
+            row[-1]
+            for row in database.get_connection().execute(
+                "EXPLAIN QUERY PLAN " + sql, params
+            )
+        ]
+
+
+####################################################################################################
+# Parsing.
+
+_TOKEN = re.compile(
+    r'\s*(?:(?P<paren>[()])|(?P<op><=|>=|!=|\^=|=|<|>|~|:)|"(?P<quoted>[^"]*)"'
+    r'|(?P<word>[^\s()<>=!^~:"]+))'
+)
+
+
+def parse(text, default_column=None):
+    """
+    Parses a query typed by the user into a Filter (see the module docstring). With
+    default_column, conditions may leave the column out: parse("< 5", "quantity").
+    """
+    tokens = _tokenize(text)
+    if not tokens:
+        raise QueryError("Empty query")
+    parser = _Parser(tokens, default_column)
+    result = parser.expression()
+    if parser.position < len(tokens):
+        raise QueryError(f"Unexpected {tokens[parser.position][1]!r}")
+    return result
+
+
+def search(text, limit=100, default_column=None):
+    """Runs a query typed by the user and returns the rows."""
+    return Query(parse(text, default_column), limit=limit).fetch()
+
+
+def _tokenize(text):
+    tokens = []
+    position = 0
+    text = text.strip()
+    while position < len(text):
+        match = _TOKEN.match(text, position)
+        if match is None or match.end() == position:
+            raise QueryError(f"Cannot read {text[position:]!r}")
+        kind = match.lastgroup
+        value = match.group(kind)
+        if kind == "word" and value.lower() in ("and", "or"):
+            kind = value.lower()
+        elif kind == "op" and value == ":":
+            value = "~"
+        tokens.append((kind, value))
+        position = match.end()
+    return tokens
+
+
+class _Parser:
+    """expression := term (OR term)*; term := factor (AND? factor)*"""
+
+    def __init__(self, tokens, default_column):
+        self.tokens = tokens
+        self.position = 0
+        self.default_column = default_column
+
+    def peek(self):
+        if self.position < len(self.tokens):
+            return self.tokens[self.position]
+        return (None, None)
+
+    def take(self):
+        token = self.peek()
+        if token[0] is None:
+            raise QueryError("Query ends too soon")
+        self.position += 1
+        return token
+
+    def expression(self):
+        terms = [self.term()]
+        while self.peek()[0] == "or":
+            self.take()
+            terms.append(self.term())
+        return terms[0] if len(terms) == 1 else Any(*terms)
+
+    def term(self):
+        factors = [self.factor()]
+        while self.peek()[0] not in (None, "or") and self.peek() != ("paren", ")"):
+            if self.peek()[0] == "and":
+                self.take()
+            factors.append(self.factor())
+        return factors[0] if len(factors) == 1 else All(*factors)
+
+    def factor(self):
+        kind, value = self.peek()
+        if (kind, value) == ("paren", "("):
+            self.take()
+            inner = self.expression()
+            if self.take() != ("paren", ")"):
+                raise QueryError("Missing )")
+            return inner
+        return self.condition()
+
+    def condition(self):
+        kind, value = self.peek()
+        column = None
+        if kind == "word" and value.lower() in COLUMN_NAMES:
+            self.take()
+            column = COLUMN_NAMES[value.lower()]
+        elif self.default_column is not None:
+            column = self.default_column
+        else:
+            raise QueryError(f"Expected a column name, not {value!r}")
+
+        op = "="
+        if self.peek()[0] == "op":
+            op = self.take()[1]
+        kind, value = self.take()
+        if kind not in ("word", "quoted"):
+            raise QueryError(f"Expected a value after {op}, not {value!r}")
+        if op == "=" and kind == "word" and ".." in value:
+            low, _, high = value.partition("..")
+            return Condition(column, "between", (low, high))
+        return Condition(column, op, value)
@@ -0,0 +1,385 @@
+"""
+Local HTTP/JSON service for scanners and other tools.
+
+An asyncio server (standard library only) in front of database.py. Database calls run on a
+small, bounded pool of worker threads so a slow query never blocks the event loop, and GET
+responses carry an ETag so clients can revalidate with If-None-Match and get a 304 without
+the query being run again.
+
+    python server.py --port 8765
+    python cli.py serve --port 8765
+
+    GET  /parts?after=<part number>&limit=50   page through the inventory
+    GET  /parts/<part number>                  one part, with its version
+    GET  /search?q=<text>&column=&limit=       full-text search
+    POST /parts/<part number>/adjust           {"delta": -2}
+    POST /import                               [{"part_number": ..., "quantity": ..., ...}]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from http import HTTPStatus
+from urllib.parse import parse_qs, unquote, urlsplit
+
+import database
+
+MAX_BODY = 32 * 1024 * 1024  # Largest request body accepted (bulk imports).
+MAX_PAGE = 1000
+
+# ETags are only comparable within one run of the server.
+_boot = os.urandom(4).hex()
+
+
+class HTTPError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+class InventoryServer:
+    """
+    Serves the inventory over HTTP/1.1 with keep-alive. workers is the number of database
+    threads; at most max_waiting requests wait for one, the rest are turned away with 503.
+    """
+
+    def __init__(self, host="127.0.0.1", port=8765, workers=4, max_waiting=256):
+        self.host = host
+        self.port = port
+        self.workers = workers
+        self.max_waiting = max_waiting
+        self._executor = ThreadPoolExecutor(
+            max_workers=workers, thread_name_prefix="inventory-http"
+        )
+        # ETags always come from the same connection. Each connection notices other
+        # connections' commits on its own, so asking a different one each time could give two
+        # different answers for the same data.
+        self._stamps = ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix="inventory-etag"
+        )
+        self._slots = None
+        self._waiting = 0
+        self._server = None
+        self._routes = [
+            ("GET", ("parts",), self.list_parts),
+            ("GET", ("parts", None), self.get_part),
+            ("GET", ("search",), self.search),
+            ("POST", ("parts", None, "adjust"), self.adjust),
+            ("POST", ("import",), self.import_rows),
+        ]
+
+    async def start(self):
+        """Starts listening and returns the port (useful with port=0)."""
+        self._slots = asyncio.Semaphore(self.workers)
+        self._server = await asyncio.start_server(
+            self._connection, self.host, self.port
+        )
+        self.port = self._server.sockets[0].getsockname()[1]
+        await self.change_stamp()
+        return self.port
+
+    async def serve_forever(self):
+        if self._server is None:
+            await self.start()
+        async with self._server:
+            await self._server.serve_forever()
+
+    async def close(self):
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        self._stamps.shutdown(wait=False, cancel_futures=True)
+
+    async def run_db(self, func, *args):
+        """Runs a database call on the worker pool."""
+        if self._waiting >= self.max_waiting:
+            raise HTTPError(HTTPStatus.SERVICE_UNAVAILABLE, "Server busy, try again")
+        self._waiting += 1
+        try:
+            async with self._slots:
+                loop = asyncio.get_running_loop()
+                return await loop.run_in_executor(self._executor, func, *args)
+        finally:
+            self._waiting -= 1
+
+    async def change_stamp(self):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._stamps, database.change_stamp)
+
+    ################################################################################################
+    # Endpoints. Each returns a JSON-serialisable value and may raise HTTPError.
+
+    async def list_parts(self, request):
+        limit = _int_param(request, "limit", 50, 1, MAX_PAGE)
+        after = request.query.get("after")
+        total, rows = await self.run_db(_page, after, limit)
+        return {
+            "total": total,
+            "parts": [_part(row) for row in rows],
+            "next": rows[-1][0] if len(rows) == limit else None,
+        }
+
+    async def get_part(self, request):
+        part_number = request.path_args[0]
+        rows, version = await self.run_db(_part_with_version, part_number)
+        if not rows:
+            raise HTTPError(HTTPStatus.NOT_FOUND, f"Part {part_number} not found")
+        return dict(_part(rows[0]), version=version)
+
+    async def search(self, request):
+        text = request.query.get("q", "")
+        if not text.strip():
+            raise HTTPError(HTTPStatus.BAD_REQUEST, "q is required")
+        limit = _int_param(request, "limit", 100, 1, MAX_PAGE)
+        try:
+            rows = await self.run_db(
+                database.search_text, text, request.query.get("column"), limit
+            )
+        except ValueError as error:
+            raise HTTPError(HTTPStatus.BAD_REQUEST, str(error))
+        return {"parts": [_part(row) for row in rows]}
+
+    async def adjust(self, request):
+        part_number = request.path_args[0]
+        body = request.json()
+        delta = body.get("delta") if isinstance(body, dict) else None
+        if not _is_int64(delta):
+            raise HTTPError(HTTPStatus.BAD_REQUEST, "delta must be a whole number")
+        quantity = await self.run_db(database.adjust_quantity, part_number, delta)
+        if quantity is None:
+            raise HTTPError(HTTPStatus.NOT_FOUND, f"Part {part_number} not found")
+        return {"part_number": part_number, "quantity": quantity}
+
+    async def import_rows(self, request):
+        rows = request.json()
+        if not isinstance(rows, list):
+            raise HTTPError(HTTPStatus.BAD_REQUEST, "Expected a JSON list of parts")
+        clean, valid = _clean_rows(rows)
+        inserted = await self.run_db(database.insert_many, clean)
+        return {
+            "inserted": inserted,
+            "skipped": valid - inserted,
+            "rejected": len(rows) - valid,
+        }
+
+    ################################################################################################
+    # HTTP.
+
+    async def _connection(self, reader, writer):
+        try:
+            while True:
+                request = await _read_request(reader)
+                if request is None:
+                    break
+                keep_alive = await self._respond(request, writer)
+                if not keep_alive:
+                    break
+        except HTTPError as error:
+            # The request could not be read, so neither can anything after it: answer and
+            # close the connection.
+            request = Request("GET", "/", "HTTP/1.1", {"connection": "close"}, b"")
+            try:
+                await _send(writer, error.status, {"error": str(error)}, {}, request)
+            except ConnectionError:
+                pass
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def _respond(self, request, writer):
+        headers = {}
+        try:
+            handler, request.path_args = self._route(request)
+            if request.method == "GET":
+                # Answer revalidations without running the query.
+                etag = f'W/"{_boot}-{await self.change_stamp()}"'
+                headers["ETag"] = etag
+                if etag in request.headers.get("if-none-match", ""):
+                    return await _send(
+                        writer, HTTPStatus.NOT_MODIFIED, None, headers, request
+                    )
+            status, body = HTTPStatus.OK, await handler(request)
+        except HTTPError as error:
+            headers.pop("ETag", None)
+            status, body = error.status, {"error": str(error)}
+        except Exception as error:  # Keep serving; report the failure to the client.
+            headers.pop("ETag", None)
+            status, body = HTTPStatus.INTERNAL_SERVER_ERROR, {"error": repr(error)}
+        return await _send(writer, status, body, headers, request)
+
+    def _route(self, request):
+        parts = tuple(unquote(p) for p in request.path.strip("/").split("/") if p)
+        allowed = False
+        for method, pattern, handler in self._routes:
+            if len(pattern) != len(parts) or any(
+                want is not None and want != got for want, got in zip(pattern, parts)
+            ):
+                continue
+            if method != request.method:
+                allowed = True
+                continue
+            return handler, [got for want, got in zip(pattern, parts) if want is None]
+        if allowed:
+            raise HTTPError(HTTPStatus.METHOD_NOT_ALLOWED, "Method not allowed")
+        raise HTTPError(HTTPStatus.NOT_FOUND, "No such endpoint")
+
+
+class Request:
+    __slots__ = ("method", "path", "query", "headers", "body", "version", "path_args")
+
+    def __init__(self, method, target, version, headers, body):
+        url = urlsplit(target)
+        self.method = method
+        self.path = url.path
+        self.query = {k: v[-1] for k, v in parse_qs(url.query).items()}
+        self.version = version
+        self.headers = headers
+        self.body = body
+        self.path_args = []
+
+    def json(self):
+        try:
+            return json.loads(self.body or b"null")
+        except ValueError:
+            raise HTTPError(HTTPStatus.BAD_REQUEST, "Body is not valid JSON")
+
+    @property
+    def keep_alive(self):
+        connection = self.headers.get("connection", "").lower()
+        if self.version == "HTTP/1.0":
+            return connection == "keep-alive"
+        return connection != "close"
+
+
+async def _read_request(reader):
+    line = await reader.readline()
+    if not line:
+        return None
+    try:
+        method, target, version = line.decode("latin-1").split()
+    except ValueError:
+        raise ConnectionError("Malformed request line")
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b"\n", b""):
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        headers[name.strip().lower()] = value.strip()
+    try:
+        length = int(headers.get("content-length", 0))
+    except ValueError:
+        length = -1
+    if length < 0:
+        raise HTTPError(HTTPStatus.BAD_REQUEST, "Invalid Content-Length")
+    if length > MAX_BODY:
+        raise HTTPError(HTTPStatus.REQUEST_ENTITY_TOO_LARGE, "Request body too large")
+    body = await reader.readexactly(length) if length else b""
+    return Request(method.upper(), target, version, headers, body)
+
+
+async def _send(writer, status, body, headers, request):
+    payload = b"" if body is None else json.dumps(body).encode()
+    keep_alive = request.keep_alive
+    lines = [f"HTTP/1.1 {status.value} {status.phrase}"]
+    if body is not None:
+        lines.append("Content-Type: application/json")
+    lines.append(f"Content-Length: {len(payload)}")
+    lines.append(f"Connection: {'keep-alive' if keep_alive else 'close'}")
+    lines.extend(f"{name}: {value}" for name, value in headers.items())
+    writer.write(("\r\n".join(lines) + "\r\n\r\n").encode("latin-1") + payload)
+    await writer.drain()
+    return keep_alive
+
+
+####################################################################################################
+# Database work done on the worker threads.
+
+
+def _page(after, limit):
+    return database.count_inventory(), database.fetch_page(after=after, limit=limit)
+
+
+def _part_with_version(part_number):
+    return database.fetch_parts([part_number]), database.fetch_version(part_number)
+
+
+def _part(row):
+    return {"part_number": row[0], "quantity": row[1], "description": row[2]}
+
+
+def _int_param(request, name, default, low, high):
+    value = request.query.get(name)
+    if value is None:
+        return default
+    try:
+        return max(low, min(high, int(value)))
+    except ValueError:
+        raise HTTPError(HTTPStatus.BAD_REQUEST, f"{name} must be a whole number")
+
+
+def _is_int64(value):
+    # What SQLite can store as an INTEGER.
+    return (
+        isinstance(value, int)
+        and not isinstance(value, bool)
+        and -(2**63) <= value < 2**63
+    )
+
+
+def _clean_rows(rows):
+    """
+    The same rules as the Excel import: every field present and a whole-number quantity.
+    Returns the valid rows with repeated part numbers dropped, and the number of valid rows.
+    """
+    clean = {}
+    valid = 0
+    for row in rows:
+        if isinstance(row, dict):
+            row = (row.get("part_number"), row.get("quantity"), row.get("description"))
+        if not isinstance(row, (list, tuple)) or len(row) != 3:
+            continue
+        part_number, quantity, description = row
+        part_number = str(part_number).strip() if part_number is not None else ""
+        description = str(description).strip() if description is not None else ""
+        if isinstance(quantity, float) and quantity.is_integer():
+            quantity = int(quantity)
+        if part_number and description and _is_int64(quantity):
+            valid += 1
+            clean.setdefault(part_number, (part_number, quantity, description))
+    return list(clean.values()), valid
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Parts Inventory HTTP service.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--workers", type=int, default=4)
+    args = parser.parse_args(argv)
+    serve(args.host, args.port, args.workers)
+
+
+def serve(host, port, workers):
+    server = InventoryServer(host, port, workers)
+
+    async def run():
+        port = await server.start()
+        print(f"Serving {database.DB_PATH} on http://{host}:{port}", file=sys.stderr)
+        try:
+            await server.serve_forever()
+        finally:
+            await server.close()
+
+    try:
+        asyncio.run(run())
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
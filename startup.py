@@ -0,0 +1,43 @@
+"""
+Startup timing for the desktop application.
+
+Set INVENTORY_STARTUP_PROFILE=1 to print how long each startup phase took (imports, building
+the window, first paint, first page of rows) to stderr. With INVENTORY_STARTUP_PROFILE=exit
+the application also quits once the first page is shown, which is what
+benchmarks/bench_startup.py uses to time cold starts.
+
+Times are measured from when this module is imported, which main.py does first.
+"""
+
+import os
+import sys
+import time
+
+PROFILE = os.environ.get("INVENTORY_STARTUP_PROFILE", "")
+ENABLED = bool(PROFILE)
+EXIT_WHEN_READY = PROFILE.lower() == "exit"
+
+_started = time.perf_counter()
+_marks = []
+
+
+def mark(name):
+    """Records that the startup phase called name has finished."""
+    if ENABLED:
+        _marks.append((name, time.perf_counter()))
+
+
+def report(file=None):
+    """Prints one line per phase: time since start and time spent in the phase."""
+    if not ENABLED:
+        return
+    file = file or sys.stderr
+    previous = _started
+    for name, when in _marks:
+        print(
+            f"startup: {name:<16} {(when - _started) * 1000:8.1f} ms "
+            f"(+{(when - previous) * 1000:.1f} ms)",
+            file=file,
+        )
+        previous = when
+    file.flush()
@@ -0,0 +1,21 @@
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+# Keep database.py away from the real Inventory.db when it is imported.
+os.environ["INVENTORY_DB"] = os.path.join(tempfile.mkdtemp(), "Inventory.db")
+
+
+@pytest.fixture
+def db(tmp_path):
+    import database
+
+    database.set_db_path(tmp_path / "Inventory.db")
+    yield database
+    database.close_connections()
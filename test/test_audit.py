@@ -0,0 +1,134 @@
+import csv
+from collections import Counter
+
+import pytest
+
+import audit
+
+
+@pytest.fixture
+def parts(db, monkeypatch):
+    # Small enough to draw from quickly, large enough that rejection sampling is used.
+    monkeypatch.setattr(audit, "DIRECT_LIMIT", 50)
+    db.insert_many(
+        (f"P{i:04d}", i % 150, ("Hex bolt", "Hexagon nut", "Washer")[i % 3])
+        for i in range(3000)
+    )
+    return db
+
+
+def test_sample_is_uniform_reproducible_and_skips_deleted_parts(parts):
+    parts.delete_many([f"P{i:04d}" for i in range(0, 3000, 2)])
+
+    picked = audit.sample(100, seed="2026-10")
+    numbers = [row[0] for row in picked.rows]
+    assert len(set(numbers)) == 100 and numbers == sorted(numbers)
+    assert all(int(number[1:]) % 2 for number in numbers)
+    assert audit.sample(100, seed="2026-10") == picked
+    assert audit.sample(100, seed="2026-11") != picked
+
+    again = audit.sample(20)
+    assert audit.sample(20, seed=again.seed) == again
+    assert len(audit.sample(5000, seed=1).rows) == 1500
+
+
+def test_sample_stratified_by_quantity(parts):
+    bands = audit.quantity_bands()
+    assert [band.name for band in bands] == ["< 1", "1-9", "10-99", "100+"]
+
+    picked = audit.sample(300, seed=7, strata=bands)
+    # 20, 180, 1800 and 1000 parts: proportional shares of 300.
+    assert Counter(row[3] for row in picked.rows) == {
+        "< 1": 2,
+        "1-9": 18,
+        "10-99": 180,
+        "100+": 100,
+    }
+    for _, quantity, _, name in picked.rows:
+        band = next(band for band in bands if band.name == name)
+        assert audit._within(band, quantity)
+
+    equal = audit.sample(100, seed=7, strata=bands, allocation="equal")
+    # The 20 parts without stock are taken whole; the rest is shared out.
+    assert Counter(row[3] for row in equal.rows) == {
+        "< 1": 20,
+        "1-9": 27,
+        "10-99": 27,
+        "100+": 26,
+    }
+
+
+def test_sample_stratified_by_description(parts):
+    parts.insert_many([("X-1", 1, ""), ("X-2", 1, "  Spare")])
+    categories = audit.description_categories()
+    names = [category.name for category in categories]
+    assert names == ["(blank)", "Hex", "Hexagon", "Washer"]
+
+    picked = audit.sample(30, seed=3, strata=categories, allocation="equal")
+    # Both parts without a first word, then equal shares of the rest.
+    assert Counter(row[3] for row in picked.rows) == {
+        "(blank)": 2,
+        "Hex": 10,
+        "Hexagon": 9,
+        "Washer": 9,
+    }
+    assert all(
+        row[2].split()[0] == row[3] for row in picked.rows if row[3] != "(blank)"
+    )
+
+    with pytest.raises(ValueError):
+        audit.sample(5, strata=[audit.Stratum("Bad", "rowid; DROP", 0, 1)])
+
+
+def test_export_count_sheet(parts, tmp_path):
+    picked = audit.sample(10, seed=1, strata=audit.quantity_bands())
+    path = tmp_path / "audit.csv"
+    assert audit.export_count_sheet(picked, path) == 10
+
+    with open(path, newline="", encoding="utf-8") as handle:
+        rows = list(csv.reader(handle))
+    assert rows[0] == audit.COUNT_SHEET_COLUMNS
+    assert [row[0] for row in rows[1:]] == [row[0] for row in picked.rows]
+    assert all(row[3:] == ["", ""] for row in rows[1:])
+
+    audit.export_count_sheet(picked, tmp_path / "audit.xlsx", blind=False)
+    from openpyxl import load_workbook
+
+    sheet = load_workbook(tmp_path / "audit.xlsx").active
+    assert sheet.max_row == 11 and sheet["C1"].value == "Quantity"
+
+
+def test_quantity_bands_leave_out_text_quantities(parts):
+    # Text gets into the quantity column through old imports and the GUI.
+    parts.update_many((f"P{i:04d}", "lots", None) for i in range(0, 3000, 50))
+    bands = audit.quantity_bands()
+    for seed in range(10):
+        picked = audit.sample(50, seed=seed, strata=bands)
+        assert len(picked.rows) == 50
+        assert all(isinstance(row[1], int) for row in picked.rows)
+
+    equal = audit.sample(4000, seed=1, strata=bands, allocation="equal")
+    assert len(equal.rows) == 3000 - 60
+
+
+def test_categories_past_the_limit_are_kept_together(db):
+    db.insert_many((f"P{i:03d}", 1, f"W{i:03d} part") for i in range(150))
+    categories = audit.description_categories()
+    assert len(categories) == 101 and categories[-1].name == "(other)"
+    assert audit.description_categories(limit=None)[-1].name == "W149"
+
+    picked = audit.sample(150, seed=1, strata=categories)
+    assert Counter(row[3] for row in picked.rows)["(other)"] == 50
+
+
+def test_categories_split_only_on_ascii_spaces(db):
+    db.insert_many(
+        [("A-1", 1, "Hex\xa0bolt"), ("A-2", 1, "Hex bolt"), ("A-3", 1, "Washer")]
+    )
+    categories = audit.description_categories()
+    assert [category.name for category in categories] == [
+        "Hex",
+        "Hex\xa0bolt",
+        "Washer",
+    ]
+    assert len(audit.sample(3, seed=1, strata=categories).rows) == 3
@@ -0,0 +1,116 @@
+import sqlite3
+import threading
+
+import pytest
+
+import backup
+
+
+def count(path):
+    conn = sqlite3.connect(path)
+    try:
+        assert conn.execute("PRAGMA quick_check").fetchone() == ("ok",)
+        return conn.execute("SELECT COUNT(*) FROM Inventory").fetchone()[0]
+    finally:
+        conn.close()
+
+
+def test_backup_in_steps_while_another_thread_writes(db, tmp_path):
+    db.insert_many((f"P{i:05d}", i, "Hex bolt " * 10) for i in range(5000))
+    steps = []
+    started = threading.Event()
+    stop = threading.Event()
+
+    def write():
+        i = 0
+        while not stop.is_set():
+            db.insert_part_numbers(f"NEW{i}", 1, "Written during the backup")
+            started.set()
+            i += 1
+
+    def progress(done, total):
+        steps.append((done, total))
+        started.wait(5)  # Make sure the writer runs between the steps.
+
+    writer = threading.Thread(target=write)
+    writer.start()
+    try:
+        result = backup.backup(tmp_path / "copy.db", pages=16, progress=progress)
+    finally:
+        stop.set()
+        writer.join()
+
+    assert len(steps) > 5 and steps[-1][0] == steps[-1][1]
+    assert 5000 <= count(result.path) < db.count_inventory()
+    assert result.bytes > 0 and result.mb_per_second > 0
+    assert list(tmp_path.glob("*.partial")) == []
+
+
+def test_cancelled_backup_leaves_nothing(db, tmp_path):
+    db.insert_many((f"P{i:05d}", i, "Part") for i in range(2000))
+
+    def cancel(done, total):
+        raise KeyboardInterrupt
+
+    with pytest.raises(KeyboardInterrupt):
+        backup.backup(tmp_path / "copy.db", pages=1, progress=cancel)
+    assert list(tmp_path.glob("copy.db*")) == []
+
+
+def test_snapshots_are_pruned_per_period(db, tmp_path):
+    for label in ("a", "b", "c"):
+        backup.snapshot(label=label, directory=tmp_path, keep=2)
+    first = backup.scheduled_snapshot("monthly", directory=tmp_path)
+    assert first is not None
+    assert backup.scheduled_snapshot("monthly", directory=tmp_path) is None
+
+    snapshots = backup.list_snapshots(tmp_path)
+    assert sorted((period, label) for _, period, label in snapshots) == [
+        ("manual", "b"),
+        ("manual", "c"),
+        ("monthly", first.path.stem.split("-", 2)[2]),
+    ]
+
+
+def test_snapshot_taken_elsewhere_first_is_kept(db, tmp_path):
+    db.insert_many((f"P{i:05d}", i, "Part") for i in range(2000))
+    shared = tmp_path / "shared"
+    shared.mkdir()
+    other = []
+
+    def taken_elsewhere(done, total):
+        # Another computer sharing the folder finishes the same snapshot meanwhile.
+        if not other:
+            other.extend(shared.glob("inventory-monthly-*.partial"))
+            target = other[0].name.split(".db.")[0] + ".db"
+            (shared / target).write_bytes(b"theirs")
+
+    result = backup.scheduled_snapshot(
+        "monthly", directory=shared, progress=taken_elsewhere
+    )
+    assert result is None
+    assert [path.read_bytes() for path in shared.iterdir()] == [b"theirs"]
+
+
+def test_restore(db, tmp_path):
+    db.insert_many([("A-1", 5, "Bearing"), ("B-2", 3, "Bolt")])
+    saved = backup.snapshot(directory=tmp_path).path
+    db.delete_all_inventory()
+    changes = []
+    db.add_listener(changes.append)
+
+    backup.restore(saved)
+    assert list(tmp_path.glob(f"{saved.name}-*")) == []
+    conn = sqlite3.connect(saved)
+    assert conn.execute("PRAGMA journal_mode").fetchone() == ("delete",)
+    conn.close()
+    assert db.fetch_inventory() == [("A-1", 5, "Bearing"), ("B-2", 3, "Bolt")]
+    assert db.search_text("bolt") == [("B-2", 3, "Bolt")]
+    assert changes[-1].reload
+    db.remove_listener(changes.append)
+
+    damaged = tmp_path / "damaged.db"
+    damaged.write_bytes(saved.read_bytes()[: 4096 * 3])
+    with pytest.raises(ValueError, match="damaged"):
+        backup.restore(damaged)
+    assert db.count_inventory() == 2
@@ -0,0 +1,114 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+from conftest import ROOT
+
+
+def run_cli(db, *argv):
+    import cli
+
+    return cli.main(["--db", db.DB_PATH, *map(str, argv)])
+
+
+def test_adjust_and_search(db, capsys):
+    db.insert_part_numbers("A-100", 5, "Ball bearing 6204")
+    db.insert_part_numbers("B-200", 2, "Hex bolt M8x25")
+
+    assert run_cli(db, "adjust", "A-100", "-3") == 0
+    assert capsys.readouterr().out == "A-100: 2\n"
+    assert run_cli(db, "adjust", "MISSING", "1") == 1
+
+    assert run_cli(db, "search", "bolt") == 0
+    assert capsys.readouterr().out == "B-200\t2\tHex bolt M8x25\n"
+    assert run_cli(db, "search", "--exact", "A-100") == 0
+    assert capsys.readouterr().out == "A-100\t2\tBall bearing 6204\n"
+    assert run_cli(db, "search", "washer") == 1
+    assert run_cli(db, "search", "--where", "qty < 3 or desc ~ bearing") == 0
+    assert capsys.readouterr().out.count("\n") == 2
+    assert run_cli(db, "search", "--where", "qty <") == 1
+
+
+def test_export_import_csv(db, tmp_path):
+    pytest.importorskip("pandas")
+    db.insert_many([("A-100", 5, "Ball bearing"), ("B-200", 2, "Hex bolt")])
+    path = tmp_path / "inventory.csv"
+
+    assert run_cli(db, "export", path) == 0
+    db.delete_all_inventory()
+    assert run_cli(db, "import", path) == 0
+    assert db.fetch_inventory() == [
+        ("A-100", 5, "Ball bearing"),
+        ("B-200", 2, "Hex bolt"),
+    ]
+
+    db.adjust_quantity("A-100", 1)
+    assert run_cli(db, "import", path, "--mode", "replace", "--dry-run") == 0
+    assert db.fetch_parts(["A-100"]) == [("A-100", 6, "Ball bearing")]
+    assert run_cli(db, "import", path, "--mode", "add") == 0
+    assert db.fetch_parts(["A-100"]) == [("A-100", 11, "Ball bearing")]
+
+    log = tmp_path / "changes.csv"
+    assert run_cli(db, "export", log, "--changes") == 0
+    db.adjust_quantity("B-200", 1)
+    assert run_cli(db, "export", log, "--changes") == 0
+    assert log.read_text().splitlines()[-1].startswith("B-200,5,Hex bolt,update,")
+
+
+def test_missing_file_is_an_error(db, tmp_path, capsys):
+    pytest.importorskip("pandas")
+    assert run_cli(db, "import", tmp_path / "missing.csv") == 1
+    assert capsys.readouterr().err.startswith("Error:")
+
+
+def test_core_imports_without_gui_or_pandas(tmp_path):
+    # A fresh interpreter, so modules imported by other tests do not count.
+    code = (
+        "import sys; import cli, database, excel; "
+        f"sys.path.insert(0, {str(ROOT.parent)!r}); "
+        f"package = __import__({ROOT.name!r}); package.search_text; "
+        "print(sorted(m for m in ('pandas', 'openpyxl', 'customtkinter', 'PIL', 'tkinter') "
+        "if m in sys.modules))"
+    )
+    result = subprocess.run(
+        [sys.executable, "-c", code],
+        cwd=ROOT,
+        env={**os.environ, "INVENTORY_DB": str(tmp_path / "Inventory.db")},
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    assert result.stdout.strip() == "[]"
+
+
+def test_backup_and_restore(db, tmp_path, capsys, monkeypatch):
+    import backup
+
+    monkeypatch.setattr(backup, "BACKUP_DIR", str(tmp_path / "backups"))
+    db.insert_part_numbers("A-100", 5, "Ball bearing")
+    assert run_cli(db, "backup", "--scheduled", "monthly") == 0
+    assert run_cli(db, "backup", "--scheduled", "monthly") == 0
+    assert capsys.readouterr().out.splitlines()[-1].endswith("already exists")
+
+    ((path, period, _),) = backup.list_snapshots()
+    assert period == "monthly"
+    db.delete_all_inventory()
+    assert run_cli(db, "restore", path) == 0
+    assert db.fetch_inventory() == [("A-100", 5, "Ball bearing")]
+
+
+def test_audit(db, tmp_path, capsys):
+    db.insert_many((f"P{i:03d}", i % 20, "Hex bolt") for i in range(200))
+
+    assert run_cli(db, "audit", "5", "--seed", "2026-10", "--by", "quantity") == 0
+    picked = capsys.readouterr().out.splitlines()
+    assert len(picked) == 5
+    assert run_cli(db, "audit", "5", "--seed", "2026-10", "--by", "quantity") == 0
+    assert capsys.readouterr().out.splitlines() == picked
+
+    sheet = tmp_path / "audit.csv"
+    assert run_cli(db, "audit", "5", "--seed", "2026-10", "--out", sheet) == 0
+    assert "seed 2026-10" in capsys.readouterr().out
+    assert len(sheet.read_text().splitlines()) == 6
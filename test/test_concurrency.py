@@ -0,0 +1,90 @@
+import sqlite3
+import threading
+import time
+
+import pytest
+
+
+def test_versioned_update_rejects_stale_edits(db):
+    db.insert_part_numbers("A-100", 5, "Ball bearing")
+    version = db.fetch_version("A-100")
+
+    assert db.update_inventory("A-100", 6, "Ball bearing 6204", version=version) == (
+        version + 1
+    )
+    with pytest.raises(db.StaleEditError):
+        db.update_inventory("A-100", 7, "Stale edit", version=version)
+    assert db.fetch_parts(["A-100"]) == [("A-100", 6, "Ball bearing 6204")]
+
+    # Every kind of change moves the version on.
+    db.adjust_quantity("A-100", 1)
+    db.update_many([("A-100", None, "Renamed")])
+    assert db.fetch_version("A-100") == version + 3
+    assert db.update_inventory("MISSING", 1, "x", version=0) is None
+    assert db.fetch_version("MISSING") is None
+
+
+def test_version_column_is_added_to_old_databases(db, tmp_path):
+    path = tmp_path / "Old.db"
+    old = sqlite3.connect(path)
+    old.execute(
+        "CREATE TABLE Inventory (part_number TEXT PRIMARY KEY, quantity INTEGER, "
+        "description TEXT)"
+    )
+    old.execute("INSERT INTO Inventory VALUES ('A-100', 5, 'Ball bearing')")
+    old.commit()
+    old.close()
+
+    db.set_db_path(path)
+    assert db.fetch_version("A-100") == 0
+    assert db.stock_as_of("A-100") == 5
+
+
+def test_write_waits_out_a_locked_database(db, monkeypatch):
+    monkeypatch.setattr(db, "BUSY_TIMEOUT", 0.01)
+    monkeypatch.setattr(db, "RETRY_BACKOFF", 0.05)
+    db.set_db_path(db.DB_PATH)  # Reconnect with the short timeout.
+    db.insert_part_numbers("A-100", 5, "Ball bearing")
+
+    other = sqlite3.connect(db.DB_PATH, isolation_level=None, check_same_thread=False)
+    other.execute("BEGIN IMMEDIATE")
+    threading.Timer(0.1, other.rollback).start()
+    start = time.perf_counter()
+    db.update_inventory("A-100", 6, "Ball bearing")
+    assert time.perf_counter() - start >= 0.1
+    other.close()
+    assert db.fetch_parts(["A-100"]) == [("A-100", 6, "Ball bearing")]
+
+
+def test_gives_up_when_locked_for_too_long(db, monkeypatch):
+    monkeypatch.setattr(db, "BUSY_TIMEOUT", 0.01)
+    monkeypatch.setattr(db, "RETRY_BACKOFF", 0.001)
+    monkeypatch.setattr(db, "WRITE_RETRIES", 2)
+    db.set_db_path(db.DB_PATH)
+
+    other = sqlite3.connect(db.DB_PATH, isolation_level=None)
+    other.execute("BEGIN IMMEDIATE")
+    try:
+        with pytest.raises(sqlite3.OperationalError, match="locked"):
+            db.insert_part_numbers("A-100", 5, "Ball bearing")
+    finally:
+        other.rollback()
+        other.close()
+
+
+def test_committed_write_is_not_retried_when_a_listener_hits_a_lock(db):
+    def locked(change):
+        raise sqlite3.OperationalError("database is locked")
+
+    db.add_listener(locked)
+    try:
+        with pytest.raises(sqlite3.OperationalError):
+            db.insert_part_numbers("A-100", 5, "Ball bearing")
+        with pytest.raises(sqlite3.OperationalError):
+            db.update_inventory("A-100", 6, "Ball bearing", version=0)
+    finally:
+        db.remove_listener(locked)
+    assert db.fetch_parts(["A-100"]) == [("A-100", 6, "Ball bearing")]
+    assert db.fetch_version("A-100") == 1
+    conn = db.get_connection()
+    assert conn.execute("SELECT COUNT(*) FROM Movements").fetchone()[0] == 2
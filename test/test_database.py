@@ -0,0 +1,368 @@
+import os
+import threading
+
+import pytest
+
+
+def test_insert_fetch_update_delete(db):
+    db.insert_part_numbers("A-100", 5, "Ball bearing 6204")
+    db.insert_part_numbers("B-200", 2, "Hex bolt")
+    assert db.part_numbers_exists("A-100")
+    assert db.fetch_inventory() == [
+        ("A-100", 5, "Ball bearing 6204"),
+        ("B-200", 2, "Hex bolt"),
+    ]
+
+    db.update_inventory("A-100", 7, "Ball bearing 6205")
+    assert db.search("part_number", "A-100") == [("A-100", 7, "Ball bearing 6205")]
+
+    db.delete_inventory("B-200")
+    assert not db.part_numbers_exists("B-200")
+    db.delete_all_inventory()
+    assert db.fetch_inventory() == []
+
+
+def test_connection_is_reused_per_thread(db):
+    conn = db.get_connection()
+    assert db.get_connection() is conn
+    assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+
+    other = []
+    thread = threading.Thread(target=lambda: other.append(db.get_connection()))
+    thread.start()
+    thread.join()
+    assert other[0] is not conn
+
+
+@pytest.mark.skipif(os.name == "nt", reason="reads /proc/mounts")
+def test_network_shares_use_the_delete_journal(db, tmp_path, monkeypatch):
+    mounts = tmp_path / "mounts"
+    mounts.write_text(
+        "/dev/sda1 / ext4 rw 0 0\n"
+        f"server:/parts {tmp_path / 'share'} nfs4 rw 0 0\n"
+        f"/dev/sdb1 {tmp_path / 'share' / 'local'} ext4 rw 0 0\n"
+    )
+    monkeypatch.setattr(db, "_MOUNTS", str(mounts))
+    monkeypatch.setattr(db, "JOURNAL_MODE", None)
+    db._on_network_share.cache_clear()
+    try:
+        assert db.journal_mode(tmp_path / "share" / "Inventory.db") == "DELETE"
+        assert db.journal_mode(tmp_path / "share" / "local" / "Inventory.db") == "WAL"
+        assert db.journal_mode(tmp_path / "shared.db") == "WAL"
+        monkeypatch.setattr(db, "JOURNAL_MODE", "WAL")
+        assert db.journal_mode(tmp_path / "share" / "Inventory.db") == "WAL"
+    finally:
+        db._on_network_share.cache_clear()
+
+
+def test_writes_from_worker_thread_are_visible(db):
+    thread = threading.Thread(
+        target=db.insert_part_numbers, args=("C-300", 1, "Washer")
+    )
+    thread.start()
+    thread.join()
+    assert db.part_numbers_exists("C-300")
+
+
+def test_set_db_path_reopens_connections(db, tmp_path):
+    db.insert_part_numbers("A-100", 5, "Ball bearing")
+    old = db.get_connection()
+    db.set_db_path(tmp_path / "Other.db")
+    assert db.get_connection() is not old
+    assert db.fetch_inventory() == []
+
+
+def test_writes_notify_listeners(db):
+    changes = []
+    db.add_listener(changes.append)
+    try:
+        db.insert_part_numbers("A-100", 5, "Bearing")
+        db.update_inventory("A-100", 6, "Bearing")
+        db.update_inventory("missing", 6, "Nothing")
+        db.delete_inventory("A-100")
+        db.insert_many([("B-200", 1, "Bolt")])
+    finally:
+        db.remove_listener(changes.append)
+
+    assert changes == [
+        db.Change(("A-100",), (), (), False),
+        db.Change((), ("A-100",), (), False),
+        db.Change((), (), ("A-100",), False),
+        db.Change((), (), (), True),
+    ]
+
+
+def test_search_text_tokens_prefixes_and_phrases(db):
+    db.insert_many(
+        [
+            ("AB-1234", 4, "Ball bearing 6204"),
+            ("CD-0001", 2, "Bearing housing"),
+            ("EF-0002", 9, "Hex bolt"),
+        ]
+    )
+    assert {row[0] for row in db.search_text("bearing")} == {"AB-1234", "CD-0001"}
+    assert [row[0] for row in db.search_text("bear ball")] == ["AB-1234"]
+    assert [row[0] for row in db.search_text('"ball bearing"')] == ["AB-1234"]
+    assert [row[0] for row in db.search_text("AB-12")] == ["AB-1234"]
+    assert db.search_text("ab", column="description") == []
+    assert len(db.search_text("bearing", limit=1)) == 1
+
+
+@pytest.mark.parametrize("order_by", ["part_number", "quantity", "description"])
+@pytest.mark.parametrize("descending", [False, True])
+def test_sorted_keyset_pages(db, order_by, descending):
+    rows = [(f"P{i:03d}", i % 7, f"Part {i % 5}") for i in range(60)]
+    rows += [("N001", None, None), ("N002", None, None), ("T001", "lots", "Bin")]
+    db.insert_many(rows)
+    direction = " DESC" if descending else ""
+    expected = (
+        db.get_connection()
+        .execute(
+            "SELECT part_number, quantity, description FROM Inventory "
+            f"ORDER BY {order_by}{direction}, part_number{direction}"
+        )
+        .fetchall()
+    )
+
+    pages, key = [], None
+    while True:
+        page = db.fetch_page(
+            after=key, limit=7, order_by=order_by, descending=descending
+        )
+        if not page:
+            break
+        pages += page
+        key = db.sort_key(page[-1], order_by)
+    assert pages == expected
+
+    key = db.sort_key(expected[40], order_by)
+    assert db.fetch_page(
+        before=key, limit=10, order_by=order_by, descending=descending
+    ) == (expected[30:40])
+    assert db.key_at(40, order_by, descending) == key
+    with pytest.raises(ValueError):
+        db.fetch_page(order_by="quantity; DROP TABLE Inventory")
+
+
+def test_sorted_pages_use_an_index(db):
+    db.insert_many([(f"P{i:03d}", i, f"Part {i}") for i in range(100)])
+    conn = db.get_connection()
+    statements = []
+    conn.set_trace_callback(statements.append)
+    try:
+        db.fetch_page(after=(50, "P050"), limit=10, order_by="quantity")
+        db.fetch_page(
+            before=("Part 50", "P050"), order_by="description", descending=True
+        )
+    finally:
+        conn.set_trace_callback(None)
+    assert len(statements) == 2
+    for statement in statements:
+        plan = " ".join(
+            row[-1] for row in conn.execute("EXPLAIN QUERY PLAN " + statement)
+        )
+        assert "USING INDEX Inventory_" in plan and "TEMP B-TREE" not in plan
+
+
+def test_search_prefix_and_unranked_search(db):
+    db.insert_many(
+        [
+            ("AB-1234", 4, "Ball bearing 6204"),
+            ("AB-2000", 1, "Bearing housing"),
+            ("AC-0001", 2, "Hex bolt"),
+        ]
+    )
+    assert [row[0] for row in db.search_prefix("AB-")] == ["AB-1234", "AB-2000"]
+    assert [row[0] for row in db.search_prefix("A", limit=2)] == ["AB-1234", "AB-2000"]
+    assert db.search_prefix("ab") == []
+    plan = " ".join(
+        row[-1]
+        for row in db.get_connection().execute(
+            "EXPLAIN QUERY PLAN SELECT part_number FROM Inventory "
+            "WHERE part_number >= ? AND part_number < ? ORDER BY part_number LIMIT 10",
+            ("AB", "AC"),
+        )
+    )
+    assert "INDEX" in plan and "TEMP B-TREE" not in plan
+
+    found = db.search_text("bear", limit=5, ranked=False)
+    assert sorted(row[0] for row in found) == ["AB-1234", "AB-2000"]
+
+
+def test_interruptible_aborts_the_running_query(db):
+    import sqlite3
+
+    db.insert_many((f"P-{i:05d}", i, "Part") for i in range(2000))
+    with pytest.raises(sqlite3.OperationalError, match="interrupted"):
+        with db.interruptible(lambda: True, every=100):
+            db.get_connection().execute(
+                "SELECT COUNT(*) FROM Inventory a, Inventory b"
+            ).fetchone()
+    # The handler is removed again afterwards.
+    assert db.count_inventory() == 2000
+
+
+def test_search_index_follows_updates_and_deletes(db):
+    db.insert_part_numbers("A-1", 1, "Ball bearing")
+    db.update_inventory("A-1", 1, "Roller chain")
+    assert db.search_text("bearing") == []
+    assert db.search_text("chain") == [("A-1", 1, "Roller chain")]
+    db.delete_inventory("A-1")
+    assert db.search_text("chain") == []
+
+
+def test_cache_hits_and_local_invalidation(db):
+    db.insert_part_numbers("A-100", 5, "Bearing")
+    db.fetch_inventory()
+    before = db.cache_info()
+    assert db.fetch_inventory() == [("A-100", 5, "Bearing")]
+    assert db.cache_info()["hits"] == before["hits"] + 1
+
+    db.update_inventory("A-100", 6, "Bearing")
+    assert db.fetch_inventory() == [("A-100", 6, "Bearing")]
+    assert db.search("part_number", "A-100") == [("A-100", 6, "Bearing")]
+
+
+def test_cache_sees_writes_from_other_connections(db):
+    import sqlite3
+
+    db.insert_part_numbers("A-100", 5, "Bearing")
+    assert db.count_inventory() == 1
+    assert db.search_text("bearing") == [("A-100", 5, "Bearing")]
+
+    other = sqlite3.connect(db.DB_PATH)
+    with other:
+        other.execute("UPDATE Inventory SET quantity = 9 WHERE part_number = 'A-100'")
+        other.execute(
+            "INSERT INTO Inventory (part_number, quantity, description) "
+            "VALUES ('B-200', 1, 'Bearing cap')"
+        )
+    other.close()
+
+    assert db.count_inventory() == 2
+    assert db.search_text("bearing")[0][1] in (9, 1)
+    assert ("A-100", 9, "Bearing") in db.fetch_inventory()
+
+
+def test_cache_is_bounded(db, monkeypatch):
+    monkeypatch.setattr(db, "CACHE_SIZE", 3)
+    for i in range(10):
+        db.search("part_number", f"P{i}")
+    info = db.cache_info()
+    assert info["size"] == 3
+    assert info["evictions"] >= 7
+
+
+def test_adjust_quantity(db):
+    changes = []
+    db.add_listener(changes.append)
+    db.insert_part_numbers("A-100", 5, "Ball bearing 6204")
+
+    assert db.adjust_quantity("A-100", -2) == 3
+    assert db.adjust_quantity("A-100", 10) == 13
+    assert db.adjust_quantity("MISSING", 1) is None
+    assert db.search("part_number", "A-100") == [("A-100", 13, "Ball bearing 6204")]
+    assert [change.updated for change in changes[1:]] == [("A-100",), ("A-100",)]
+    db.remove_listener(changes.append)
+
+
+def test_adjustments_survive_bad_items_and_failing_listeners(db):
+    db.insert_many([("A-100", 5, "Ball bearing"), ("B-200", 1, "Hex bolt")])
+    futures = [
+        db._writer.submit("A-100", 1),
+        db._writer.submit("B-200", 2**63),
+        db._writer.submit("A-100", 2),
+    ]
+    assert db._writer.wait(futures[0]) == 6
+    with pytest.raises(OverflowError):
+        db._writer.wait(futures[1])
+    assert db._writer.wait(futures[2]) == 8
+
+    def broken(change):
+        raise RuntimeError("listener failed")
+
+    db.add_listener(broken)
+    try:
+        assert db.adjust_quantity("B-200", 1) == 2
+    finally:
+        db.remove_listener(broken)
+    assert db._writer._thread.is_alive()
+    assert db.adjust_quantity("B-200", 1) == 3
+    assert db.fetch_parts(["A-100"]) == [("A-100", 8, "Ball bearing")]
+
+
+def test_update_many_and_delete_many(db):
+    changes = []
+    db.add_listener(changes.append)
+    db.insert_many([(f"P-{i:04d}", i, "Hex bolt") for i in range(1200)])
+
+    assert db.update_many([("P-0001", 50, None), ("P-0002", None, "Hex nut")]) == 2
+    assert db.fetch_parts(["P-0001", "P-0002"]) == [
+        ("P-0001", 50, "Hex bolt"),
+        ("P-0002", 2, "Hex nut"),
+    ]
+    assert db.update_many([("MISSING", 1, None)]) == 0
+
+    keys = [f"P-{i:04d}" for i in range(1200)] + ["MISSING"]
+    assert db.delete_many(keys) == 1200
+    assert db.count_inventory() == 0
+    assert db.delete_many(["MISSING"]) == 0
+
+    assert [len(change.updated) for change in changes if change.updated] == [2]
+    deleted = [change.deleted for change in changes if change.deleted]
+    assert len(deleted) == 1 and len(deleted[0]) == 1200
+    db.remove_listener(changes.append)
+
+
+def test_merge_rows_replace_bumps_only_changed_parts(db):
+    changes = []
+    db.add_listener(changes.append)
+    db.insert_many([("A-1", 5, "Bearing"), ("B-2", 3, "Bolt")])
+
+    result = db.merge_rows([("A-1", 8, "Other"), ("B-2", 3, "Bolt")], "replace")
+    assert result == db.MergeResult(
+        new=0, changed=1, unchanged=1, preview=[("A-1", 5, 8)]
+    )
+    assert db.fetch_version("A-1") == 1 and db.fetch_version("B-2") == 0
+    assert db.fetch_parts(["A-1"]) == [("A-1", 8, "Bearing")]
+    assert [delta for _, delta, _ in db.fetch_movements("A-1")] == [3, 5]
+    assert changes[-1].reload
+
+    # Nothing changed, so listeners are not told.
+    count = len(changes)
+    assert db.merge_rows([("A-1", 8, "Bearing")], "replace").unchanged == 1
+    assert len(changes) == count
+    with pytest.raises(ValueError, match="merge mode"):
+        db.merge_rows([], "overwrite")
+    db.remove_listener(changes.append)
+
+
+def test_iter_changes_since_a_watermark(db):
+    db.insert_many([("A-1", 5, "Bearing"), ("B-2", 3, "Bolt"), ("C-3", 1, "Nut")])
+    since = db.change_seq()
+    assert [row[:4] for rows in db.iter_changes() for row in rows] == [
+        ("A-1", 5, "Bearing", "insert"),
+        ("B-2", 3, "Bolt", "insert"),
+        ("C-3", 1, "Nut", "insert"),
+    ]
+
+    db.update_inventory("B-2", 4, "Bolt")
+    db.update_many([("C-3", None, "Nut")])  # Same values: not a change.
+    db.delete_inventory("A-1")
+    db.insert_part_numbers("D-4", 2, "Pin")
+    db.insert_part_numbers("E-5", 2, "Gone again")
+    db.delete_inventory("E-5")
+    db.adjust_quantity("B-2", 1)
+
+    rows = [row for rows in db.iter_changes(since, chunk_size=2) for row in rows]
+    assert [row[:4] for row in rows] == [
+        ("A-1", None, None, "delete"),
+        ("D-4", 2, "Pin", "insert"),
+        ("B-2", 5, "Bolt", "update"),
+    ]
+    assert rows[0][4] <= rows[-1][4]
+
+    db.set_watermark("erp", db.change_seq())
+    assert db.fetch_watermark("erp") == db.change_seq()
+    assert db.fetch_watermark("never") == 0
+    assert list(db.iter_changes(db.fetch_watermark("erp"))) == []
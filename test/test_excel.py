@@ -0,0 +1,296 @@
+import pytest
+
+pd = pytest.importorskip("pandas")
+
+
+def test_import_dataframe_counts(db):
+    import excel
+
+    db.insert_part_numbers("A-100", 1, "Already here")
+    df = pd.DataFrame(
+        {
+            "Part Number": [
+                "A-100",
+                " B-200 ",
+                "B-200",
+                "C-300",
+                None,
+                "D-400",
+                "E-500",
+            ],
+            "Quantity": [3, 4.0, 9, "five", 1, 2.5, 6],
+            "Description": [
+                "Bearing",
+                "Bolt",
+                "Bolt again",
+                "Nut",
+                "Washer",
+                "Pin",
+                None,
+            ],
+        }
+    )
+    result = excel.import_dataframe(df)
+
+    assert result._replace(preview=()) == excel.ImportResult(
+        inserted=1, skipped=2, rejected=4, unchanged=1
+    )
+    assert db.fetch_inventory() == [("A-100", 1, "Already here"), ("B-200", 4, "Bolt")]
+
+
+def test_import_excel_roundtrip(db, tmp_path):
+    pytest.importorskip("openpyxl")
+    import excel
+
+    path = tmp_path / "parts.xlsx"
+    pd.DataFrame(
+        {
+            "Part Number": ["00123", "X-1"],
+            "Quantity": [5, 7],
+            "Description": ["Gasket", "Seal"],
+        }
+    ).to_excel(path, index=False)
+
+    assert excel.import_excel(path).inserted == 2
+    assert db.search("part_number", "00123") == [("00123", 5, "Gasket")]
+
+
+def test_import_requires_columns(db):
+    import excel
+
+    with pytest.raises(ValueError, match="Quantity"):
+        excel.import_dataframe(
+            pd.DataFrame({"Part Number": ["A"], "Description": ["B"]})
+        )
+
+
+def test_export_streams_in_chunks(db, tmp_path):
+    openpyxl = pytest.importorskip("openpyxl")
+    import excel
+
+    db.insert_many([(f"P{i:03d}", i, f"Part {i}") for i in range(25)])
+    calls = []
+    path = tmp_path / "out.xlsx"
+    assert (
+        excel.export_inventory(path, chunk_size=10, progress=lambda *a: calls.append(a))
+        == 25
+    )
+    assert calls == [(10, 25), (20, 25), (25, 25)]
+
+    sheet = openpyxl.load_workbook(path).active
+    rows = list(sheet.iter_rows(values_only=True))
+    assert rows[0] == ("Part Number", "Quantity", "Description")
+    assert rows[1:3] == [("P000", 0, "Part 0"), ("P001", 1, "Part 1")]
+    assert len(rows) == 26
+
+
+def test_export_csv(db, tmp_path):
+    import excel
+
+    db.insert_part_numbers("A-100", 5, "Bearing, ball")
+    path = tmp_path / "out.csv"
+    assert excel.export_inventory(path) == 1
+    assert path.read_text().splitlines() == [
+        "Part Number,Quantity,Description",
+        'A-100,5,"Bearing, ball"',
+    ]
+
+
+def read_report(path):
+    import csv
+
+    with open(path, newline="", encoding="utf-8") as handle:
+        return [(row["Row"], row["Reason"]) for row in csv.DictReader(handle)]
+
+
+def test_csv_import_streams_and_reports_rejects(db, tmp_path):
+    import excel
+
+    path = tmp_path / "parts.csv"
+    path.write_text(
+        "Part Number,Quantity,Description\n"
+        " A-1 ,5.0,Bearing\n"
+        "A-2,five,Bolt\n"
+        ",3,Nut\n"
+        "A-3,2.5,Pin\n"
+        "A-1,9,Repeated\n"
+        "00012, 7 ,  Washer  \n"
+        "A-4,,Seal\n"
+        "A-5,1,\n",
+        encoding="utf-8",
+    )
+    calls = []
+    result = excel.import_inventory(
+        path,
+        progress=lambda *a: calls.append(a),
+        report_path=excel.default_report_path(path),
+        chunk_size=3,
+    )
+
+    assert result[:4] == (2, 1, 5, tmp_path / "parts.errors.csv")
+    assert sorted(db.fetch_inventory()) == [
+        ("00012", 7, "Washer"),
+        ("A-1", 5, "Bearing"),
+    ]
+    assert calls == [(3, 8), (6, 8), (8, 8)]
+    assert read_report(result.report) == [
+        ("3", "Quantity is not a number"),
+        ("4", "Part Number is empty"),
+        ("5", "Quantity is not a whole number"),
+        ("8", "Quantity is empty"),
+        ("9", "Description is empty"),
+    ]
+
+
+def test_excel_import_reads_in_chunks(db, tmp_path):
+    openpyxl = pytest.importorskip("openpyxl")
+    import excel
+
+    workbook = openpyxl.Workbook()
+    sheet = workbook.active
+    sheet.append(["Description", "Part Number", "Quantity", "Notes"])
+    sheet.append(["Gasket", 123, 4, "numbers stay text"])
+    sheet.append(["Seal", "X-1", "six"])
+    sheet.append(["O-ring", "X-2", 3.0])
+    path = tmp_path / "parts.xlsx"
+    workbook.save(path)
+
+    report = tmp_path / "rejects.csv"
+    result = excel.import_excel(path, report_path=report, chunk_size=2)
+    assert result[:4] == (2, 0, 1, report)
+    assert sorted(db.fetch_inventory()) == [("123", 4, "Gasket"), ("X-2", 3, "O-ring")]
+    assert read_report(report) == [("3", "Quantity is not a number")]
+
+
+def test_empty_rows_and_padded_headers_are_read_alike(db, tmp_path):
+    openpyxl = pytest.importorskip("openpyxl")
+    from openpyxl.styles import Font
+
+    import excel
+
+    workbook = openpyxl.Workbook()
+    sheet = workbook.active
+    sheet.append([" Part Number ", "Quantity", "Description"])
+    sheet.append(["A-1", 5, "Bearing"])
+    sheet.append([])
+    sheet.append([None, 3, "Nut"])
+    sheet["C10"].font = Font(bold=True)  # Formatted, but empty.
+    xlsx = tmp_path / "parts.xlsx"
+    workbook.save(xlsx)
+    csv_path = tmp_path / "parts.csv"
+    csv_path.write_text(
+        " Part Number ,Quantity,Description\nA-1,5,Bearing\n\n,,\n,3,Nut\n",
+        encoding="utf-8",
+    )
+
+    for path in (xlsx, csv_path):
+        report = tmp_path / "rejects.csv"
+        result = excel.import_inventory(path, report_path=report, dry_run=True)
+        assert result[:3] == (1, 0, 1)
+        assert [reason for _, reason in read_report(report)] == ["Part Number is empty"]
+    assert read_report(report) == [("5", "Part Number is empty")]
+
+
+@pytest.mark.parametrize(
+    "mode, expected",
+    [
+        ("skip", [("A-1", 5, "Bearing"), ("B-2", 0, "Bolt"), ("C-3", 4, "Nut")]),
+        ("replace", [("A-1", 7, "Bearing"), ("B-2", 0, "Bolt"), ("C-3", 4, "Nut")]),
+        # Repeated part numbers are added up too.
+        ("add", [("A-1", 12, "Bearing"), ("B-2", 0, "Bolt"), ("C-3", 13, "Nut")]),
+    ],
+)
+def test_import_merge_modes_and_dry_run(db, tmp_path, mode, expected):
+    import excel
+
+    db.insert_many([("A-1", 5, "Bearing"), ("B-2", 0, "Bolt")])
+    path = tmp_path / "count.csv"
+    path.write_text(
+        "Part Number,Quantity,Description\n"
+        "A-1,7,Ball bearing\nB-2,0,Bolt\nC-3,4,Nut\nC-3,9,Nut again\n",
+        encoding="utf-8",
+    )
+    changed = int(mode != "skip")
+
+    preview = excel.import_csv(path, mode=mode, dry_run=True)
+    assert sorted(db.fetch_inventory()) == [("A-1", 5, "Bearing"), ("B-2", 0, "Bolt")]
+
+    result = excel.import_csv(path, mode=mode)
+    assert result == preview
+    assert (result.inserted, result.updated, result.unchanged) == (
+        1,
+        changed,
+        2 - changed,
+    )
+    assert result.skipped == 3 - changed
+    assert result.preview[-1] == ("C-3", None, expected[-1][1])
+    assert sorted(db.fetch_inventory()) == expected
+
+
+def test_cancelled_import_writes_nothing(db, tmp_path):
+    import excel
+
+    path = tmp_path / "parts.csv"
+    path.write_text(
+        "Part Number,Quantity,Description\n"
+        + "".join(f"P{i},{'x' if i % 2 else i},Part\n" for i in range(10)),
+        encoding="utf-8",
+    )
+
+    def cancel(done, total):
+        if done >= 4:
+            raise KeyboardInterrupt
+
+    report = tmp_path / "rejects.csv"
+    with pytest.raises(KeyboardInterrupt):
+        excel.import_csv(path, progress=cancel, report_path=report, chunk_size=2)
+    assert db.count_inventory() == 0
+    assert not report.exists()
+
+
+@pytest.mark.parametrize("suffix", [".csv", ".xlsx"])
+def test_export_changes_appends_to_a_log(db, tmp_path, suffix):
+    if suffix == ".xlsx":
+        pytest.importorskip("openpyxl")
+    import excel
+
+    path = tmp_path / f"changes{suffix}"
+    db.insert_many([("A-1", 5, "Bearing"), ("B-2", 3, "Bolt")])
+    assert excel.export_changes(path, name="erp") == 2
+    assert excel.export_changes(path, name="erp") == 0
+
+    db.adjust_quantity("A-1", -1)
+    db.delete_inventory("B-2")
+    assert excel.export_changes(path, name="erp") == 2
+    # Another export has its own watermark.
+    assert excel.export_changes(tmp_path / f"other{suffix}", name="other") == 1
+
+    if suffix == ".csv":
+        log = pd.read_csv(path, dtype=str, keep_default_na=False)
+    else:
+        log = pd.read_excel(path, dtype=str).fillna("")
+    assert list(log.columns) == excel.CHANGE_COLUMNS
+    assert log[excel.CHANGE_COLUMNS[:4]].values.tolist() == [
+        ["A-1", "5", "Bearing", "insert"],
+        ["B-2", "3", "Bolt", "insert"],
+        ["A-1", "4", "Bearing", "update"],
+        ["B-2", "", "", "delete"],
+    ]
+
+
+def test_failed_change_export_keeps_the_log_and_watermark(db, tmp_path):
+    import excel
+
+    path = tmp_path / "changes.csv"
+    db.insert_many([("A-1", 5, "Bearing")])
+    excel.export_changes(path)
+    before = path.read_bytes()
+    db.insert_many([("B-2", 3, "Bolt")])
+
+    def cancel(done, total):
+        raise KeyboardInterrupt
+
+    with pytest.raises(KeyboardInterrupt):
+        excel.export_changes(path, progress=cancel)
+    assert path.read_bytes() == before
+    assert excel.export_changes(path) == 1
@@ -0,0 +1,156 @@
+import pytest
+
+tk = pytest.importorskip("tkinter")
+from tkinter import ttk  # noqa: E402
+
+
+@pytest.fixture
+def widgets():
+    try:
+        root = tk.Tk()
+    except tk.TclError:
+        pytest.skip("no display available")
+    root.withdraw()
+    tree = ttk.Treeview(root, height=15, columns=("a", "b", "c"), show="headings")
+    scrollbar = ttk.Scrollbar(root, command=tree.yview)
+    yield tree, scrollbar
+    root.destroy()
+
+
+def visible(tree):
+    return list(tree.get_children())
+
+
+def test_only_the_visible_window_is_materialized(db, widgets):
+    from grid import VirtualGrid
+
+    db.insert_many([(f"P{i:05d}", i, f"Part {i}") for i in range(1000)])
+    tree, scrollbar = widgets
+    grid = VirtualGrid(tree, scrollbar, visible_rows=15, buffer_rows=15)
+    grid.refresh()
+
+    assert visible(tree) == [f"P{i:05d}" for i in range(15)]
+    assert tree.item("P00000", "tags") == ("evenrow",)
+    assert tree.item("P00001", "tags") == ("oddrow",)
+
+    for _ in range(40):
+        grid.scroll_to(grid.offset + 1)
+    assert visible(tree) == [f"P{i:05d}" for i in range(40, 55)]
+    assert tree.item("P00041", "tags") == ("oddrow",)
+    assert len(grid._rows) <= 15 * 3
+
+    grid.scroll_to(700)
+    assert visible(tree)[0] == "P00700"
+    grid.scroll_to(10**6)
+    assert visible(tree)[-1] == "P00999"
+
+
+def test_selection_survives_scrolling(db, widgets):
+    from grid import VirtualGrid
+
+    db.insert_many([(f"P{i:05d}", i, f"Part {i}") for i in range(100)])
+    tree, scrollbar = widgets
+    grid = VirtualGrid(tree, scrollbar)
+    grid.refresh()
+    tree.selection_set("P00003")
+    tree.update()
+
+    grid.scroll_to(50)
+    grid.scroll_to(0)
+    assert grid.selected_keys() == ["P00003"]
+    assert tree.selection() == ("P00003",)
+
+
+def test_plain_click_replaces_a_selection_scrolled_out_of_view(db, widgets):
+    from types import SimpleNamespace
+
+    from grid import _CONTROL, VirtualGrid
+
+    db.insert_many([(f"P{i:05d}", i, f"Part {i}") for i in range(100)])
+    tree, scrollbar = widgets
+    grid = VirtualGrid(tree, scrollbar)
+    grid.refresh()
+    tree.selection_set("P00004")
+    tree.update()
+    grid.scroll_to(10)
+
+    # The window is not mapped, so say where the click landed.
+    tree.identify_region = lambda x, y: "cell"
+    grid._on_click(SimpleNamespace(state=0, x=0, y=0))
+    tree.selection_set("P00016")
+    tree.update()
+    assert grid.selected_keys() == ["P00016"]
+
+    grid._on_click(SimpleNamespace(state=_CONTROL, x=0, y=0))
+    tree.selection_add("P00017")
+    tree.update()
+    grid.scroll_to(50)
+    assert grid.selected_keys() == ["P00016", "P00017"]
+
+    grid.clear_selection()
+    tree.update()
+    assert grid.selected_keys() == [] and tree.selection() == ()
+    tree.selection_set("P00050")
+    tree.update()
+    grid.refresh()
+    assert grid.selected_keys() == []
+
+
+def test_edits_patch_rows_in_place(db, widgets):
+    from grid import VirtualGrid
+
+    db.insert_many([(f"P{i:05d}", i, f"Part {i}") for i in range(0, 200, 2)])
+    tree, scrollbar = widgets
+    grid = VirtualGrid(tree, scrollbar)
+    db.add_listener(grid.apply_change)
+    try:
+        grid.refresh()
+        grid.scroll_to(20)
+        first = visible(tree)[0]
+
+        db.insert_part_numbers("P00001", 1, "Above the window")
+        assert visible(tree)[0] == first
+        assert grid.offset == 21
+
+        db.insert_part_numbers(f"P{41:05d}", 1, "Inside the window")
+        assert "P00041" in visible(tree)
+        db.update_inventory("P00044", 99, "Changed")
+        assert tree.item("P00044", "values")[1] == 99
+        db.delete_inventory("P00042")
+        assert "P00042" not in visible(tree)
+        tags = [tree.item(key, "tags")[0] for key in visible(tree)]
+        assert tags[:2] == (
+            ["oddrow", "evenrow"] if grid.offset % 2 else ["evenrow", "oddrow"]
+        )
+    finally:
+        db.remove_listener(grid.apply_change)
+
+
+def test_sort_by_column_pages_in_sqlite(db, widgets):
+    from grid import VirtualGrid
+
+    db.insert_many([(f"P{i:05d}", i % 10, f"Part {i}") for i in range(500)])
+    tree, scrollbar = widgets
+    grid = VirtualGrid(tree, scrollbar, visible_rows=15, buffer_rows=15)
+    grid.refresh()
+
+    grid.sort_by("quantity")
+    assert [tree.item(key, "values")[1] for key in visible(tree)] == [0] * 15
+    grid.scroll_to(60)
+    # 50 zeros, then the ones in part number order: P00001, P00011, ...
+    assert visible(tree)[0] == "P00101"
+    grid.sort_by("quantity")
+    assert grid.descending and visible(tree)[0] == "P00499"
+
+    db.add_listener(grid.apply_change)
+    try:
+        db.update_inventory("P00498", 100, "Most")
+        assert visible(tree)[0] == "P00498"
+    finally:
+        db.remove_listener(grid.apply_change)
+
+    # The sort also applies to search results and survives a refresh.
+    grid.show_rows([("B", 1, "x"), ("A", 5, "y"), ("C", 3, "z")])
+    assert visible(tree) == ["A", "C", "B"]
+    grid.refresh()
+    assert visible(tree)[0] == "P00498"
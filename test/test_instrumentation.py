@@ -0,0 +1,69 @@
+import json
+import logging
+
+import pytest
+
+
+@pytest.fixture
+def metrics(db):
+    import instrumentation
+
+    instrumentation.reset()
+    instrumentation.install(force=True)
+    yield instrumentation
+    instrumentation.uninstall()
+    instrumentation.reset()
+
+
+def test_disabled_leaves_functions_alone(db):
+    import instrumentation
+
+    fetch = db.fetch_inventory
+    instrumentation.install()
+    assert db.fetch_inventory is fetch
+    assert instrumentation.timed("x", fetch) is fetch
+
+
+def test_records_calls_rows_and_lock_wait(metrics, db):
+    db.insert_many([(f"P-{i}", i, "Hex bolt") for i in range(10)])
+    db.fetch_inventory()
+    assert sum(len(chunk) for chunk in db.iter_inventory(4)) == 10
+    with pytest.raises(Exception):
+        db.insert_part_numbers("P-1", 1, "Duplicate")
+
+    stats = metrics.snapshot()
+    assert stats["db.insert_many"]["rows"] == 10
+    assert stats["db.fetch_inventory"]["count"] == 1
+    assert stats["db.fetch_inventory"]["rows"] == 10
+    assert stats["db.iter_inventory"]["rows"] == 10
+    assert stats["db.insert_part_numbers"]["errors"] == 1
+    assert stats["db.lock_wait"]["count"] == 2
+    assert sum(stats["db.fetch_inventory"]["buckets"].values()) == 1
+
+    metrics.uninstall()
+    assert not hasattr(db.fetch_inventory, "_instrumented")
+
+
+def test_slow_log(metrics, db, monkeypatch, caplog):
+    monkeypatch.setattr(metrics, "SLOW_MS", 0)
+    with caplog.at_level(logging.WARNING, logger="inventory.slow"):
+        db.count_inventory()
+    assert "db.count_inventory took" in caplog.text
+
+
+def test_dump_json_and_prometheus(metrics, db, tmp_path):
+    db.insert_part_numbers("A-100", 1, "Ball bearing")
+    db.fetch_inventory()
+
+    metrics.dump(tmp_path / "stats.json")
+    stats = json.loads((tmp_path / "stats.json").read_text())
+    assert stats["db.fetch_inventory"]["buckets"]["+Inf"] == 0
+
+    metrics.dump(tmp_path / "stats.prom")
+    text = (tmp_path / "stats.prom").read_text()
+    assert 'inventory_operation_seconds_count{operation="db.fetch_inventory"} 1' in text
+    assert (
+        'inventory_operation_seconds_bucket{operation="db.fetch_inventory",le="+Inf"} 1'
+        in text
+    )
+    assert 'inventory_operation_rows_total{operation="db.fetch_inventory"} 1' in text
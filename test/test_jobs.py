@@ -0,0 +1,121 @@
+import threading
+import time
+
+import pytest
+
+from jobs import JobRunner
+
+
+class FakeRoot:
+    """Just enough of tk.Tk for JobRunner: after() callbacks run from run_until()."""
+
+    def __init__(self):
+        self.callbacks = []
+        self.errors = []
+
+    def after(self, ms, callback):
+        self.callbacks.append(callback)
+        return len(self.callbacks)
+
+    def after_cancel(self, after_id):
+        pass
+
+    def report_callback_exception(self, *exc_info):
+        self.errors.append(exc_info[1])
+
+    def run_until(self, condition, timeout=5):
+        deadline = time.monotonic() + timeout
+        while not condition():
+            assert time.monotonic() < deadline, "timed out"
+            callbacks, self.callbacks = self.callbacks, []
+            for callback in callbacks:
+                callback()
+            time.sleep(0.001)
+
+
+@pytest.fixture
+def runner():
+    root = FakeRoot()
+    runner = JobRunner(root)
+    yield runner
+    runner.shutdown()
+
+
+def test_results_come_back_on_the_polling_thread(runner):
+    results = []
+
+    def work(job, a, b):
+        return a + b, threading.current_thread()
+
+    runner.submit(
+        work,
+        2,
+        3,
+        on_done=lambda result: results.append((result, threading.current_thread())),
+    )
+    runner.root.run_until(lambda: results)
+    (value, worker), caller = results[0]
+    assert value == 5
+    assert worker is not threading.main_thread()
+    assert caller is threading.main_thread()
+    assert not runner.busy
+
+
+def test_progress_and_cancel(runner):
+    started = threading.Event()
+    progress, cancelled = [], []
+
+    def work(job):
+        job.progress(1, 10)
+        started.set()
+        while True:
+            job.progress(2, 10)
+            time.sleep(0.001)
+
+    job = runner.submit(
+        work,
+        on_progress=lambda *a: progress.append(a),
+        on_cancel=lambda: cancelled.append(True),
+    )
+    started.wait(5)
+    job.cancel()
+    runner.root.run_until(lambda: cancelled)
+    assert progress[0] == (1, 10)
+    assert job.done
+
+
+def test_errors_are_reported(runner):
+    errors = []
+    runner.submit(lambda job: 1 / 0, on_error=errors.append)
+    runner.root.run_until(lambda: errors)
+    assert isinstance(errors[0], ZeroDivisionError)
+
+    runner.submit(lambda job: job.check() or [][1])
+    runner.root.run_until(lambda: runner.root.errors)
+    assert isinstance(runner.root.errors[0], IndexError)
+
+
+def test_cancelled_import_rolls_back(db, runner):
+    pd = pytest.importorskip("pandas")
+    import excel
+
+    df = pd.DataFrame(
+        {
+            "Part Number": [f"P{i:05d}" for i in range(5000)],
+            "Quantity": [1] * 5000,
+            "Description": ["Part"] * 5000,
+        }
+    )
+
+    def work(job):
+        def progress(done, total):
+            if done >= 2000:
+                job.cancel()
+            job.progress(done, total)
+
+        return excel.import_dataframe(df, progress)
+
+    cancelled = []
+    runner.submit(work, on_cancel=lambda: cancelled.append(True))
+    runner.root.run_until(lambda: cancelled)
+    assert db.count_inventory() == 0
@@ -0,0 +1,85 @@
+import os
+import subprocess
+import sys
+import threading
+import time
+from datetime import datetime, timezone
+
+from conftest import ROOT
+
+
+def test_every_quantity_change_is_a_movement(db):
+    db.insert_part_numbers("A-100", 5, "Ball bearing")
+    db.update_inventory("A-100", 8, "Ball bearing 6204")
+    db.update_inventory("A-100", 8, "Description only")
+    assert db.adjust_quantity("A-100", -3) == 5
+    db.delete_inventory("A-100")
+
+    deltas = [row[1] for row in reversed(db.fetch_movements("A-100"))]
+    assert deltas == [5, 3, -3, -5]
+
+
+def test_stock_as_of(db, monkeypatch):
+    monkeypatch.setattr(db, "SNAPSHOT_EVERY", 3)
+    db.insert_part_numbers("A-100", 10, "Ball bearing")
+    time.sleep(0.01)
+    before = datetime.now(timezone.utc)
+    time.sleep(0.01)
+    for _ in range(4):
+        db.adjust_quantity("A-100", 1)
+    time.sleep(0.01)
+    middle = datetime.now(timezone.utc)
+    time.sleep(0.01)
+    db.adjust_quantity("A-100", -7)
+
+    snapshots = db.get_connection().execute("SELECT COUNT(*) FROM StockSnapshots")
+    assert snapshots.fetchone()[0] >= 1
+    assert db.stock_as_of("A-100") == 7
+    assert db.stock_as_of("A-100", before) == 10
+    assert db.stock_as_of("A-100", middle) == 14
+    assert db.stock_as_of("A-100", "2000-01-01 00:00:00") == 0
+    db.adjust_quantity("A-100", 1)
+    assert db.take_snapshot() == 1
+    assert db.take_snapshot() == 0
+    assert db.stock_as_of("A-100", datetime.now(timezone.utc)) == 8
+    assert db.stock_as_of("A-100", middle) == 14
+
+
+def test_concurrent_adjustments_are_grouped(db):
+    db.insert_part_numbers("A-100", 0, "Ball bearing")
+    commits = []
+    db.add_listener(commits.append)
+
+    def worker():
+        for _ in range(100):
+            db.adjust_quantity("A-100", 1)
+
+    threads = [threading.Thread(target=worker) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    db.remove_listener(commits.append)
+
+    assert db.stock_as_of("A-100") == 800
+    assert len(commits) <= 800
+    assert sum(len(change.updated) for change in commits) == 800
+
+
+def test_no_lost_increments_across_processes(db):
+    db.insert_part_numbers("A-100", 0, "Ball bearing")
+    db.close_connections()
+    code = (
+        "import database\n"
+        "for _ in range(100):\n"
+        "    database.adjust_quantity('A-100', 1)\n"
+    )
+    env = dict(os.environ, INVENTORY_DB=db.DB_PATH)
+    processes = [
+        subprocess.Popen([sys.executable, "-c", code], cwd=ROOT, env=env)
+        for _ in range(4)
+    ]
+    assert all(process.wait(timeout=60) == 0 for process in processes)
+
+    assert db.stock_as_of("A-100") == 400
+    assert len(db.fetch_movements("A-100", limit=1000)) == 400
@@ -0,0 +1,105 @@
+import threading
+import time
+
+import pytest
+
+from jobs import JobRunner
+from livesearch import LiveSearch
+
+
+class FakeRoot:
+    """tk.Tk's after() and after_cancel(); timers fire when fire() or run_until() is called."""
+
+    def __init__(self):
+        self.timers = {}
+        self.next_id = 0
+
+    def after(self, ms, callback):
+        self.next_id += 1
+        self.timers[self.next_id] = callback
+        return self.next_id
+
+    def after_cancel(self, after_id):
+        self.timers.pop(after_id, None)
+
+    def report_callback_exception(self, *exc_info):
+        raise exc_info[1]
+
+    def fire(self):
+        timers, self.timers = self.timers, {}
+        for callback in timers.values():
+            callback()
+
+    def run_until(self, condition, timeout=5):
+        deadline = time.monotonic() + timeout
+        while not condition():
+            assert time.monotonic() < deadline, "timed out"
+            self.fire()
+            time.sleep(0.001)
+
+
+@pytest.fixture
+def root():
+    root = FakeRoot()
+    runner = JobRunner(root)
+    root.runner = runner
+    yield root
+    runner.shutdown()
+
+
+def test_typing_runs_one_search_after_the_pause(root):
+    searched, shown = [], []
+
+    def search(query):
+        searched.append(query)
+        return [query]
+
+    live = LiveSearch(root, root.runner, search, lambda rows, q: shown.append(rows))
+    for text in ["A", "AB", "AB-", "AB-1"]:
+        live.schedule(text)
+    root.run_until(lambda: shown)
+    assert searched == ["AB-1"]
+    assert shown == [["AB-1"]]
+
+
+def test_stale_results_are_dropped(root):
+    release = threading.Event()
+    shown = []
+
+    def search(query):
+        if query == "slow":
+            release.wait(5)
+        return [query]
+
+    live = LiveSearch(root, root.runner, search, lambda rows, q: shown.append(rows))
+    slow = live.run("slow")
+    live.run("fast")
+    root.run_until(lambda: shown)
+    release.set()
+    root.run_until(lambda: slow.done)
+    assert shown == [["fast"]]
+
+
+def test_a_stale_query_is_interrupted_in_sqlite(root, db):
+    db.insert_many((f"P-{i:05d}", i, "Part") for i in range(3000))
+    started = threading.Event()
+    shown = []
+
+    def search(query):
+        if query == "slow":
+            started.set()
+            # Runs for a long time unless interrupted.
+            return (
+                db.get_connection()
+                .execute("SELECT COUNT(*) FROM Inventory a, Inventory b, Inventory c")
+                .fetchall()
+            )
+        return db.search_prefix(query)
+
+    live = LiveSearch(root, root.runner, search, lambda rows, q: shown.append(rows))
+    slow = live.run("slow")
+    started.wait(5)
+    live.run("P-0000")
+    root.run_until(lambda: shown and slow.done)
+    assert len(shown) == 1
+    assert [row[0] for row in shown[0]][:2] == ["P-00000", "P-00001"]
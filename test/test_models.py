@@ -0,0 +1,64 @@
+from array import array
+
+from models import Batch, Inventory, Part
+
+
+def test_part_is_slotted_and_unpacks():
+    part = Part("A-100", 5, "Ball bearing")
+    assert not hasattr(part, "__dict__")
+    part_number, quantity, description = part
+    assert (part_number, quantity, description) == ("A-100", 5, "Ball bearing")
+    assert part == Part.from_row(("A-100", 5, "Ball bearing"))
+    assert repr(part) == "Part('A-100', 5, 'Ball bearing')"
+
+
+def test_inventory_parts_and_columns(db):
+    db.insert_many(
+        [
+            ("A-100", 5, "Ball bearing"),
+            ("B-200", 2, "Hex bolt"),
+            ("C-300", 7, "Hex bolt"),
+        ]
+    )
+    inventory = Inventory(chunk_size=2)
+
+    assert len(inventory) == 3
+    assert "B-200" in inventory
+    assert inventory.get("B-200") == Part("B-200", 2, "Hex bolt")
+    assert inventory.get("MISSING") is None
+    assert [part.part_number for part in inventory] == ["A-100", "B-200", "C-300"]
+    assert [len(batch) for batch in inventory.batches()] == [2, 1]
+
+    columns = inventory.columns()
+    assert columns.part_numbers == ["A-100", "B-200", "C-300"]
+    assert columns.quantities == array("q", [5, 2, 7])
+    assert columns.descriptions[1] is columns.descriptions[2]
+    assert list(columns.rows())[0] == ("A-100", 5, "Ball bearing")
+    assert inventory.total_quantity() == 14
+    assert sorted(inventory.search("bolt"), key=lambda part: part.part_number) == [
+        Part("B-200", 2, "Hex bolt"),
+        Part("C-300", 7, "Hex bolt"),
+    ]
+
+
+def test_batch_keeps_text_quantities():
+    batch = Batch.from_rows([("A-100", "five", "Bearing"), ("B-200", None, "Bolt")])
+    assert batch.quantities == ["five", None]
+    assert len(Batch.from_rows([])) == 0
+
+
+def test_total_quantity_skips_text_quantities(db):
+    db.insert_many(
+        [("A-100", 5, "Bearing"), ("B-200", "lots", "Bolt"), ("C-300", 2, "Nut")]
+    )
+    db.insert_many([("D-400", None, "Washer")])
+    assert Inventory(chunk_size=2).total_quantity() == 7
+
+
+def test_inventory_writes(db):
+    inventory = Inventory()
+    inventory.add(Part("A-100", 5, "Ball bearing"))
+    inventory.save(Part("A-100", 6, "Ball bearing 6204"))
+    assert inventory.get("A-100") == Part("A-100", 6, "Ball bearing 6204")
+    inventory.remove("A-100")
+    assert len(inventory) == 0
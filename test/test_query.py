@@ -0,0 +1,106 @@
+import re
+
+import pytest
+
+import query
+
+PARTS = [
+    ("AB-0001", 2, "Ball bearing 6204"),
+    ("AB-0002", 0, "Ball bearing 6205"),
+    ("AB-0100", 12, "Hex bolt M8x25"),
+    ("CD-0001", 4, "Hex nut M8"),
+    ("CD-0002", 40, "Roller chain #40"),
+    ("EF-0001", 7, "Fuse 10A"),
+]
+
+
+@pytest.fixture
+def parts(db):
+    db.insert_many(PARTS)
+    return db
+
+
+def numbers(rows):
+    return sorted(row[0] for row in rows)
+
+
+def test_conditions_combine_with_and_or(parts):
+    low = query.low_stock()
+    assert numbers(query.Query(low).fetch()) == ["AB-0001", "AB-0002", "CD-0001"]
+    bearings = query.where("description", "~", "bearing")
+    assert numbers(query.Query(low & bearings).fetch()) == ["AB-0001", "AB-0002"]
+    chain = query.where("part", "^=", "CD-")
+    assert numbers(query.Query(bearings | chain).fetch()) == [
+        "AB-0001",
+        "AB-0002",
+        "CD-0001",
+        "CD-0002",
+    ]
+    ranged = query.Query(query.where("qty", "between", (4, 12)), order_by="quantity")
+    assert [row[0] for row in ranged.fetch()] == ["CD-0001", "EF-0001", "AB-0100"]
+    assert len(query.Query(limit=2).fetch()) == 2
+
+
+@pytest.mark.parametrize(
+    "text, expected",
+    [
+        ("qty < 5", ["AB-0001", "AB-0002", "CD-0001"]),
+        ("quantity 4..12", ["AB-0100", "CD-0001", "EF-0001"]),
+        ("part ^= AB- and qty >= 2", ["AB-0001", "AB-0100"]),
+        ("desc ~ hex qty > 5", ["AB-0100"]),
+        ('desc : "ball bearing" or part = EF-0001', ["AB-0001", "AB-0002", "EF-0001"]),
+        ("(qty < 1 or qty > 30) and part ^= CD", ["CD-0002"]),
+        ("desc ^= Hex", ["AB-0100", "CD-0001"]),
+        ("qty != 0 and part ^= AB", ["AB-0001", "AB-0100"]),
+    ],
+)
+def test_parse(parts, text, expected):
+    assert numbers(query.search(text)) == expected
+
+
+def test_default_column(parts):
+    assert numbers(query.search("< 3", default_column="quantity")) == [
+        "AB-0001",
+        "AB-0002",
+    ]
+    assert numbers(query.search("40", default_column="quantity")) == ["CD-0002"]
+
+
+@pytest.mark.parametrize(
+    "text",
+    ["", "qty <", "qty < lots", "colour = red", "qty ^= 1", "(qty < 5", "desc ~ ++"],
+)
+def test_bad_queries(parts, text):
+    with pytest.raises(query.QueryError):
+        query.search(text)
+
+
+def test_values_are_parameters(parts):
+    sql, params = query.Query(query.parse('desc = "x\' OR 1=1 --"')).sql()
+    assert "OR 1=1" not in sql and params[0] == "x' OR 1=1 --"
+    with pytest.raises(query.QueryError):
+        query.where("quantity; DROP TABLE Inventory", "=", 1)
+    with pytest.raises(ValueError):
+        parts.search("1 = 1 OR part_number", "x")
+
+
+@pytest.mark.parametrize(
+    "text",
+    [
+        "qty < 5",
+        "qty 2..10",
+        "part = AB-0001",
+        "part ^= AB-",
+        "desc ^= Ball",
+        "desc ~ bearing",
+        "qty < 5 and desc ~ bearing",
+        "qty < 5 and part ^= AB",
+        "part ^= AB or part ^= CD",
+        "qty < 2 or qty > 30",
+        "qty < 5 or desc ~ bearing",
+    ],
+)
+def test_common_queries_use_an_index(parts, text):
+    plan = query.Query(query.parse(text)).explain()
+    full_scans = [line for line in plan if re.match(r"SCAN Inventory\b(?!_fts)", line)]
+    assert not full_scans, plan
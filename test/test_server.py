@@ -0,0 +1,127 @@
+import asyncio
+import http.client
+import json
+import threading
+
+import pytest
+
+
+@pytest.fixture
+def server(db):
+    import server as server_module
+
+    loop = asyncio.new_event_loop()
+    instance = server_module.InventoryServer(port=0, workers=2)
+    port = loop.run_until_complete(instance.start())
+    thread = threading.Thread(target=loop.run_forever, daemon=True)
+    thread.start()
+    connection = http.client.HTTPConnection("127.0.0.1", port, timeout=10)
+    yield connection
+    connection.close()
+    asyncio.run_coroutine_threadsafe(instance.close(), loop).result()
+    loop.call_soon_threadsafe(loop.stop)
+    thread.join()
+    loop.close()
+
+
+def request(connection, method, path, body=None, headers=None):
+    data = None if body is None else json.dumps(body)
+    connection.request(method, path, body=data, headers=headers or {})
+    response = connection.getresponse()
+    payload = response.read()
+    return response.status, dict(response.getheaders()), json.loads(payload or "null")
+
+
+def test_list_get_and_search(db, server):
+    db.insert_many([(f"P-{i:03d}", i, f"Hex bolt {i}") for i in range(5)])
+
+    status, _, page = request(server, "GET", "/parts?limit=3")
+    assert status == 200
+    assert page["total"] == 5
+    assert [part["part_number"] for part in page["parts"]] == [
+        "P-000",
+        "P-001",
+        "P-002",
+    ]
+    _, _, page = request(server, "GET", f"/parts?limit=3&after={page['next']}")
+    assert [part["part_number"] for part in page["parts"]] == ["P-003", "P-004"]
+    assert page["next"] is None
+
+    status, _, part = request(server, "GET", "/parts/P-002")
+    assert part == {
+        "part_number": "P-002",
+        "quantity": 2,
+        "description": "Hex bolt 2",
+        "version": 0,
+    }
+    assert request(server, "GET", "/parts/MISSING")[0] == 404
+
+    _, _, found = request(server, "GET", "/search?q=bolt&limit=2")
+    assert len(found["parts"]) == 2
+    assert request(server, "GET", "/search?q=bolt&column=nope")[0] == 400
+    assert request(server, "DELETE", "/parts/P-001")[0] == 405
+    assert request(server, "GET", "/nothing")[0] == 404
+
+
+def test_etag_revalidation(db, server):
+    db.insert_part_numbers("A-100", 5, "Ball bearing")
+    status, headers, _ = request(server, "GET", "/parts")
+    etag = headers["ETag"]
+
+    status, _, body = request(server, "GET", "/parts", headers={"If-None-Match": etag})
+    assert status == 304 and body is None
+
+    request(server, "POST", "/parts/A-100/adjust", {"delta": 1})
+    status, headers, _ = request(
+        server, "GET", "/parts", headers={"If-None-Match": etag}
+    )
+    assert status == 200 and headers["ETag"] != etag
+
+
+def test_adjust_and_import(db, server):
+    status, _, result = request(
+        server,
+        "POST",
+        "/import",
+        [
+            {"part_number": "A-100", "quantity": 5, "description": "Ball bearing"},
+            ["B-200", 2, "Hex bolt"],
+            ["B-200", 3, "Hex bolt again"],
+            ["C-300", "five", "Nut"],
+        ],
+    )
+    assert status == 200
+    assert result == {"inserted": 2, "skipped": 1, "rejected": 1}
+
+    status, _, result = request(server, "POST", "/parts/A-100/adjust", {"delta": -2})
+    assert (status, result) == (200, {"part_number": "A-100", "quantity": 3})
+    assert request(server, "POST", "/parts/A-100/adjust", {"delta": "x"})[0] == 400
+    for body in (None, [1], {"delta": 2**63}):
+        assert request(server, "POST", "/parts/A-100/adjust", body)[0] == 400
+    status, _, result = request(server, "POST", "/import", [["D-400", 2**63, "Pin"]])
+    assert (status, result) == (200, {"inserted": 0, "skipped": 0, "rejected": 1})
+    assert request(server, "POST", "/parts/NOPE/adjust", {"delta": 1})[0] == 404
+    assert db.stock_as_of("A-100") == 3
+
+
+@pytest.mark.parametrize("length", ["abc", "-5"])
+def test_bad_content_length_is_a_bad_request(db, server, length):
+    server.putrequest("POST", "/import")
+    server.putheader("Content-Length", length)
+    server.endheaders()
+    response = server.getresponse()
+    assert response.status == 400
+    assert response.getheader("Connection") == "close"
+    assert json.loads(response.read()) == {"error": "Invalid Content-Length"}
+
+
+def test_too_large_body_is_refused(db, server, monkeypatch):
+    import server as server_module
+
+    monkeypatch.setattr(server_module, "MAX_BODY", 10)
+    server.putrequest("POST", "/import")
+    server.putheader("Content-Length", "11")
+    server.endheaders()
+    response = server.getresponse()
+    assert response.status == 413
+    assert response.getheader("Connection") == "close"